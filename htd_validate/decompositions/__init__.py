@@ -1,5 +1,8 @@
+from htd_validate.decompositions.report import ValidationReport
+from htd_validate.decompositions.weights import HyperedgeFunction
 from htd_validate.decompositions.decomposition import Decomposition
 from htd_validate.decompositions.td import TreeDecomposition
 from htd_validate.decompositions.ghtd import GeneralizedHypertreeDecomposition
 from htd_validate.decompositions.htd import HypertreeDecomposition
-from htd_validate.decompositions.fhtd import FractionalHypertreeDecomposition
\ No newline at end of file
+from htd_validate.decompositions.fhtd import FractionalHypertreeDecomposition
+from htd_validate.decompositions.incremental import IncrementalValidator
@@ -1,21 +1,64 @@
 import logging
 import os
+import pickle
 import traceback
-from io import TextIOWrapper
-from io import BytesIO
+from array import array
 from collections import defaultdict
+from contextlib import contextmanager
 from itertools import chain
 
 import htd_validate.utils.relabelling as relab
 import networkx as nx
+from htd_validate.utils import bincache
+from htd_validate.utils import mmapscan
+from htd_validate.decompositions.report import ValidationReport, column
+from htd_validate.decompositions.weights import HyperedgeFunction
+from htd_validate.utils.bitset import Bitsets
+from htd_validate.utils.helpers import open_text
+from htd_validate.utils.mmapscan import np
 # noinspection PyUnresolvedReferences
 from htd_validate.utils import HypergraphPrimalView
-from networkx.drawing.nx_agraph import graphviz_layout
+
+# decomposition of the running validation and the tasks, inherited by the workers of the pool (see
+# Decomposition._holds)
+_snapshot = None
+_context = None
+
+
+def _init_worker(decomp, context):
+    global _snapshot, _context
+    _snapshot = decomp
+    _context = context
+
+
+def _check_property(task):
+    """
+    :param task: pair (position of the property, None or range (start, stop) of the items of a shard)
+    :return: triple (position, whether the property holds or the violations of the shard, exception)
+    """
+    pos, shard = task
+    name, kwargs, items = _context[pos]
+    try:
+        if shard is None:
+            return pos, getattr(_snapshot, name)(**kwargs), None
+        return pos, getattr(_snapshot, name)(items[shard[0]:shard[1]], **kwargs), None
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(traceback.format_exc())
+        return pos, None, e
 
 
 class Decomposition(object):
     _problem_string = 'missing'
     _data_type = int
+    # validate with bags and hyperedges as bitmasks (see Bitsets), pays off for wide decompositions
+    bitsets = False
+    # bitset index of the running validation (see _indexed)
+    _index = None
+    # fractional weights are read as integers scaled by a common denominator and summed exactly (see from_file)
+    exact = False
 
     def __new__(cls, *args, **kwargs):
         if cls is Decomposition:
@@ -30,6 +73,29 @@ class Decomposition(object):
     def T(self):
         return self.tree
 
+    @property
+    def tree(self):
+        if self._tree is None:
+            nodes, edges = self._tree_arrays
+            self._tree = nx.DiGraph()
+            self._tree.add_nodes_from(nodes)
+            self._tree.add_edges_from(zip(edges[::2], edges[1::2]))
+            self._tree_arrays = None
+        return self._tree
+
+    @tree.setter
+    def tree(self, tree):
+        self._tree = tree
+        self._tree_arrays = None
+
+    def _set_tree_arrays(self, nodes, edges):
+        """
+        Sets the tree to the one given by its nodes and the concatenated end points of its edges, the networkx graph
+        is built on first access of tree.
+        """
+        self._tree = None
+        self._tree_arrays = nodes, edges
+
     @property
     def graph(self):
         return self.hypergraph
@@ -51,6 +117,7 @@ class Decomposition(object):
     def connect(self, td, edge=None, edge_id=None):
         assert ((edge is None) == (edge_id is None))
         assert (edge is None or len(edge) <= 2)
+        self._invalidate()
 
         tdfound = None
         selffound = None
@@ -129,6 +196,7 @@ class Decomposition(object):
     def replay(self, repl):
         assert (repl is not None)
         assert (self.graph is not None)
+        self._invalidate()
         repl.reverse()  # redo repl in reverse order
         for (parent, bag, weight) in repl:
             logging.info("searching for {0},{1},{2}".format(parent, bag, weight))
@@ -173,22 +241,236 @@ class Decomposition(object):
         self.bags = bags
         self.hypergraph = hypergraph
         self.plot_if_td_invalid = plot_if_td_invalid
+        self._invalidate()
 
     @staticmethod
     def graph_type():
         raise NotImplementedError("abstract method -- subclass must override")
 
+    def _invalidate(self):
+        """
+        Drops the cached aggregates (see _aggregate), called by connect, replay and relabel. Changes of bags or weights
+        made directly have to call it as well.
+        """
+        self._aggregates = {}
+
+    def _aggregate(self, name, compute):
+        """
+        :param name: name of the aggregate, e.g., the width
+        :param compute: function computing the aggregate from the bags (and weights)
+        :return: the aggregate, computed on first access
+        """
+        try:
+            return self._aggregates[name]
+        except KeyError:
+            ret = self._aggregates[name] = compute()
+            return ret
+
     def __len__(self):
         return len(self.bags)
 
     @classmethod
-    def from_file(cls, filename, strict=False):
+    def from_file(cls, filename, strict=False, cache=False, exact=False):
         """
         :param strict: strictly enforce PACE requirements for the input format (pace specs are unnecessarily strict)
         :param filename:
+        :param cache: keep the parsed decomposition in a binary sidecar file (filename + bincache.SUFFIX), which is
+                      used as long as path, mtime and size of filename do not change
+        :param exact: read fractional weights as integers scaled by a common denominator, such that the bag conditions
+                      are checked with exact integer sums instead of float sums up to epsilon
         :rtype: TreeDecomposition
         :return:
         """
+        if cache:
+            return bincache.cached(filename, {'class': cls.__name__, 'strict': strict, 'exact': exact},
+                                   lambda: cls.from_file(filename, strict=strict, exact=exact),
+                                   lambda cache_file: cls.load_binary(cache_file, exact=exact),
+                                   lambda decomp, cache_file, source: decomp.save_binary(cache_file, source=source))
+        decomp_header = cls._from_mmap(filename, strict, exact)
+        if decomp_header is None:
+            decomp_header = cls._from_stream(filename, strict, exact)
+        decomp, header = decomp_header
+        # decomps of single bags require special treatment
+        if len(decomp) == 1:
+            # noinspection PyUnresolvedReferences
+            decomp.tree.add_node(tuple(decomp.bags.keys())[0]) #.next())
+        if decomp.specific_valiation(decomp, header):
+            logging.critical('Decomposition specific validation failed.')
+            exit(2)
+        if len(decomp) != header['num_bags']:
+            logging.critical('Number of bags differ. Was %s expected %s.\n' % (len(decomp), header['num_bags']))
+            exit(2)
+        if decomp.num_vertices > header['num_vertices']:
+            logging.critical(
+                'Number of vertices differ (>). Was %s expected %s.\n' % (
+                    decomp.num_vertices, header['num_vertices']))
+            exit(2)
+        if decomp.num_vertices < header['num_vertices'] and strict:
+            logging.warning(
+                'Number of vertices differ (<). Was %s expected %s.\n' % (decomp.num_vertices, header['num_vertices']))
+            exit(2)
+        return decomp
+
+    def save_binary(self, filename, source=None):
+        """
+        Stores bags, tree and hyperedge function (if any) in the binary format of bincache. Bags and weights are
+        kept in CSR layout (ids, offsets into the concatenated contents).
+
+        :param filename: name of the file to write to
+        :param source: source key (sidecar caches only)
+        """
+        arrays = {'bag_ids': array('q', self.bags), 'bag_offsets': array('q', [0]), 'bag_vertices': array('q'),
+                  'tree_nodes': array('q', self.tree.nodes() if self._tree_arrays is None else self._tree_arrays[0]),
+                  'tree_edges': array('q', chain.from_iterable(self.tree.edges()) if self._tree_arrays is None
+                                      else self._tree_arrays[1])}
+        for bag in self.bags.values():
+            arrays['bag_vertices'].extend(bag)
+            arrays['bag_offsets'].append(len(arrays['bag_vertices']))
+        weights = getattr(self, 'hyperedge_function', None)
+        if weights is not None:
+            nodes, offsets, edges, values = weights.csr()
+            if weights.typecode is None:
+                raise TypeError('Weights of type %s cannot be stored.' % {type(val).__name__ for val in values})
+            arrays['weight_nodes'] = array('q', nodes)
+            arrays['weight_offsets'] = offsets
+            arrays['weight_edges'] = edges
+            arrays['weight_values'] = values
+            # common denominator of the weights in exact mode
+            arrays['weight_scale'] = array('q', [self.weight_scale])
+        bincache.write(filename, type(self).__name__, arrays, source=source)
+
+    @classmethod
+    def load_binary(cls, filename, exact=False):
+        """
+        :param filename: name of a file written by save_binary
+        :param exact: whether the file was read in exact mode (see from_file)
+        :return: stored decomposition
+        """
+        with bincache.BinaryFile(filename) as binary:
+            if binary.kind != cls.__name__:
+                raise IOError('File "%s" contains a %s, expected a %s.' % (filename, binary.kind, cls.__name__))
+            bag_ids = binary.array('bag_ids').tolist()
+            bag_offsets = binary.array('bag_offsets').tolist()
+            bag_vertices = binary.array('bag_vertices').tolist()
+            tree_nodes = binary.array('tree_nodes').tolist()
+            tree_edges = binary.array('tree_edges').tolist()
+            weights = None
+            if 'weight_nodes' in binary:
+                weights = HyperedgeFunction.from_csr(binary.array('weight_nodes').tolist(),
+                                                     binary.array('weight_offsets'), binary.array('weight_edges'),
+                                                     binary.array('weight_values'))
+                scale = binary.array('weight_scale')[0] if 'weight_scale' in binary else 1
+
+        decomp = cls()
+        decomp.exact = exact
+        decomp.bags.update((b, set(bag_vertices[bag_offsets[i]:bag_offsets[i + 1]])) for i, b in enumerate(bag_ids))
+        decomp._set_tree_arrays(tree_nodes, tree_edges)
+        if weights is not None:
+            decomp.hyperedge_function = weights
+            decomp.weight_scale = scale
+        return decomp
+
+    @classmethod
+    def _read_header_line(cls, line, log_critical):
+        header = {}
+        try:
+            header['num_bags'] = int(line[2])
+            header['num_vertices'] = int(line[4])
+            header.update(cls._read_header(line))
+        except ValueError as e:
+            logging.error(e)
+            log_critical('Too many or too few arguments in header.')
+            exit(2)
+        return header
+
+    @classmethod
+    def _from_mmap(cls, filename, strict=False, exact=False):
+        """
+        Reads an uncompressed file via a memory-mapped, byte-level scan (see mmapscan).
+
+        :param filename: name of the file to read from
+        :param strict: strictly enforce PACE requirements for the input format
+        :param exact: see from_file
+        :return: decomposition and header or None if the file has to be read (and its errors reported) by the
+                 line based reader
+        """
+        scan = mmapscan.scan(filename)
+        if scan is None:
+            return None
+        decomp = cls()
+        decomp.exact = exact
+        with scan:
+            kind = scan.kind
+            comments = np.flatnonzero(kind == ord('c'))
+            headers = np.flatnonzero(kind == ord('s'))
+            bags = np.flatnonzero(kind == ord('b'))
+            edges = np.flatnonzero(kind == mmapscan.NUMBER)
+            others = np.flatnonzero(~np.isin(kind, [ord('c'), ord('s'), ord('b'), mmapscan.NUMBER]))
+            # the header has to precede any other content
+            if len(headers) != 1 or (kind[:headers[0]] != ord('c')).any():
+                return None
+            line = scan.text(headers[0]).split()
+            if len(line) < 2 or line[1] != cls._problem_string:
+                return None
+
+            def log_critical(string):
+                logging.critical('%s:L(%s). %s  Exiting...' % (os.path.basename(filename), scan.line_no[headers[0]],
+                                                               string))
+
+            header = cls._read_header_line(line, log_critical)
+
+            # bags: b <id> <vertices>
+            size = np.diff(scan.ptr)[bags]
+            if (size < 3 if strict else size < 2).any() or not scan.all_numeric(bags, skip=1):
+                return None
+            bag_ids = scan.columns(bags, 1, skip=1)[:, 0]
+            if len(np.unique(bag_ids)) != len(bag_ids):
+                return None
+            # tree edges: <u> <v>
+            if (np.diff(scan.ptr)[edges] != 2).any():
+                return None
+            tree_edges = scan.columns(edges, 2)
+            if tree_edges is None or (tree_edges > header['num_bags']).any():
+                return None
+            # the bags of both end points have to be given before the edge
+            order = np.argsort(bag_ids)
+            pos = np.minimum(np.searchsorted(bag_ids, tree_edges, sorter=order), max(len(bag_ids) - 1, 0))
+            if len(edges) and (not len(bags) or (bag_ids[order[pos]] != tree_edges).any() or
+                               (bags[order[pos]] > edges[:, None]).any()):
+                return None
+            if strict and len(edges) and len(bags) and edges[0] < bags[-1]:
+                return None
+
+            if logging.getLogger().isEnabledFor(logging.INFO):
+                for c in comments:
+                    logging.info('-' * 20 + 'INFO from decomposition reader' + '-' * 20)
+                    logging.info('%s' % ' '.join(scan.text(c).split()))
+                    logging.info('-' * 80)
+            # remaining lines (e.g., weights) are handed to the reader as str tokens, like in _from_stream
+            for l in others.tolist():
+                line = scan.tokens(l)
+                try:
+                    if not cls._reader(decomp, line):
+                        return None
+                except (ValueError, IndexError):
+                    return None
+            for bag_name, bag in zip(bag_ids.tolist(), scan.rows(bags, skip=2)):
+                decomp.bags[bag_name] = set(bag)
+        decomp._set_tree_arrays(bag_ids.tolist(), tree_edges.ravel().tolist())
+        return decomp, header
+
+    @classmethod
+    def _from_stream(cls, filename, strict=False, exact=False):
+        """
+        Reads the file (plain or compressed, see open_text) line by line. Bags and tree edges are collected in compact
+        arrays (bag ids, offsets into the concatenated bag contents, end points of the edges), other lines (e.g.,
+        weights) are handed to the reader.
+
+        :param filename: name of the file to read from
+        :param strict: strictly enforce PACE requirements for the input format
+        :param exact: see from_file
+        :return: decomposition and header
+        """
         header_seen = False
         nr = 0
 
@@ -196,14 +478,18 @@ class Decomposition(object):
             logging.critical('%s:L(%s). %s  Exiting...' % (os.path.basename(filename), nr, string))
 
         decomp = cls()
-        with open(filename, 'r') as fobj:
+        decomp.exact = exact
+        bag_ids, bag_offsets, bag_vertices = array('q'), array('q', [0]), array('q')
+        tree_edges = array('q')
+        seen = set()
+        with open_text(filename) as fobj:
             num_bags = num_vertices = 0
             header = {}
+            line = ''
             try:
                 edge_seen = False
-                for line in fobj.readlines():
+                for nr, line in enumerate(fobj, 1):
                     line = line.split()
-                    nr = nr + 1
                     # noinspection PySimplifyBooleanCheck
                     if line == []:
                         continue
@@ -216,14 +502,7 @@ class Decomposition(object):
                         if header_seen:
                             log_critical('Duplicate header.')
                             exit(2)
-                        try:
-                            header['num_bags'] = int(line[2])
-                            header['num_vertices'] = int(line[4])
-                            header.update(cls._read_header(line))
-                        except ValueError as e:
-                            logging.error(e)
-                            log_critical('Too many or too few arguments in header.')
-                            exit(2)
+                        header.update(cls._read_header_line(line, log_critical))
                         header_seen = True
                     elif line[0] == 'b':
                         if not header_seen:
@@ -239,18 +518,20 @@ class Decomposition(object):
                             log_critical('Empty bag.')
                             exit(2)
                         bag_name = int(line[1])
-                        if bag_name in decomp.bags.keys():
+                        if bag_name in seen:
                             log_critical('Duplicate bag.')
                             exit(2)
                         # TODO: implement type checking for htd|fhtd
                         # TODO: BUT NOT HERE! type checking required in 'w' line ~> _reader
                         try:
-                            decomp.bags[bag_name] = set(map(int, line[2:]))
-                        except ValueError as e:
+                            bag_vertices.extend(map(int, line[2:]))
+                        except (ValueError, OverflowError) as e:
                             log_critical("Type checking failed (expected %s)." % int)  # cls._data_type)
                             logging.critical("Full exception %s." % e)
                             exit(2)
-                        decomp.tree.add_node(bag_name)
+                        seen.add(bag_name)
+                        bag_ids.append(bag_name)
+                        bag_offsets.append(len(bag_vertices))
                     else:
                         if cls._reader(decomp, line):
                             continue
@@ -265,64 +546,207 @@ class Decomposition(object):
                             if v > header['num_bags']:
                                 log_critical("Edge label %s out of bounds (expected max %s bags)." % (v, num_bags))
                                 exit(2)
-                            if u not in decomp.bags.keys():
+                            if u not in seen:
                                 log_critical(
                                     "Edge in the tree (%s,%s) without a corresponding bag for node %s." % (u, v, u))
                                 exit(2)
-                            if v not in decomp.bags.keys():
+                            if v not in seen:
                                 log_critical(
                                     "Edge in the tree (%s,%s) without a corresponding bag for node %s." % (u, v, v))
                                 exit(2)
-                            decomp.tree.add_edge(u, v)
+                            tree_edges.extend((u, v))
                             edge_seen = True
-            except ValueError as e:
+            except (ValueError, OverflowError) as e:
                 logging.critical("Undefined input.")
                 logging.critical(e)
-                logging.warning("Output was:")
-                fobj.seek(0)
-                for line in fobj.readlines():
-                    logging.warning(line)
-                for line in traceback.format_exc().split('\n'):
-                    logging.critical(line)
+                logging.warning("Line %s was:" % nr)
+                logging.warning(' '.join(line))
+                for l in traceback.format_exc().split('\n'):
+                    logging.critical(l)
                 logging.critical('Exiting...')
                 exit(143)
-            # decomps of single bags require special treatment
             if not header_seen:
                 logging.critical('Missing header. Exiting...')
                 exit(2)
-            if len(decomp) == 1:
-                # noinspection PyUnresolvedReferences
-                decomp.tree.add_node(tuple(decomp.bags.keys())[0]) #.next())
-            if decomp.specific_valiation(decomp, header):
-                logging.critical('Decomposition specific validation failed.')
-                exit(2)
-            if len(decomp) != header['num_bags']:
-                logging.critical('Number of bags differ. Was %s expected %s.\n' % (len(decomp), header['num_bags']))
-                exit(2)
-            if decomp.num_vertices > header['num_vertices']:
-                logging.critical(
-                    'Number of vertices differ (>). Was %s expected %s.\n' % (
-                        decomp.num_vertices, header['num_vertices']))
-                exit(2)
-            if decomp.num_vertices < header['num_vertices'] and strict:
-                logging.warning(
-                    'Number of vertices differ (<). Was %s expected %s.\n' % (decomp.num_vertices, num_vertices))
-                exit(2)
-        return decomp
+        for i, bag_name in enumerate(bag_ids):
+            decomp.bags[bag_name] = set(bag_vertices[bag_offsets[i]:bag_offsets[i + 1]])
+        decomp._set_tree_arrays(bag_ids, tree_edges)
+        return decomp, header
 
-    def edges_covered(self):
-        # initialise with edges
-        # TODO: something missing here
-        #print(self.hypergraph.edges())
-        #print(self.hypergraph.edges().values())
-        #for e in self.hypergraph.edges():
-        #    print(e)
-        covered_edges = {e: False for e in self.hypergraph.edges_iter()}
+    def _holds(self, properties, parallel=False, workers=None):
+        """
+        Checks the properties of the decomposition, i.e., calls the given methods. In parallel, the checks run
+        concurrently in a process pool on a (forked, read-only) snapshot of the decomposition and the pool is
+        cancelled as soon as a property does not hold. With workers, properties that support it (see _shards) are
+        split into one shard per worker. An error of a check is raised if no property before it fails, as in the
+        sequential run, unless the check was cancelled by a failing property after it.
+
+        :param properties: list of pairs (name of the method, keyword arguments)
+        :param parallel: run the checks concurrently
+        :param workers: number of worker processes (implies parallel)
+        :return: whether all properties hold
+        """
+        # one bitset index for all checks (inherited by the workers)
+        with self._indexed():
+            if workers is not None and workers <= 1:
+                workers = None
+            if not parallel and not workers:
+                return all(getattr(self, name)(**kwargs) for name, kwargs in properties)
+            # the context is passed once per worker (not pickled at all if forked), a task is a position and a range
+            context, tasks, sharded = {}, [], set()
+            for pos, (name, kwargs) in enumerate(properties):
+                shards = self._shards(name) if workers else None
+                if shards is None:
+                    context[pos] = (name, kwargs, None)
+                    tasks.append((pos, None))
+                    continue
+                context[pos] = shards
+                sharded.add(pos)
+                size = max(1, -(-len(shards[2]) // workers))
+                tasks.extend((pos, (start, start + size)) for start in range(0, len(shards[2]), size))
+            import multiprocessing
+
+            # fork shares the snapshot with the workers without pickling it
+            ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+            errors = {}
+            pool = ctx.Pool(workers or min(len(tasks), os.cpu_count() or 1), initializer=_init_worker,
+                            initargs=(self, context))
+            try:
+                for pos, ret, error in pool.imap_unordered(_check_property, tasks):
+                    if error is not None:
+                        errors[pos] = error
+                        continue
+                    if pos in sharded and ret:
+                        # violations of a shard
+                        logging.error('Property "%s" does not hold for: %s' % (properties[pos][0], ret))
+                    elif pos in sharded or ret:
+                        continue
+                    logging.error('Property "%s" does not hold (first failure).' % properties[pos][0])
+                    # a check before the failing one raised an error, as in the sequential run (errors of checks
+                    # that did not finish before the failure are not observed)
+                    if errors and min(errors) < pos:
+                        raise errors[min(errors)]
+                    return False
+            finally:
+                pool.terminate()
+                pool.join()
+            if errors:
+                # all checks finished, the first error is the one the sequential run raises
+                raise errors[min(errors)]
+            return True
+
+    def report(self, graph, strict=True):
+        """
+        Checks all properties of the decomposition, without stopping at the first violated one, and collects their
+        violations.
+
+        :param graph: the (hyper)graph
+        :param strict: see is_tree
+        :rtype: ValidationReport
+        """
+        self.hypergraph = graph
+        report = ValidationReport(self._problem_string)
+        with self._indexed():
+            self._report(report, strict)
+        return report
+
+    def _report(self, report, strict):
+        report.add('is_tree', self.is_tree(strict))
+        report.add_edges('edges_covered', self.uncovered_edges())
+        violations = self.connectedness_violations()
+        report.add('is_connected', not violations, vertices=column(violations))
+
+    def _shards(self, name):
+        """
+        :param name: name of a property (method)
+        :return: triple (name of the method returning the violations for a list of items, keyword arguments, items)
+                 if the property can be checked in shards of items, None otherwise
+        """
+        if name == 'is_connected':
+            parent = self._parents()
+            if parent is not None:
+                return ('connectedness_violations', {'parent': parent, 'vertex2bags': self.bag_occuences()},
+                        list(self.hypergraph.nodes()))
+        return None
+
+    def bitset_index(self):
+        """
+        :return: triple (Bitsets over the vertices of the hypergraph and the bags, dict tree node -> bitmask of the bag,
+                 dict hyperedge id -> bitmask of the hyperedge), built once per validation (see _indexed)
+        """
+        if self._index is not None:
+            return self._index
+        hg = self.hypergraph
+        bits = Bitsets(chain(hg.nodes(), chain.from_iterable(self.bags.values())))
+        return (bits, {t: bits.mask(bag) for t, bag in self.bags.items()},
+                {e: bits.mask(vertices) for e, vertices in hg.edges().items()})
+
+    @contextmanager
+    def _indexed(self):
+        """
+        Shares one bitset index (see bitset_index) between the checks of a validation in bitset mode.
+        """
+        if not self.bitsets or self._index is not None:
+            yield
+            return
+        self._index = self.bitset_index()
+        try:
+            yield
+        finally:
+            self._index = None
+
+    def uncovered_edges(self, vertex2bags=None):
+        """
+        For every hyperedge, only the bags containing its least frequent vertex are candidates; the candidates are
+        intersected with the bags of the remaining vertices (in the order of their frequency). In bitset mode, the bags
+        containing a vertex are a bitmask over the tree nodes and a hyperedge is covered iff the bitmasks of its
+        vertices intersect.
+
+        :param vertex2bags: vertex -> bags containing the vertex (see bag_occuences), not used in bitset mode
+        :return: hyperedges of the hypergraph that are not covered by any bag
+        """
+        if self.bitsets:
+            # the bits of a vertex are the positions of the bags containing it
+            size = len(self.bags) // 8 + 1
+            buffers = defaultdict(lambda: bytearray(size))
+            for pos, bag in enumerate(self.bags.values()):
+                byte, bit = pos >> 3, 1 << (pos & 7)
+                for v in bag:
+                    buffers[v][byte] |= bit
+            bagmasks = {v: int.from_bytes(buf, 'little') for v, buf in buffers.items()}
+        elif vertex2bags is None:
+            vertex2bags = self.bag_occuences()
+        empty = frozenset()
+        ret = []
         for e in self.hypergraph.edges_iter():
-            if not any(set(e) <= bag for bag in self.bags.values()):
-                logging.error('Edge "%s" is not covered in any bag.' % str(e))
-                return False
-        return True
+            if not e:
+                if not self.bags:
+                    ret.append(e)
+                continue
+            if self.bitsets:
+                covering = bagmasks.get(e[0], 0)
+                for v in e:
+                    if not covering:
+                        break
+                    covering &= bagmasks.get(v, 0)
+                if not covering:
+                    ret.append(e)
+                continue
+            occurences = sorted((vertex2bags.get(v, empty) for v in set(e)), key=len)
+            candidates = occurences[0]
+            for bags in occurences[1:]:
+                if not candidates:
+                    break
+                candidates = candidates & bags
+            if not candidates:
+                ret.append(e)
+        return ret
+
+    def edges_covered(self):
+        uncovered = self.uncovered_edges()
+        for e in uncovered:
+            logging.error('Edge "%s" is not covered in any bag.' % str(e))
+        return not uncovered
 
     def is_tree(self, strict=True):
         ret = len(self.tree) == 0 or nx.is_tree(self.tree)
@@ -339,29 +763,95 @@ class Decomposition(object):
         for n, bag in self.bags.items():
             for v in bag:
                 vertex2bags[v].add(n)
-        logging.debug('Bag occurences yields: %s' % vertex2bags)
+        logging.debug('Bag occurences yields: %s', vertex2bags)
         return vertex2bags
 
+    def _parents(self, roots=()):
+        """
+        Roots every component of the (undirected) tree at an arbitrary node.
+
+        :param roots: nodes that become roots of their components (before any other node)
+        :return: dict node -> parent node (None for roots) or None if the undirected tree contains a cycle
+        """
+        tree = self.tree
+        if tree.is_directed():
+            neighbors = lambda n: chain(tree.successors(n), tree.predecessors(n))
+        else:
+            neighbors = tree.neighbors
+        parent = {}
+        for root in chain(roots, tree.nodes()):
+            if root in parent:
+                continue
+            parent[root] = None
+            stack = [root]
+            while stack:
+                n = stack.pop()
+                for m in neighbors(n):
+                    if m not in parent:
+                        parent[m] = n
+                        stack.append(m)
+        # a spanning forest uses all edges iff the undirected tree is a forest (self loops do not matter)
+        edges = {frozenset(e) for e in tree.edges() if e[0] != e[1]}
+        if len(edges) != sum(1 for p in parent.values() if p is not None):
+            return None
+        return parent
+
+    def connectedness_violations(self, vertices=None, parent=None, vertex2bags=None):
+        """
+        Running intersection property: the bags containing a vertex induce a connected subtree. In a rooted tree,
+        this holds iff exactly one bag containing the vertex has a parent bag that does not contain it (the root of
+        the subtree), which is checked in O(sum of bag sizes).
+
+        :param vertices: vertices to check (default: all vertices of the hypergraph)
+        :param parent: rooted tree (see _parents), computed if omitted
+        :param vertex2bags: bags containing a vertex (see bag_occuences), computed if omitted and required
+        :return: vertices that violate the property (including vertices that occur in no bag)
+        """
+        if parent is None:
+            parent = self._parents()
+        if parent is None:
+            # not a forest (e.g., a DAG in non-strict mode), check the induced subgraphs
+            if vertex2bags is None:
+                vertex2bags = self.bag_occuences()
+            ret = []
+            for v in self.hypergraph.nodes() if vertices is None else vertices:
+                SG = self.tree.subgraph(vertex2bags.get(v, ()))
+                if len(SG) == 0 or not nx.is_connected(SG.to_undirected()):
+                    ret.append(v)
+            return ret
+        empty = frozenset()
+        if vertices is not None:
+            if vertex2bags is None:
+                vertex2bags = self.bag_occuences()
+            ret = []
+            for v in vertices:
+                count = 0
+                for n in vertex2bags.get(v, empty):
+                    if n in parent and (parent[n] is None or v not in self.bags.get(parent[n], empty)):
+                        count += 1
+                if count != 1:
+                    ret.append(v)
+            return ret
+        count = defaultdict(int)
+        for n, p in parent.items():
+            pbag = empty if p is None else self.bags.get(p, empty)
+            for v in self.bags.get(n, empty):
+                if v not in pbag:
+                    count[v] += 1
+        return [v for v in self.hypergraph.nodes() if count.get(v, 0) != 1]
+
     def is_connected(self):
+        violations = self.connectedness_violations()
+        if not violations:
+            return True
         vertex2bags = self.bag_occuences()
-        # print self.hypergraph.number_of_edges()
-        for v in self.hypergraph.nodes():
-            logging.debug("vertex %s" % v)
-            SG = self.tree.subgraph(vertex2bags[v])
-            if not nx.is_connected(SG.to_undirected()):
+        for v in violations:
+            if v not in vertex2bags:
+                logging.error('Vertex "%s" does not occur in any bag.' % v)
+            else:
                 logging.error('Subgraph induced by vertex "%s" is not connected' % v)
-                string = BytesIO()
-                nx.write_multiline_adjlist(SG, string)
                 logging.error('Involved bags: %s' % vertex2bags[v])
-                logging.error('Nodes of the hypergraph (should be the same): %s' % SG.nodes())
-                logging.error('Begin Adjacency Matrix')
-                # we skip comments from networkx
-                for line in TextIOWrapper(string, encoding='utf-8').readlines()[3:-1]:
-                    logging.error('%s' % line)
-                #assert(False)
-                logging.error('End Adjacency Matrix')
-                return False
-        return True
+        return False
 
     @property
     def num_vertices(self):
@@ -376,6 +866,7 @@ class Decomposition(object):
         raise NotImplementedError("abstract method -- subclass must override")
 
     def relabel(self, substitution, substitution_edges):
+        self._invalidate()
         self.bags = relab.relabel_dict(self.bags, substitution, typ=set)
         # print self.bags
         # assert(len(self.bags) == 0)
@@ -445,6 +936,8 @@ class Decomposition(object):
 
     @staticmethod
     def layouting(layout, m):
+        from networkx.drawing.nx_agraph import graphviz_layout
+
         pos = graphviz_layout(m)
         if layout == 1:
             pos = graphviz_layout(m)
@@ -35,7 +35,7 @@ class FractionalHypertreeDecomposition(GeneralizedHypertreeDecomposition):
 
         logging.debug("==== Computed Fhtd: ====")
         logging.debug("Fhtd: edges=%s ; bags=%s; weights=%s" % (fhtd.T.edges(), fhtd.chi, fhtd.hyperedge_function))
-        logging.info("WIDTH = %s" % fhtd.width())
+        logging.info("WIDTH = %s" % fhtd.function_width)
 
         # TODO: simplify decomposition
 
@@ -70,10 +70,10 @@ class FractionalHypertreeDecomposition(GeneralizedHypertreeDecomposition):
 
     # TODO: reading allow floats as well insteat of just integers
     # TODO: technically the same as ghtd, but we skip the integer check
-    def validate(self, graph, strict=True):
+    def validate(self, graph, strict=True, parallel=False, workers=None):
         self.hypergraph = graph
-        if self.is_tree(
-                strict=strict) and self.edges_covered() and self.is_connected() and self.edge_function_holds():
+        if self._holds([('is_tree', {'strict': strict}), ('edges_covered', {}), ('is_connected', {}),
+                        ('edge_function_holds', {})], parallel=parallel, workers=workers):
             return True
         else:
             logging.error('ERROR in Tree Decomposition.')
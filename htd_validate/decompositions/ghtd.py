@@ -1,14 +1,16 @@
 import logging
 import sys
-from collections import defaultdict
 from decimal import Decimal
+from functools import reduce
 from io import StringIO
 from itertools import count
+from math import gcd
 from operator import itemgetter
 
-import htd_validate.utils.relabelling as relab
 import networkx as nx
 from htd_validate.decompositions import Decomposition
+from htd_validate.decompositions.report import column
+from htd_validate.decompositions.weights import FLOAT, INT, HyperedgeFunction
 from htd_validate.utils import Hypergraph
 from fractions import Fraction
 
@@ -29,10 +31,9 @@ class GeneralizedHypertreeDecomposition(Decomposition):
         if not epsilon:
             epsilon = Fraction(0.001)
         self.epsilon = Fraction(epsilon)
-        if not hyperedge_function:
-            self.hyperedge_function = defaultdict(dict)
-        else:
-            self.hyperedge_function = hyperedge_function
+        self.hyperedge_function = HyperedgeFunction(INT if self._data_type is int else FLOAT, hyperedge_function)
+        # in exact mode, the weights are integers and lambda_t(e) = hyperedge_function[t][e] / weight_scale
+        self.weight_scale = 1
         if not hypergraph:
             hypergraph = Hypergraph()
 
@@ -47,7 +48,7 @@ class GeneralizedHypertreeDecomposition(Decomposition):
         self.hyperedge_function[t] = td.weights[old_t]
 
     def _connect(self, t, edge_id):
-        self.hyperedge_function[t][edge_id] = 1.0
+        self.hyperedge_function.set(t, edge_id, 1.0)
 
     def _replay(self, node, bag, weight):
         sol = {}
@@ -57,9 +58,7 @@ class GeneralizedHypertreeDecomposition(Decomposition):
         self.graph.fractional_cover(bag, solution=sol, opt=weight)
         # print self.hyperedge_function, node
         for i, v in sol.items():
-            if node not in self.hyperedge_function:
-                self.hyperedge_function[node] = {}
-            self.hyperedge_function[node][i] = v
+            self.hyperedge_function.set(node, i, v)
         # print self.hyperedge_function[node]
         # TODO: improve check of ghtd.py such that we do not stupidely have to set everything else to 0
         # for k in self.graph.edges():
@@ -67,8 +66,7 @@ class GeneralizedHypertreeDecomposition(Decomposition):
         #        self.hyperedge_function[node][k] = 0
 
     def _relabel(self, substitution_edges):
-        self.hyperedge_function = {node: relab.relabel_dict(he, substitution_keys=substitution_edges)
-                                   for node, he in self.hyperedge_function.items()}
+        self.hyperedge_function.relabel_edges(substitution_edges)
 
     @classmethod
     def _read_header(cls, line):
@@ -77,6 +75,7 @@ class GeneralizedHypertreeDecomposition(Decomposition):
             exit(2)
 
         ret = {'max_function_value': cls._data_type(line[3]),
+               'max_function_text': line[3],
                'num_vertices': int(line[4]),
                'num_hyperedges': int(line[5])}
 
@@ -88,10 +87,41 @@ class GeneralizedHypertreeDecomposition(Decomposition):
     @classmethod
     def _reader(cls, decomp, line):
         if line[0] == 'w':
-            decomp.hyperedge_function[int(line[1])][int(line[2])] = cls._data_type(line[3])
+            if decomp.exact and cls._data_type is not int:
+                decomp._append_exact(int(line[1]), int(line[2]), line[3])
+            else:
+                decomp.hyperedge_function.append(int(line[1]), int(line[2]), cls._data_type(line[3]))
             return True
         return False
 
+    def _append_exact(self, t, e, value):
+        """
+        Appends the weight value (e.g., a decimal string) as integer scaled by weight_scale (see _scaled).
+        """
+        if not self.hyperedge_function and self.hyperedge_function.typecode == FLOAT:
+            # scaled weights are integers
+            self.hyperedge_function = HyperedgeFunction(INT)
+        self.hyperedge_function.append(t, e, self._scaled(value))
+
+    def _scaled(self, value):
+        """
+        :param value: weight, e.g., a decimal string
+        :return: the weight as integer scaled by weight_scale, which becomes the least common multiple of the
+                 denominators (the stored weights are rescaled if it grows)
+        """
+        w = Fraction(value)
+        if self.weight_scale % w.denominator:
+            factor = w.denominator // gcd(self.weight_scale, w.denominator)
+            self.hyperedge_function.scale(factor)
+            self.weight_scale *= factor
+        return w.numerator * (self.weight_scale // w.denominator)
+
+    def _unscaled(self, w):
+        """
+        :return: the weight (or sum of weights) w, as Fraction in exact mode
+        """
+        return Fraction(w, self.weight_scale) if self.exact else w
+
     @staticmethod
     def specific_valiation(decomp, header):
         if len(decomp.hyperedge_function) != header['num_bags']:
@@ -99,10 +129,11 @@ class GeneralizedHypertreeDecomposition(Decomposition):
                 'Too many mappings. Found %s expected %s \n' % (
                     len(decomp.hyperedge_function), header['num_bags']))
             exit(2)
-        if header['max_function_value'] != decomp.width():
+        given = Fraction(header['max_function_text']) if decomp.exact else header['max_function_value']
+        if given != decomp.function_width:
             logging.error(
                 'Given width is wrong. Computed width %s, given width %s \n' % (
-                    decomp.width(), header['max_function_value']))
+                    decomp.function_width, header['max_function_value']))
             exit(2)
 
     # TODO: detect format from file header
@@ -115,7 +146,7 @@ class GeneralizedHypertreeDecomposition(Decomposition):
         # {k: v for k, v in d.items() if v > 0}
         logging.debug("Computing hyperedges where v='%s' occurs..." % v)
         logging.debug("Hyperedges %s" % self.hypergraph.edges())
-        edge_ids = filter(lambda e: v in self.hypergraph.get_edge(e), self.hypergraph.edge_ids_iter())
+        edge_ids = self.hypergraph.incident_edge_ids(v)
         logging.debug("Edge_ids are %s" % edge_ids)
         return edge_ids
 
@@ -131,79 +162,238 @@ class GeneralizedHypertreeDecomposition(Decomposition):
         return ret
 
     def _B(self, t):
-        logging.info("Computing bag condition B(lambda_t) for node %s" % t)
-        ret = set()
-        # {v \in V(H) : (sum_{e \in E(H), v \in e} lambda_u(e)) \geq 1 } =>
-        # {v : v \in V(H), (sum{lambda_u(e) : e \in E(H), v \in e}) \geq 1 }
-        for v in self.hypergraph.nodes():
-            logging.info('v = %s' % v)
-            # e \in E(H), v \in e: self._edge_ids_where_v_occurs(v)
-            # lambda_u_e_v: {lambda_u(e) : e \in E(H), v \in e}
-            lambda_u_e_v = list(map(lambda e: self.hyperedge_function[t][e] if e in self.hyperedge_function[t] else 0,
-                                    self._edge_ids_where_v_occurs(v)))
-            logging.info('lambda(%s) = %s' % (t, lambda_u_e_v))
-            logging.info('sum(%s) = %s' % (t, str(sum(lambda_u_e_v))))
-            # logging.error(lambda_u_e_v)
-            # logging.error(list(map(self.fraction2decimal, lambda_u_e_v)))
-            # bag_sum = sum(map(self.fraction2decimal, lambda_u_e_v)) + self.epsilon
-            bag_sum = sum(lambda_u_e_v) + self.epsilon
-            logging.info("")
-            # bag_sum = sum(map(lambda x: Decimal(x.numerator/x.denominator), lambda_u_e_v)) + Decimal(self.epsilon)
-            # logging.error(f"Bag sum(v={v})={bag_sum}")
-            # exit(1)
-
-            logging.info("sum_prec(%s)=%s" % (v, str(bag_sum)))
-            logging.info("  @Epsilon=%s" % self.epsilon)
-            # REQUIRED DUE TO FLOATING POINT ISSUES
-            # see: https://docs.python.org/2/tutorial/floatingpoint.html
-            if bag_sum >= 1:
-                ret.add(v)
-        logging.info("B(lambda_%s) = '%s'" % (t, ret))
+        return self._coverage([t])[t]
+
+    def _threshold(self):
+        """
+        :return: pair (epsilon, one) such that a sum s of weights covers a vertex iff s + epsilon >= one, i.e., the
+                 scaled integer weights are compared exactly in exact mode
+        """
+        return (0, self.weight_scale) if self.exact else (self.epsilon, 1)
+
+    def _coverage(self, nodes=None):
+        """
+        Bag condition B(lambda_t) = {v in V(H) : sum{lambda_t(e) : e in E(H), v in e} + epsilon >= 1} for several
+        tree nodes at once (without epsilon in exact mode, see _threshold).
+
+        Row t of the (sparse) product of the weight matrix (tree nodes x hyperedges) and the incidence matrix
+        (hyperedges x vertices) is non-zero only on the vertices of the hyperedges with a weight at t, so only these
+        vertices are summed up. The remaining vertices only pass the threshold if epsilon >= 1. Weights of a vertex are
+        summed in the order of the hyperedges of the hypergraph (like a sum over E(H)), as floats are not associative.
+
+        :param nodes: tree nodes (default: all)
+        :return: dict tree node t -> B(lambda_t)
+        """
+        hg = self.hypergraph
+        edges = hg.edges()
+        epsilon, one = self._threshold()
+        # vertices without weighted hyperedges
+        zero = 0 + epsilon >= one
+        incident = self._incidence()
+        ret = {}
+        for t in self.tree.nodes() if nodes is None else nodes:
+            weights = self.hyperedge_function.row(t)
+            candidates = set()
+            for e in weights:
+                if e in edges:
+                    candidates.update(edges[e])
+            B = set(hg.nodes()) if zero else set()
+            for v in candidates:
+                # REQUIRED DUE TO FLOATING POINT ISSUES
+                # see: https://docs.python.org/2/tutorial/floatingpoint.html
+                if sum(weights[e] for e in incident(v) if e in weights) + epsilon >= one:
+                    B.add(v)
+                else:
+                    B.discard(v)
+            logging.info("B(lambda_%s) = '%s'", t, B)
+            ret[t] = B
         return ret
 
+    def _incidence(self):
+        """
+        :return: function v -> incident hyperedges of v in the order of the hyperedges (the incidence index is a set)
+        """
+        hg = self.hypergraph
+        position = {e: i for i, e in enumerate(hg.edge_ids_iter())}
+        incident = {}
+
+        def ret(v):
+            try:
+                return incident[v]
+            except KeyError:
+                inc = incident[v] = sorted(hg.incident_edge_ids(v), key=position.__getitem__)
+                return inc
+        return ret
+
+    def _coverage_masks(self, nodes=None, index=None):
+        """
+        B(lambda_t) as bitmasks (see _coverage and bitset_index).
+
+        Without negative weights, a float sum of weights does not decrease by adding a weight, so the hyperedges whose
+        weight alone passes the threshold are contained in B(lambda_t) and are added as a whole. Only the remaining
+        vertices of weighted hyperedges are summed up.
+
+        :param nodes: tree nodes (default: all)
+        :param index: bitset index (see bitset_index), computed if omitted
+        :return: dict tree node t -> bitmask of B(lambda_t)
+        """
+        bits, _, edge_masks = self.bitset_index() if index is None else index
+        if nodes is None:
+            nodes = self.tree.nodes()
+        epsilon, one = self._threshold()
+        if 0 + epsilon >= one or any(w < 0 for t in nodes for w in self.hyperedge_function[t].values()):
+            return {t: bits.mask(B) for t, B in self._coverage(nodes).items()}
+        incident = self._incidence()
+        # whether a weight alone passes the threshold, per weight (and type, as epsilon is added exactly to integers and
+        # fractions but as float to floats)
+        passes = {}
+        ret = {}
+        for t in nodes:
+            weights = self.hyperedge_function.row(t)
+            covered = partial = 0
+            for e, w in weights.items():
+                if e not in edge_masks:
+                    continue
+                key = w.__class__, w
+                try:
+                    full = passes[key]
+                except KeyError:
+                    full = passes[key] = w + epsilon >= one
+                if full:
+                    covered |= edge_masks[e]
+                else:
+                    partial |= edge_masks[e]
+            partial &= ~covered
+            if partial:
+                covered |= bits.mask([v for v in bits.vertices(partial)
+                                      if sum(weights[e] for e in incident(v) if e in weights) + epsilon >= one])
+            ret[t] = covered
+        return ret
+
+    def _conditions(self):
+        """
+        :return: B(lambda_t) of all tree nodes t (see _coverage), as bitmasks in bitset mode (see _coverage_masks)
+        """
+        return self._coverage_masks() if self.bitsets else self._coverage()
+
     def max_bag_size(self):
-        ret = 0
-        for b in self.hyperedge_function.values():
-            ret = max(ret, sum(b.values()))
+        weights = self.hyperedge_function
+        return self._aggregate('max_bag_size', lambda: self._unscaled(max(map(weights.row_sum, weights), default=0)))
+
+    def edge_function_violations(self, nodes=None, B=None, index=None):
+        """
+        :param nodes: tree nodes to check (default: all)
+        :param B: bag conditions B(lambda_t) of the tree nodes (see _conditions), computed if omitted
+        :param index: bitset index (see bitset_index), computed if omitted in bitset mode
+        :return: tree nodes t whose bag is not contained in B(lambda_t)
+        """
+        if nodes is None:
+            nodes = self.tree.nodes()
+        if self.bitsets:
+            if index is None:
+                index = self.bitset_index()
+            masks = index[1]
+            if B is None:
+                B = self._coverage_masks(nodes, index)
+        elif B is None:
+            B = self._coverage(nodes)
+        ret = []
+        for t in nodes:
+            logging.debug("BAGS: %s / %s", self.bags[t], B[t])
+            if self.bitsets:
+                holds = not masks[t] & ~B[t]
+            else:
+                holds = self.bags[t] <= B[t]
+            if not holds:
+                ret.append(t)
         return ret
 
-    def edge_function_holds(self):
+    def edge_function_holds(self, B=None):
+        """
+        :param B: bag conditions B(lambda_t) of all tree nodes (see _conditions), computed if omitted
+        """
+        if B is None:
+            B = self._conditions()
+        violations = self.edge_function_violations(B=B)
+        bits = self.bitset_index()[0] if self.bitsets and violations else None
+        for t in violations:
+            B_t = B[t] if bits is None else bits.vertices(B[t])
+            logging.error('Edge function property does not hold for node "%s"' % t)
+            logging.error(
+                'Bag contains: "%s" while vertices from edge functions were "%s"' % (self.bags[t], B_t))
+        return not violations
+
+    def bag_condition_violations(self, B=None):
+        """
+        :param B: bag conditions B(lambda_t) of all tree nodes (see _coverage), computed if omitted
+        :return: triple of lists (tree nodes t, vertices v in the bag of t but not in B(lambda_t), deficits
+                 1 - sum{lambda_t(e) : v in e} of v)
+        """
+        if B is None:
+            B = self._coverage()
+        incident = self._incidence()
+        _, one = self._threshold()
+        nodes, vertices, deficits = [], [], []
         for t in self.tree.nodes():
-            logging.debug(f"BAGS: {self.bags[t]} / {self._B(t)}")
-            if not (self.bags[t] <= self._B(t)):
-                logging.error('Edge function property does not hold for node "%s"' % t)
-                logging.error(
-                    'Bag contains: "%s" while vertices from edge functions were "%s"' % (self.bags[t], self._B(t)))
-                return False
-        return True
-
-    def validate(self, graph, strict=True):
+            weights = self.hyperedge_function.row(t)
+            for v in self.bags[t] - B[t]:
+                nodes.append(t)
+                vertices.append(v)
+                deficits.append(float(self._unscaled(one - sum(weights[e] for e in incident(v) if e in weights))))
+        return nodes, vertices, deficits
+
+    def _report(self, report, strict):
+        super(GeneralizedHypertreeDecomposition, self)._report(report, strict)
+        self._report_conditions(report, self._coverage())
+
+    def _report_conditions(self, report, B):
+        """
+        Adds the properties that depend on the bag conditions B(lambda_t) (see _coverage) to the report.
+        """
+        nodes, vertices, deficits = self.bag_condition_violations(B)
+        report.add('edge_function_holds', not nodes, nodes=column(nodes), vertices=column(vertices),
+                   deficits=column(deficits, 'd'))
+
+    def _shards(self, name):
+        if name == 'edge_function_holds':
+            # the bitset index is built once and shared with the shards
+            kwargs = {'index': self.bitset_index()} if self.bitsets else {}
+            return 'edge_function_violations', kwargs, list(self.tree.nodes())
+        return super(GeneralizedHypertreeDecomposition, self)._shards(name)
+
+    def validate(self, graph, strict=True, parallel=False, workers=None):
         self.hypergraph = graph
-        if self.is_tree(strict=strict) and self.edges_covered() and self.is_connected() and self.edge_function_holds():
+        if self._holds([('is_tree', {'strict': strict}), ('edges_covered', {}), ('is_connected', {}),
+                        ('edge_function_holds', {})], parallel=parallel, workers=workers):
             return True
         else:
             logging.error('ERROR in Tree Decomposition.')
             return False
 
     def write(self, ostream=sys.stdout):
-        tree_mapping = {org_id: id for id, org_id in izip(count(start=1), self.tree.nodes())}
+        def value(w):
+            # weights are written as decimals, also in exact mode
+            return float(w) if isinstance(w, Fraction) and w.denominator != 1 else w
+
+        tree_mapping = {org_id: id for id, org_id in zip(count(start=1), self.tree.nodes())}
         tree = nx.relabel_nodes(self.tree, tree_mapping, copy=True)
         num_vertices = reduce(lambda x, y: max(x, max(y or [0])), self.bags.values(), 0)
         num_hyperedges = len(self.hypergraph.edges())
         ostream.write(
-            's %s %s %s %s %s\n' % (self._problem_string, len(self.bags), self.width(), num_vertices, num_hyperedges))
+            's %s %s %s %s %s\n' % (self._problem_string, len(self.bags), value(self.width()), num_vertices,
+                                    num_hyperedges))
 
         relabeled_bags = {tree_mapping[k]: v for k, v in self.bags.items()}
         relabeled_bags = sorted(relabeled_bags.items(), key=itemgetter(0))
         for bag_id, bag in relabeled_bags:
             ostream.write('b %s %s\n' % (bag_id, ' '.join(map(str, bag))))
-        for u, v in tree.edges_iter():
+        for u, v in tree.edges():
             ostream.write('%s %s\n' % (u, v))
         ostream.flush()
 
         for t in self.bags.keys():
-            for e in self.hyperedge_function:
-                ostream.write('w %s %s %s\n' % (t, e, self.hyperedge_function[t][e]))
+            for e, w in self.hyperedge_function.row(t).items():
+                ostream.write('w %s %s %s\n' % (tree_mapping[t], e, value(self._unscaled(w))))
         ostream.flush()
 
     def __str__(self):
@@ -211,12 +401,23 @@ class GeneralizedHypertreeDecomposition(Decomposition):
         self.write(string)
         return string.getvalue()
 
-    def width(self):
+    @property
+    def function_width(self):
+        """
+        Largest sum of the weights of a tree node, computed once (see Decomposition._aggregate).
+        """
+        return self._aggregate('function_width', self._width)
+
+    def _width(self):
         weight = [0]  # special case for the empty graph
-        for t in self.tree.nodes():
-            weight.append(sum(self.hyperedge_function[t].values()))
-        logging.info("Width is '%s'." % max(weight))
-        return max(weight)
+        for t in self.bags:
+            weight.append(self.hyperedge_function.row_sum(t))
+        ret = self._unscaled(max(weight))
+        logging.info("Width is '%s'." % ret)
+        return ret
+
+    def width(self):
+        return self.function_width
 
     @property
     def problem_string(self):
@@ -1,7 +1,11 @@
 import logging
 from io import StringIO
+from itertools import chain
+
+import networkx as nx
 
 from htd_validate.decompositions import GeneralizedHypertreeDecomposition
+from htd_validate.decompositions.report import column
 from htd_validate.utils import Hypergraph
 from networkx.algorithms.traversal.depth_first_search import dfs_tree
 
@@ -26,36 +30,139 @@ class HypertreeDecomposition(GeneralizedHypertreeDecomposition):
     def __len__(self):
         return len(self.bags)
 
-    def inverse_edge_function_holds(self):
+    def _subtree_vertices(self):
+        """
+        Vertices in the bags of the subtree T_u (the nodes reachable from u) for every tree node u, computed bottom-up
+        in a single pass. In a (directed) forest, the sets of the children are merged small-to-large into the largest
+        one, hence a yielded set is reused by the parent and has to be consumed before advancing the generator.
+
+        :return: generator of pairs (u, vertices in the bags of T_u)
+        """
+        tree = self.tree
+        try:
+            order = list(nx.topological_sort(tree))
+        except (nx.NetworkXError, nx.NetworkXUnfeasible):
+            # undirected or cyclic, no bottom-up order
+            for u in tree.nodes():
+                yield u, set(chain.from_iterable(self.bags[t] for t in dfs_tree(tree, u)))
+            return
+        forest = all(d <= 1 for _, d in tree.in_degree())
+        below = {}
+        for u in reversed(order):
+            if forest:
+                children = [below.pop(c) for c in tree.successors(u)]
+                ret = max(children, key=len) if children else set()
+                for S in children:
+                    if S is not ret:
+                        ret |= S
+            else:
+                # shared descendants in a DAG, sets cannot be reused
+                ret = set()
+                for c in tree.successors(u):
+                    ret |= below[c]
+            ret |= self.bags[u]
+            below[u] = ret
+            yield u, ret
+
+    def _subtree_masks(self, masks):
+        """
+        :param masks: dict tree node -> bitmask of the bag (see bitset_index)
+        :return: dict u -> bitmask of the vertices in the bags of the subtree T_u
+        """
+        tree = self.tree
+        try:
+            order = list(nx.topological_sort(tree))
+        except (nx.NetworkXError, nx.NetworkXUnfeasible):
+            ret = {}
+            for u in tree.nodes():
+                ret[u] = 0
+                for t in dfs_tree(tree, u):
+                    ret[u] |= masks[t]
+            return ret
+        ret = {}
+        for u in reversed(order):
+            ret[u] = masks[u]
+            for c in tree.successors(u):
+                ret[u] |= ret[c]
+        return ret
+
+    def inverse_edge_function_holds(self, B=None):
+        """
+        :param B: bag conditions B(lambda_t) of all tree nodes (see _conditions), computed if omitted
+        """
         logging.info('=' * 80)
         logging.info('Inverse edge function property')
         logging.info('=' * 80)
-        for u in self.tree.nodes():
-            T_u = dfs_tree(self.tree, u)
-            vertices_in_bags_below_u = set()
-            for t in T_u.nodes():
-                vertices_in_bags_below_u.update(self.bags[t])
-            if not (vertices_in_bags_below_u & self._B(u) <= self.bags[u]):
-                logging.error('Inverse edge function property does not hold for node "%s"' % u)
-                logging.error('Bag of the subtree induced at "%s" contained "%s"' % (u, vertices_in_bags_below_u))
-                logging.error('Vertices returned from the edge function are "%s"' % self._B(u))
-                logging.error('Bag content is: %s' % self.bags[u])
-                logging.error(
-                    'Hence, not (vertices_in_bags_below_u & self._B(u) <= self.bags[u]) does not hold for node %s.' % u)
-                return False
+        if B is None:
+            B = self._conditions()
+        if self.bitsets:
+            bits, masks, _ = self.bitset_index()
+            below = self._subtree_masks(masks)
+            for u in self.tree.nodes():
+                if below[u] & B[u] & ~masks[u]:
+                    return self.__inverse_edge_function_error(u, bits.vertices(below[u]), bits.vertices(B[u]))
+            return self.__inverse_edge_function_success()
+        for u, vertices_in_bags_below_u in self._subtree_vertices():
+            bag, B_u = self.bags[u], B[u]
+            if len(B_u) <= len(vertices_in_bags_below_u):
+                holds = all(v in bag for v in B_u if v in vertices_in_bags_below_u)
+            else:
+                holds = all(v in bag for v in vertices_in_bags_below_u if v in B_u)
+            if not holds:
+                return self.__inverse_edge_function_error(u, vertices_in_bags_below_u, B_u)
+        return self.__inverse_edge_function_success()
+
+    def inverse_edge_function_violations(self, B=None):
+        """
+        :param B: bag conditions B(lambda_t) of all tree nodes (see _coverage), computed if omitted
+        :return: pair of lists (tree nodes u, vertices v in B(lambda_u) and in a bag of the subtree T_u but not in the
+                 bag of u)
+        """
+        if B is None:
+            B = self._coverage()
+        nodes, vertices = [], []
+        for u, vertices_in_bags_below_u in self._subtree_vertices():
+            for v in B[u] & vertices_in_bags_below_u - self.bags[u]:
+                nodes.append(u)
+                vertices.append(v)
+        return nodes, vertices
+
+    def _report_conditions(self, report, B):
+        super(HypertreeDecomposition, self)._report_conditions(report, B)
+        nodes, vertices = self.inverse_edge_function_violations(B)
+        report.add('inverse_edge_function_holds', not nodes, nodes=column(nodes), vertices=column(vertices))
+
+    def __inverse_edge_function_error(self, u, vertices_in_bags_below_u, B_u):
+        logging.error('Inverse edge function property does not hold for node "%s"' % u)
+        logging.error('Bag of the subtree induced at "%s" contained "%s"' % (u, vertices_in_bags_below_u))
+        logging.error('Vertices returned from the edge function are "%s"' % B_u)
+        logging.error('Bag content is: %s' % self.bags[u])
+        logging.error(
+            'Hence, not (vertices_in_bags_below_u & self._B(u) <= self.bags[u]) does not hold for node %s.' % u)
+        return False
+
+    @staticmethod
+    def __inverse_edge_function_success():
         logging.info('Inverse edge function property *holds*.')
         logging.info('=' * 80)
         return True
 
-    def validate(self, graph, strict=True):
+    def validate(self, graph, strict=True, parallel=False, workers=None):
         self.hypergraph = graph
-        if self.is_tree(
-                strict=strict) and self.edges_covered() and self.is_connected() and self.edge_function_holds() and \
-                self.inverse_edge_function_holds():
-            return True
+        properties = [('is_tree', {'strict': strict}), ('edges_covered', {}), ('is_connected', {})]
+        if parallel or workers:
+            if self._holds(properties + [('edge_function_holds', {}), ('inverse_edge_function_holds', {})],
+                           parallel=True, workers=workers):
+                return True
         else:
-            logging.error('ERROR in Tree Decomposition.')
-            return False
+            # the bitset index and B(lambda_t) are shared by all properties
+            with self._indexed():
+                if self._holds(properties):
+                    B = self._conditions()
+                    if self.edge_function_holds(B) and self.inverse_edge_function_holds(B):
+                        return True
+        logging.error('ERROR in Tree Decomposition.')
+        return False
 
     def __str__(self):
         string = StringIO()
@@ -0,0 +1,308 @@
+#!/usr/bin/env false
+import logging
+from collections import defaultdict
+
+from htd_validate.decompositions import GeneralizedHypertreeDecomposition, HypertreeDecomposition
+from htd_validate.utils import Hypergraph
+
+
+class IncrementalValidator(object):
+    """
+    Keeps the properties of a decomposition up to date while it is changed a few bags or weights at a time, instead of
+    validating it from scratch (see Decomposition.validate).
+
+    The tree is rooted once (see Decomposition._parents). A vertex satisfies the running intersection property iff
+    exactly one bag containing it has a parent bag that does not contain it, a hyperedge is covered iff it is contained
+    in at least one bag and, for (generalized, fractional) hypertree decompositions, a vertex of the bag of t is in
+    B(lambda_t) iff the sum of the weights of t of its hyperedges passes the threshold (see
+    GeneralizedHypertreeDecomposition._threshold). Hence, adding a vertex v to (or removing it from) the bag of t costs
+    O(number of children of t + size of the hyperedges incident to v) and setting a weight lambda_t(e) costs O(|e|)
+    amortised: the weight is updated in the overlay of the hyperedge function, which copies the row of t on its first
+    update (see HyperedgeFunction.set), and in exact mode, a growing common denominator rescales all weights and sums.
+
+    Float weights are summed in the order of the changes, rounding may differ from validate by a few ulps (far below
+    epsilon); in exact mode (see Decomposition.exact) the sums are exact. The inverse edge function property of
+    hypertree decompositions depends on whole subtrees and is checked by is_valid from the maintained B(lambda_t).
+    """
+
+    def __init__(self, decomposition, hypergraph):
+        """
+        :param decomposition: the decomposition, its tree has to be a forest (changed in place)
+        :param hypergraph: the (hyper)graph
+        :raises ValueError: if the tree contains a cycle
+        """
+        self.decomposition = decomposition
+        self.hypergraph = hypergraph
+        decomposition.hypergraph = hypergraph
+        self.parent = decomposition._parents()
+        if self.parent is None:
+            raise ValueError('The tree of the decomposition is not a forest.')
+        self.children = defaultdict(set)
+        for n, p in self.parent.items():
+            if p is not None:
+                self.children[p].add(n)
+        self.components = sum(1 for p in self.parent.values() if p is None)
+        self._vertices = hypergraph.nodes()
+        # hyperedge id -> vertices, vertex -> incident hyperedge ids (edges of a graph are numbered)
+        items = hypergraph.edges().items() if isinstance(hypergraph, Hypergraph) else enumerate(hypergraph.edges_iter())
+        self._edges = {}
+        self._incident = defaultdict(list)
+        self._empty_edges = 0
+        for e, vertices in items:
+            vertices = self._edges[e] = frozenset(vertices)
+            if not vertices:
+                self._empty_edges += 1
+            for v in vertices:
+                self._incident[v].append(e)
+        # vertex -> number of bags containing it, number of bags containing it whose parent bag does not
+        self.bag_counts = defaultdict(int)
+        self._root_counts = defaultdict(int)
+        # hyperedge id -> number of bags containing the hyperedge
+        self.cover_counts = defaultdict(int)
+        self._uncovered = set()
+        bags = decomposition.bags
+        for t, bag in bags.items():
+            for v in bag:
+                self.bag_counts[v] += 1
+            self._count_covers(bag, 1)
+        for n, p in self.parent.items():
+            pbag = bags[p] if p is not None else ()
+            for v in bags[n]:
+                if v not in pbag:
+                    self._root_counts[v] += 1
+        # vertices violating the running intersection property, uncovered hyperedges
+        self._disconnected = {v for v in self._vertices if self._root_counts[v] != 1}
+        self._uncovered = {e for e, vertices in self._edges.items() if vertices and not self.cover_counts[e]}
+        # tree node -> vertex -> sum of the weights of t of the incident hyperedges, pairs (t, v) with v in the bag of
+        # t but not in B(lambda_t)
+        self.coverage = defaultdict(lambda: defaultdict(int))
+        self._unsatisfied = set()
+        self._weighted = isinstance(decomposition, GeneralizedHypertreeDecomposition)
+        if self._weighted:
+            self._epsilon, self._one = decomposition._threshold()
+            weights = decomposition.hyperedge_function
+            for t in weights:
+                sums = self.coverage[t]
+                for e, w in weights.row(t).items():
+                    for v in self._edges.get(e, ()):
+                        sums[v] += w
+            for t, bag in bags.items():
+                for v in bag:
+                    if not self._covers(t, v):
+                        self._unsatisfied.add((t, v))
+
+    def _count_covers(self, bag, delta, vertices=None):
+        """
+        Adds delta to the cover counts of the hyperedges contained in the bag that are incident to one of the vertices
+        (default: the vertices of the bag).
+        """
+        seen = set()
+        for v in bag if vertices is None else vertices:
+            for e in self._incident.get(v, ()):
+                if e in seen:
+                    continue
+                seen.add(e)
+                if self._edges[e] <= bag:
+                    self.cover_counts[e] += delta
+                    if self.cover_counts[e]:
+                        self._uncovered.discard(e)
+                    else:
+                        self._uncovered.add(e)
+
+    def _covers(self, t, v):
+        """
+        :return: whether v is in B(lambda_t)
+        """
+        return self.coverage[t].get(v, 0) + self._epsilon >= self._one
+
+    def _update_root_count(self, v, delta):
+        self._root_counts[v] += delta
+        if v in self._vertices:
+            if self._root_counts[v] == 1:
+                self._disconnected.discard(v)
+            else:
+                self._disconnected.add(v)
+
+    def _roots_below(self, t, v):
+        """
+        :return: number of children of t whose bags contain v
+        """
+        bags = self.decomposition.bags
+        return sum(1 for c in self.children[t] if v in bags[c])
+
+    def add_to_bag(self, t, v):
+        """
+        Adds the vertex v to the bag of the tree node t.
+        """
+        p = self.parent[t]
+        bags = self.decomposition.bags
+        bag = bags[t]
+        if v in bag:
+            return
+        bag.add(v)
+        self.decomposition._invalidate()
+        self.bag_counts[v] += 1
+        # t becomes a root of the subtree of v unless its parent contains v, the children containing v do not
+        self._update_root_count(v, (p is None or v not in bags[p]) - self._roots_below(t, v))
+        self._count_covers(bag, 1, (v,))
+        if self._weighted and not self._covers(t, v):
+            self._unsatisfied.add((t, v))
+
+    def remove_from_bag(self, t, v):
+        """
+        Removes the vertex v from the bag of the tree node t.
+
+        :raises KeyError: if v is not in the bag
+        """
+        p = self.parent[t]
+        bags = self.decomposition.bags
+        bag = bags[t]
+        if v not in bag:
+            raise KeyError(v)
+        self._count_covers(bag, -1, (v,))
+        bag.remove(v)
+        self.decomposition._invalidate()
+        self.bag_counts[v] -= 1
+        self._update_root_count(v, self._roots_below(t, v) - (p is None or v not in bags[p]))
+        self._unsatisfied.discard((t, v))
+
+    def set_weight(self, t, e, w):
+        """
+        Sets lambda_t(e) = w. In exact mode, w is a weight like in the file (e.g., a decimal string or a Fraction) and
+        stored scaled (see GeneralizedHypertreeDecomposition._scaled); if the common denominator grows, all sums are
+        rescaled.
+
+        :raises TypeError: for tree decompositions
+        """
+        if not self._weighted:
+            raise TypeError("Tree Decompositions do not allow for a hyperedge function.")
+        decomp = self.decomposition
+        if t not in self.parent:
+            raise KeyError(t)
+        weights = decomp.hyperedge_function
+        if decomp.exact:
+            scale = decomp.weight_scale
+            w = decomp._scaled(w)
+            if decomp.weight_scale != scale:
+                self._rescale(decomp.weight_scale // scale)
+        try:
+            old = weights.get_weight(t, e)
+        except KeyError:
+            old = 0
+        weights.set(t, e, w)
+        decomp._invalidate()
+        bag = decomp.bags[t]
+        sums = self.coverage[t]
+        for v in self._edges.get(e, ()):
+            sums[v] += w - old
+            if v in bag:
+                if self._covers(t, v):
+                    self._unsatisfied.discard((t, v))
+                else:
+                    self._unsatisfied.add((t, v))
+
+    def _rescale(self, factor):
+        logging.info('Rescaling the coverage sums by %s.' % factor)
+        for sums in self.coverage.values():
+            for v in sums:
+                sums[v] *= factor
+        self._epsilon, self._one = self.decomposition._threshold()
+
+    def attach_subtree(self, parent, subtree):
+        """
+        Adds the tree nodes, bags (and weights) of the decomposition subtree and makes the root of its tree (the node
+        without predecessor) a child of parent.
+
+        :param parent: tree node, or None to add the subtree as a new component
+        :param subtree: decomposition of the same kind whose tree is a tree with nodes that do not occur in the
+                        decomposition
+        :raises ValueError: if the tree of the subtree is not a tree or shares nodes with the decomposition
+        """
+        decomp = self.decomposition
+        if parent is not None and parent not in self.parent:
+            raise KeyError(parent)
+        tree = subtree.tree
+        if not len(tree):
+            return
+        if any(n in self.parent or n in decomp.bags for n in tree.nodes()):
+            raise ValueError('The subtree shares tree nodes with the decomposition.')
+        roots = [n for n, d in tree.in_degree() if d == 0] if tree.is_directed() else []
+        below = subtree._parents(roots[:1])
+        if below is None or sum(1 for p in below.values() if p is None) != 1:
+            raise ValueError('The subtree is not a tree.')
+        bags = decomp.bags
+        for n, p in below.items():
+            decomp.tree.add_node(n)
+            if p is None:
+                p = parent
+                if p is None:
+                    self.components += 1
+                else:
+                    decomp.tree.add_edge(p, n)
+            self.parent[n] = p
+            if p is not None:
+                self.children[p].add(n)
+            bags[n] = set(subtree.bags[n])
+        decomp.tree.add_edges_from(tree.edges())
+        decomp._invalidate()
+        for n, p in below.items():
+            bag = bags[n]
+            pbag = bags[p] if p is not None else bags[parent] if parent is not None else ()
+            for v in bag:
+                self.bag_counts[v] += 1
+                if v not in pbag:
+                    self._update_root_count(v, 1)
+            self._count_covers(bag, 1)
+        if self._weighted:
+            for n in below:
+                decomp.hyperedge_function[n] = {}
+                for v in bags[n]:
+                    if not self._covers(n, v):
+                        self._unsatisfied.add((n, v))
+                for e, w in subtree.hyperedge_function.row(n).items():
+                    self.set_weight(n, e, subtree._unscaled(w))
+
+    def _checks(self):
+        """
+        :return: list of pairs (property, function returning whether it holds) in the order of validate
+        """
+        decomp = self.decomposition
+        ret = [('is_tree', lambda: self.components <= 1),
+               ('edges_covered', lambda: not self._uncovered and (not self._empty_edges or bool(decomp.bags))),
+               ('is_connected', lambda: not self._disconnected)]
+        if not self._weighted:
+            ret.append(('vertices_covered', lambda: all(self.bag_counts[v] for v in self._disconnected)))
+            return ret
+        ret.append(('edge_function_holds', lambda: not self._unsatisfied))
+        if isinstance(decomp, HypertreeDecomposition):
+            ret.append(('inverse_edge_function_holds',
+                        lambda: not decomp.inverse_edge_function_violations(self.conditions())[0]))
+        return ret
+
+    def properties(self):
+        """
+        :return: dict property -> whether it holds, as in ValidationReport.properties
+        """
+        return {name: bool(holds()) for name, holds in self._checks()}
+
+    def conditions(self):
+        """
+        :return: dict tree node t -> B(lambda_t), from the maintained sums (see GeneralizedHypertreeDecomposition
+                 ._coverage)
+        """
+        zero = 0 + self._epsilon >= self._one
+        ret = {}
+        for t in self.parent:
+            sums = self.coverage[t]
+            if zero:
+                ret[t] = set(self._vertices) - {v for v in sums if not self._covers(t, v)}
+            else:
+                ret[t] = {v for v in sums if self._covers(t, v)}
+        return ret
+
+    def is_valid(self):
+        """
+        :return: whether the decomposition is valid (see Decomposition.validate), the inverse edge function property
+                 is only checked if the other properties hold
+        """
+        return all(holds() for _, holds in self._checks())
@@ -0,0 +1,74 @@
+#!/usr/bin/env false
+import json
+from array import array
+
+
+def column(values, typecode='q'):
+    """
+    :param values: integers (vertices, tree nodes) or floats (typecode 'd')
+    :return: values as compact array, as list if they do not fit (e.g., non-numerical vertices)
+    """
+    try:
+        return array(typecode, values)
+    except (TypeError, OverflowError):
+        return list(values)
+
+
+class ValidationReport(object):
+    """
+    Result of checking all properties of a decomposition (see Decomposition.report), which does not stop at the first
+    violated property.
+
+    The violations of a property are columns of equal length (one entry per violation), stored as compact arrays,
+    e.g., the vertices violating the running intersection property or the tree nodes, vertices and deficits of the
+    bag condition B(lambda_t). Uncovered hyperedges are stored in CSR form, i.e., offsets into their vertices.
+    """
+
+    def __init__(self, decomposition_type):
+        self.decomposition_type = decomposition_type
+        # property -> whether it holds (in the order of the checks)
+        self.properties = {}
+        # property -> column name -> array
+        self.violations = {}
+
+    def add(self, name, holds, **columns):
+        """
+        :param name: name of the property (method of the decomposition)
+        :param holds: whether the property holds
+        :param columns: violations of the property, column name -> array (see column)
+        """
+        self.properties[name] = bool(holds)
+        if columns:
+            self.violations[name] = columns
+
+    def add_edges(self, name, edges):
+        """
+        :param edges: violating hyperedges (vertex tuples)
+        """
+        offsets, vertices = [0], []
+        for e in edges:
+            vertices.extend(e)
+            offsets.append(len(vertices))
+        self.add(name, len(offsets) == 1, offsets=column(offsets), vertices=column(vertices))
+
+    @property
+    def valid(self):
+        return all(self.properties.values())
+
+    def __bool__(self):
+        return self.valid
+
+    def edges(self, name):
+        """
+        :return: the hyperedges of a property added by add_edges
+        """
+        offsets, vertices = self.violations[name]['offsets'], self.violations[name]['vertices']
+        return [tuple(vertices[a:b]) for a, b in zip(offsets, offsets[1:])]
+
+    def to_dict(self):
+        return {'type': self.decomposition_type, 'valid': self.valid, 'properties': dict(self.properties),
+                'violations': {name: {key: list(values) for key, values in columns.items()}
+                               for name, columns in self.violations.items() if not self.properties[name]}}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
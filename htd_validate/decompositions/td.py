@@ -5,6 +5,7 @@ from operator import itemgetter
 
 import networkx as nx
 from htd_validate.decompositions import Decomposition
+from htd_validate.decompositions.report import column
 from htd_validate.utils import Graph
 
 
@@ -43,10 +44,10 @@ class TreeDecomposition(Decomposition):
 
     @staticmethod
     def specific_valiation(td, problem_statement):
-        if td.max_bag_size() != problem_statement['max_bag_size']:
+        if td.bag_size != problem_statement['max_bag_size']:
             logging.critical(
                 'Bag Size does not match the header was %s expected %s.\n' % (
-                    td.max_bag_size(), problem_statement['max_bag_size']))
+                    td.bag_size, problem_statement['max_bag_size']))
             exit(2)
 
     # TODO: move the validation parts to the validators???
@@ -59,10 +60,17 @@ class TreeDecomposition(Decomposition):
                 return False
         return True
 
-    def validate(self, graph, strict=True):
+    def _report(self, report, strict):
+        super(TreeDecomposition, self)._report(report, strict)
+        occurences = self.bag_occuences()
+        uncovered = [v for v in self.hypergraph.nodes() if v not in occurences]
+        report.add('vertices_covered', not uncovered, vertices=column(uncovered))
+
+    def validate(self, graph, strict=True, parallel=False, workers=None):
         self.hypergraph = graph
         #print(self.hypergraph)
-        if self.is_tree(strict=strict) and self.edges_covered() and self.is_connected() and self.vertices_covered():
+        if self._holds([('is_tree', {'strict': strict}), ('edges_covered', {}), ('is_connected', {}),
+                        ('vertices_covered', {})], parallel=parallel, workers=workers):
             return True
         else:
             logging.error('ERROR in Tree Decomposition.')
@@ -88,11 +96,15 @@ class TreeDecomposition(Decomposition):
         self.write(string)
         return string.getvalue()
 
+    @property
+    def bag_size(self):
+        """
+        Size of the largest bag, computed once (see Decomposition._aggregate).
+        """
+        return self._aggregate('bag_size', lambda: max(map(len, self.bags.values()), default=0))
+
     def max_bag_size(self):
-        ret = 0
-        for b in self.bags.values():
-            ret = max(ret, len(b))
-        return ret
+        return self.bag_size
 
     def get_first_node(self, max_bag_size):
         bagids2lengths = dict(zip(self.bags.keys(), list(map(len, self.bags.values()))))
@@ -0,0 +1,409 @@
+#!/usr/bin/env false
+from array import array
+from collections.abc import MutableMapping
+from itertools import chain, repeat
+
+# typecodes of the weights: int32, int64, float64 or None (Python objects, e.g., Fractions)
+INT, LONG, FLOAT, OBJECT = 'i', 'q', 'd', None
+# integers of larger magnitude are not exact as float64
+_FLOAT_INT = 2 ** 53
+
+
+class WeightRow(MutableMapping):
+    """
+    Weights lambda_t of one tree node t, a view of a HyperedgeFunction (empty if t has no weights).
+    """
+    __slots__ = ('_weights', '_node')
+
+    def __init__(self, weights, node):
+        self._weights = weights
+        self._node = node
+
+    def __getitem__(self, e):
+        return self._weights.get_weight(self._node, e)
+
+    def __setitem__(self, e, w):
+        self._weights.set(self._node, e, w)
+
+    def __delitem__(self, e):
+        self._weights.delete(self._node, e)
+
+    def __contains__(self, e):
+        row = self._weights._overlay.get(self._node)
+        try:
+            if row is not None:
+                return e in row
+            a, b = self._weights._range(self._node)
+            self._weights._edges.index(e, a, b)
+        except (ValueError, TypeError):
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        row = self._weights._overlay.get(self._node)
+        if row is not None:
+            return len(row)
+        a, b = self._weights._range(self._node)
+        return b - a
+
+    def keys(self):
+        row = self._weights._overlay.get(self._node)
+        if row is not None:
+            return list(row)
+        a, b = self._weights._range(self._node)
+        return self._weights._edges[a:b].tolist()
+
+    def values(self):
+        row = self._weights._overlay.get(self._node)
+        if row is not None:
+            return list(row.values())
+        a, b = self._weights._range(self._node)
+        return list(self._weights._values[a:b])
+
+    def items(self):
+        return list(self._weights.row(self._node).items())
+
+    def __repr__(self):
+        return repr(self._weights.row(self._node))
+
+
+class HyperedgeFunction(MutableMapping):
+    """
+    Sparse hyperedge function lambda: tree node t -> (hyperedge id e -> weight lambda_t(e)), which behaves like a dict
+    of dicts (hyperedge_function[t] is a WeightRow, hyperedge_function[t][e] a weight).
+
+    The weights are kept in CSR layout: per tree node (row) a range of offsets into an array of hyperedge ids and an
+    array of weights. The weights are int32 until a weight does not fit, then int64 (larger integers), float64 (floats)
+    and finally Python objects (e.g., Fractions; weights stored as float64 before remain floats). Like dicts, rows and
+    the weights of a row keep the order in which they were first set. Weights added by append (bulk loading, e.g., the
+    file reader) are collected in COO layout (tree node, hyperedge, weight) and merged into the rows on the next
+    access.
+
+    Point updates (set, delete, replacing or deleting a row) do not touch the arrays: the first one copies the row of
+    the tree node into a dict (the overlay), which takes the updates of that row in constant (amortised) time and is
+    read instead of its range. The overlay and the ranges of deleted rows are written back into the arrays on the next
+    read of the CSR layout (csr, scale, relabel_edges).
+    """
+
+    def __init__(self, typecode=INT, weights=None):
+        """
+        :param typecode: initial typecode of the weights (INT, FLOAT or OBJECT)
+        :param weights: initial weights, mapping tree node -> (hyperedge id -> weight)
+        """
+        self.typecode = typecode
+        # tree node -> position of its row, positions of deleted rows are not reused
+        self._rows = {}
+        self._positions = 0
+        # the row at position i < len(_offsets) - 1 ranges over _edges[_offsets[i]:_offsets[i + 1]]
+        self._offsets = array('q', [0])
+        self._edges = array('q')
+        self._values = self._new_values()
+        # tree nodes of the appended weights, i.e., of _edges[_offsets[-1]:]
+        self._tail = array('q')
+        # tree node -> weights of its row (dict hyperedge id -> weight) that replace the range of the row
+        self._overlay = {}
+        if weights:
+            self.update(weights)
+
+    @classmethod
+    def from_csr(cls, nodes, offsets, edges, values):
+        """
+        :param nodes: tree nodes (one row each)
+        :param offsets: row i ranges over edges[offsets[i]:offsets[i + 1]] and values[offsets[i]:offsets[i + 1]]
+        :param values: array (or memoryview) of the weights
+        """
+        typecode = values.typecode if isinstance(values, array) else values.format
+        ret = cls(INT if typecode in 'bhilq' else FLOAT)
+        ret._rows = {t: i for i, t in enumerate(nodes)}
+        ret._positions = len(ret._rows)
+        ret._offsets = array('q', offsets)
+        ret._edges = array('q', edges)
+        try:
+            ret._values = ret._new_values(values)
+        except OverflowError:
+            ret.typecode = LONG
+            ret._values = ret._new_values(values)
+        return ret
+
+    def _new_values(self, values=()):
+        return list(values) if self.typecode is OBJECT else array(self.typecode, values)
+
+    def _fit(self, w):
+        """
+        Widens the typecode of the weights such that w can be stored exactly (integers are not turned into floats
+        beyond 2 ** 53).
+        """
+        code = self.typecode
+        if code is OBJECT:
+            return
+        if type(w) is int:
+            if code == FLOAT:
+                new = FLOAT if -_FLOAT_INT <= w <= _FLOAT_INT else OBJECT
+            elif -2 ** 31 <= w < 2 ** 31:
+                return
+            else:
+                new = LONG if -2 ** 63 <= w < 2 ** 63 else OBJECT
+        elif type(w) is float:
+            if code == FLOAT:
+                return
+            values = chain(self._values, *(row.values() for row in self._overlay.values()))
+            new = FLOAT if code == INT or all(-_FLOAT_INT <= v <= _FLOAT_INT for v in values) else OBJECT
+        else:
+            new = OBJECT
+        if new != code:
+            self.typecode = new
+            self._values = self._new_values(self._values)
+            if new == FLOAT:
+                for row in self._overlay.values():
+                    for e, v in row.items():
+                        row[e] = float(v)
+
+    def _cast(self, w):
+        """
+        :return: w as stored in the array of the weights
+        """
+        return float(w) if self.typecode == FLOAT else w
+
+    def _compact(self):
+        """
+        Merges the appended weights into the rows, later weights for the same tree node and hyperedge replace earlier
+        ones.
+        """
+        tail = self._tail
+        if not tail:
+            return
+        rows, edges, start = self._rows, self._edges, self._offsets[-1]
+        # common case: the appended weights are new rows one after another without duplicate hyperedges
+        ends = array('q')
+        expected = len(self._offsets) - 1
+        last = None
+        seen = set()
+        for i, t in enumerate(tail):
+            if t != last:
+                if rows[t] != expected:
+                    break
+                if last is not None:
+                    ends.append(start + i)
+                expected += 1
+                last = t
+                seen.clear()
+            e = edges[start + i]
+            if e in seen:
+                break
+            seen.add(e)
+        else:
+            if expected == self._positions:
+                ends.append(len(edges))
+                self._offsets.extend(ends)
+                self._tail = array('q')
+                return
+        # otherwise, the weights are (stably) sorted by the positions of their rows
+        positions = array('q')
+        for i in range(len(self._offsets) - 1):
+            positions.extend(repeat(i, self._offsets[i + 1] - self._offsets[i]))
+        positions.extend(rows[t] for t in tail)
+        offsets, merged, values = array('q', [0]), array('q'), self._new_values()
+        row = 0
+        index = {}
+        for i in sorted(range(len(edges)), key=positions.__getitem__):
+            while row < positions[i]:
+                offsets.append(len(merged))
+                row += 1
+                index = {}
+            e = edges[i]
+            j = index.get(e)
+            if j is None:
+                index[e] = len(merged)
+                merged.append(e)
+                values.append(self._values[i])
+            else:
+                values[j] = self._values[i]
+        while row < self._positions:
+            offsets.append(len(merged))
+            row += 1
+        self._offsets, self._edges, self._values, self._tail = offsets, merged, values, array('q')
+
+    def _flush(self):
+        """
+        Merges the appended weights and the overlay into the arrays, which then hold exactly the rows of the tree nodes
+        (in their order).
+        """
+        self._compact()
+        if not self._overlay and self._positions == len(self._rows):
+            return
+        offsets, edges, values = array('q', [0]), array('q'), self._new_values()
+        for t, i in self._rows.items():
+            row = self._overlay.get(t)
+            if row is None:
+                a, b = self._offsets[i], self._offsets[i + 1]
+                edges.extend(self._edges[a:b])
+                values.extend(self._values[a:b])
+            else:
+                edges.extend(row)
+                values.extend(row.values())
+            offsets.append(len(edges))
+        self._rows = {t: i for i, t in enumerate(self._rows)}
+        self._positions = len(self._rows)
+        self._offsets, self._edges, self._values, self._overlay = offsets, edges, values, {}
+
+    def _range(self, t):
+        """
+        :return: pair (start, stop) of the row of t in the arrays (not of a row in the overlay)
+        """
+        self._compact()
+        i = self._rows.get(t)
+        if i is None or i >= len(self._offsets) - 1:
+            return 0, 0
+        return self._offsets[i], self._offsets[i + 1]
+
+    def _new_row(self, t):
+        self._rows[t] = self._positions
+        self._positions += 1
+
+    def _overlay_row(self, t):
+        """
+        :return: the row of t in the overlay, copied from the arrays (or created) on first use
+        """
+        row = self._overlay.get(t)
+        if row is None:
+            if t in self._rows:
+                row = self.row(t)
+            else:
+                self._new_row(t)
+                row = {}
+            self._overlay[t] = row
+        return row
+
+    def __getitem__(self, t):
+        return WeightRow(self, t)
+
+    def __setitem__(self, t, weights):
+        """
+        Replaces the weights of t (in the overlay).
+        """
+        weights = list(weights.items())
+        for _, w in weights:
+            self._fit(w)
+        if t not in self._rows:
+            self._new_row(t)
+        self._overlay[t] = {e: self._cast(w) for e, w in weights}
+
+    def __delitem__(self, t):
+        # appended weights of t have to be merged while t has a position
+        self._compact()
+        del self._rows[t]
+        self._overlay.pop(t, None)
+
+    def __contains__(self, t):
+        return t in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __repr__(self):
+        return repr({t: self.row(t) for t in self._rows})
+
+    def append(self, t, e, w):
+        """
+        Sets lambda_t(e) = w, merged into the rows on the next access (constant time).
+        """
+        self._fit(w)
+        row = self._overlay.get(t)
+        if row is not None:
+            row[e] = self._cast(w)
+            return
+        self._edges.append(e)
+        if t not in self._rows:
+            self._new_row(t)
+        self._tail.append(t)
+        self._values.append(w)
+
+    def set(self, t, e, w):
+        """
+        Sets lambda_t(e) = w in the overlay, in constant time apart from copying the row of t into the overlay on its
+        first update.
+        """
+        self._fit(w)
+        self._overlay_row(t)[e] = self._cast(w)
+
+    def get_weight(self, t, e):
+        row = self._overlay.get(t)
+        if row is not None:
+            try:
+                return row[e]
+            except TypeError:
+                raise KeyError(e)
+        a, b = self._range(t)
+        try:
+            return self._values[self._edges.index(e, a, b)]
+        except (ValueError, TypeError):
+            raise KeyError(e)
+
+    def delete(self, t, e):
+        """
+        Removes the weight lambda_t(e) (in the overlay), the row of t remains (possibly empty).
+        """
+        if t not in self._rows:
+            raise KeyError(e)
+        try:
+            del self._overlay_row(t)[e]
+        except TypeError:
+            raise KeyError(e)
+
+    def row(self, t):
+        """
+        :return: weights of t as dict hyperedge id -> weight
+        """
+        row = self._overlay.get(t)
+        if row is not None:
+            return dict(row)
+        a, b = self._range(t)
+        return dict(zip(self._edges[a:b], self._values[a:b]))
+
+    def row_sum(self, t):
+        """
+        :return: sum of the weights of t (in the order of the row)
+        """
+        row = self._overlay.get(t)
+        if row is not None:
+            return sum(row.values())
+        a, b = self._range(t)
+        return sum(self._values[a:b])
+
+    def csr(self):
+        """
+        :return: quadruple (tree nodes, offsets, hyperedge ids, weights), see from_csr
+        """
+        self._flush()
+        return list(self._rows), self._offsets, self._edges, self._values
+
+    def scale(self, factor):
+        """
+        Multiplies all (integral) weights by the integer factor.
+        """
+        self._flush()
+        values = [int(w) * factor for w in self._values]
+        if values:
+            self._fit(max(values, key=abs))
+        self._values = self._new_values(values)
+
+    def relabel_edges(self, substitution):
+        """
+        Replaces every hyperedge id e by substitution[e], weights of hyperedges that are mapped to the same id replace
+        each other (in the order of the row).
+        """
+        self._flush()
+        if not self._edges:
+            return
+        self._tail = array('q')
+        for i, t in enumerate(self._rows):
+            self._tail.extend(repeat(t, self._offsets[i + 1] - self._offsets[i]))
+        self._edges = array('q', (substitution[e] for e in self._edges))
+        self._offsets = array('q', [0])
+        self._compact()
@@ -1,3 +1,4 @@
 from htd_validate.utils.graph import Graph
 from htd_validate.utils.hypergraph import Hypergraph
-from htd_validate.utils.hypergraph_primalview import HypergraphPrimalView
\ No newline at end of file
+from htd_validate.utils.hypergraph_primalview import HypergraphPrimalView
+from htd_validate.utils.hypergraph_csr import CSRHypergraph
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018
+
+#
+
+# *) is not allowed to contain parts of nuts ;P
+#
+# hypergraph.py is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.  hypergraph.py is distributed in
+# the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.  You should have received a copy of the GNU General Public
+# License along with hypergraph.py.  If not, see
+# <http://www.gnu.org/licenses/>.
+"""
+Versioned binary container for parsed inputs (see Hypergraph.save_binary and Decomposition.save_binary).
+
+Layout:
+  magic (8 bytes) | version (uint32 LE) | header length (uint32 LE) | header (JSON, utf-8) | padding
+  arrays (each 8-byte aligned)
+
+The header holds the kind of the stored object, small metadata (e.g. symbol tables), the source key of a sidecar
+cache and for each array its typecode (see module array), offset and length. Arrays are exposed as memoryviews on
+the memory-mapped file.
+"""
+from __future__ import absolute_import
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'HTDVBIN\x00'
+VERSION = 1
+# suffix of sidecar cache files
+SUFFIX = '.htdv'
+
+_PREFIX = struct.Struct('<8sII')
+_ALIGN = 8
+
+
+def _aligned(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write(filename, kind, arrays, meta=None, source=None):
+    """
+    :param filename: name of the file to write to (replaced atomically)
+    :param kind: kind of the stored object
+    :param arrays: dict of name -> array.array
+    :param meta: JSON serializable metadata
+    :param source: source key of a sidecar cache (see source_key)
+    """
+    header = {'kind': kind, 'meta': meta, 'source': source, 'byteorder': sys.byteorder, 'arrays': {}}
+    offset = 0
+    for name, arr in arrays.items():
+        header['arrays'][name] = [arr.typecode, offset, len(arr)]
+        offset += _aligned(len(arr) * arr.itemsize)
+    blob = json.dumps(header).encode('utf-8')
+    start = _aligned(_PREFIX.size + len(blob))
+
+    tmp = '%s.%s.tmp' % (filename, os.getpid())
+    try:
+        with open(tmp, 'wb') as fobj:
+            fobj.write(_PREFIX.pack(MAGIC, VERSION, len(blob)))
+            fobj.write(blob)
+            fobj.write(b'\x00' * (start - _PREFIX.size - len(blob)))
+            for arr in arrays.values():
+                data = arr.tobytes()
+                fobj.write(data)
+                fobj.write(b'\x00' * (_aligned(len(data)) - len(data)))
+        os.replace(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class BinaryFile(object):
+    """
+    Memory-mapped binary container, use as context manager. Views handed out by array are released on close.
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as fobj:
+            prefix = fobj.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                raise IOError('File "%s" is not a binary htd_validate file.' % filename)
+            magic, version, length = _PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise IOError('File "%s" is not a binary htd_validate file.' % filename)
+            if version != VERSION:
+                raise IOError('File "%s" has version %s, expected version %s.' % (filename, version, VERSION))
+            header = json.loads(fobj.read(length).decode('utf-8'))
+            self.__mm = mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__start = _aligned(_PREFIX.size + length)
+        self.__views = []
+        self.__header = header
+        self.kind = header['kind']
+        self.meta = header['meta']
+        self.source = header['source']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        for view in reversed(self.__views):
+            view.release()
+        self.__views = []
+        self.__mm.close()
+
+    def __contains__(self, name):
+        return name in self.__header['arrays']
+
+    def array(self, name):
+        """
+        :param name: name of the array
+        :return: (zero-copy) memoryview on the array, valid until the file is closed
+        """
+        typecode, offset, length = self.__header['arrays'][name]
+        offset += self.__start
+        size = length * array(typecode).itemsize
+        if self.__header['byteorder'] != sys.byteorder:
+            ret = array(typecode, self.__mm[offset:offset + size])
+            ret.byteswap()
+            return ret
+        raw = memoryview(self.__mm)
+        self.__views.append(raw)
+        raw = raw[offset:offset + size]
+        self.__views.append(raw)
+        view = raw.cast(typecode)
+        self.__views.append(view)
+        return view
+
+
+def read_source(filename):
+    """
+    :param filename: name of a binary file
+    :return: source key stored in filename or None if filename is missing or no binary file
+    """
+    try:
+        with BinaryFile(filename) as binary:
+            return binary.source
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def sidecar(filename):
+    """
+    :param filename: name of the source file
+    :return: name of the sidecar cache file of filename
+    """
+    return filename + SUFFIX
+
+
+def source_key(filename, options=None):
+    """
+    :param filename: name of the source file
+    :param options: reader options that affect the parsed object
+    :return: key identifying the content of filename (path, mtime and size) read with the given options
+    """
+    stat = os.stat(filename)
+    return {'path': os.path.abspath(filename), 'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+            'options': options}
+
+
+def cached(filename, options, parse, load, save):
+    """
+    Loads the object parsed from filename from its sidecar cache, (re)creates the cache if it is missing or stale.
+
+    :param filename: name of the source file
+    :param options: reader options that affect the parsed object (JSON serializable)
+    :param parse: function () -> object reading filename
+    :param load: function (cache filename) -> object
+    :param save: function (object, cache filename, source key) storing the object
+    :return: parsed object
+    """
+    cache = sidecar(filename)
+    key = source_key(filename, options)
+    # json turns tuples into lists, compare the serialized keys
+    if json.dumps(read_source(cache)) == json.dumps(key):
+        logging.debug('Loading "%s" from cache "%s".' % (filename, cache))
+        return load(cache)
+    obj = parse()
+    try:
+        save(obj, cache, key)
+    except (IOError, OSError, TypeError, ValueError, OverflowError) as e:
+        logging.warning('Could not write cache "%s": %s' % (cache, e))
+    return obj
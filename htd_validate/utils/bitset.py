@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018
+
+#
+
+# *) is not allowed to contain parts of nuts ;P
+#
+# hypergraph.py is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.  hypergraph.py is distributed in
+# the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.  You should have received a copy of the GNU General Public
+# License along with hypergraph.py.  If not, see
+# <http://www.gnu.org/licenses/>.
+from __future__ import absolute_import
+
+from htd_validate.utils import relabelling as relab
+
+
+class Bitsets(object):
+    """
+    Vertex sets as bitmasks (Python ints).
+
+    The vertices are relabelled consecutively (see relabelling.consecutive_substitution), a set of vertices is the
+    int that has the bits of their positions set. Subset, intersection and union tests are then word-parallel
+    operations on ints. The substitution is reverted to report the original vertex names.
+
+    A bitmask takes (largest position / 8) bytes, hence the representation pays off for dense vertex sets, e.g.,
+    wide decompositions of hypergraphs with few vertices.
+    """
+
+    def __init__(self, vertices):
+        """
+        :param vertices: vertices that may occur in the sets (names, duplicates are ignored)
+        """
+        self.substitution = relab.consecutive_substitution(sorted(set(vertices)))
+        self.names = relab.revert_substitution(self.substitution)
+
+    def __len__(self):
+        return len(self.substitution)
+
+    def mask(self, vertices):
+        """
+        :param vertices: vertices (names)
+        :return: bitmask of the vertices
+        """
+        positions = [self.substitution[v] for v in vertices]
+        if len(positions) <= 8:
+            ret = 0
+            for pos in positions:
+                ret |= 1 << pos
+            return ret
+        buf = bytearray(max(positions) // 8 + 1)
+        for pos in positions:
+            buf[pos >> 3] |= 1 << (pos & 7)
+        return int.from_bytes(buf, 'little')
+
+    def vertices(self, mask):
+        """
+        :param mask: bitmask
+        :return: set of the vertices (names) of mask
+        """
+        return {self.names[pos] for pos, bit in enumerate(bin(mask)[:1:-1]) if bit == '1'}
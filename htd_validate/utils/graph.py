@@ -27,6 +27,9 @@ from itertools import count
 import mimetypes
 import networkx as nx
 
+from htd_validate.utils import mmapscan
+from htd_validate.utils.mmapscan import np
+
 
 def complete_graph(vertices):
     g1 = nx.complete_graph(len(vertices))
@@ -75,6 +78,10 @@ class Graph(nx.Graph):
         num_verts = None
         is_dimacs = False
         stream = None
+        if not header_only:
+            graph = clazz._from_mmap(filename, strict)
+            if graph is not None:
+                return graph
         graph = clazz()
         try:
             mtype = mimetypes.guess_type(filename)[1]
@@ -143,6 +150,53 @@ class Graph(nx.Graph):
             if stream:
                 stream.close()
 
+        clazz._check_counts(graph, num_verts, num_edges, strict)
+        return graph
+
+    @classmethod
+    def _from_mmap(clazz, filename, strict=False):
+        """
+        Reads an uncompressed file via a memory-mapped, byte-level scan (see mmapscan).
+
+        :param filename: name of the file to read from
+        :type filename: string
+        :rtype: Graph
+        :return: imported graph or None if the file has to be read (and its errors reported) by the text reader
+        """
+        # subclasses hooking into the lines need the text reader
+        if clazz._parsed_file_line.__func__ is not Graph._parsed_file_line.__func__:
+            return None
+        scan = mmapscan.scan(filename)
+        if scan is None:
+            return None
+        with scan:
+            skipped = np.isin(scan.kind, [ord('c'), ord('x'), ord('n')])
+            headers = np.flatnonzero(scan.kind == ord('p'))
+            if len(headers) != 1 or (~skipped[:headers[0]]).any():
+                return None
+            line = scan.text(headers[0]).split()
+            if len(line) != 4 or not line[2].isdigit() or not line[3].isdigit() or line[1] == 'cnf':
+                return None
+            is_dimacs = line[1] == 'edge'
+            num_verts = int(line[2])
+            num_edges = int(line[3])
+            if num_verts == 0:
+                return None
+            skipped[headers[0]] = True
+            if not is_dimacs:
+                skipped |= (scan.kind == ord('a')) | (scan.kind == ord('e'))
+            edges = scan.columns(np.flatnonzero(~skipped), 2, skip=1 if is_dimacs else 0)
+            if edges is None or (edges == 0).any():
+                return None
+
+        graph = clazz()
+        for i in range(0, len(edges), mmapscan.BLOCK):
+            graph.add_edges_from(edges[i:i + mmapscan.BLOCK].tolist())
+        clazz._check_counts(graph, num_verts, num_edges, strict)
+        return graph
+
+    @staticmethod
+    def _check_counts(graph, num_verts, num_edges, strict):
         if graph.number_of_edges() > num_edges:
             logging.error("Edges overmuch: read=%s expected=%s" % (graph.number_of_edges(), num_edges))
             exit(3)
@@ -156,7 +210,6 @@ class Graph(nx.Graph):
         if strict and graph.number_of_nodes() < num_verts:
             logging.error("Vertices missing: read=%s expected=%s" % (graph.number_of_nodes(), num_verts))
             exit(3)
-        return graph
 
     def write_dimacs(self, stream, copy=True):
         return self.write_graph(stream, copy, dimacs=True)
@@ -1,6 +1,57 @@
 #!/usr/bin/env false
-# Taken from: SO#:6428723
+import bz2
 import functools
+import gzip
+import importlib.util
+import lzma
+import mimetypes
+import sys
+
+
+def lazy_import(name):
+    """
+    Imports an optional module on first attribute access (see importlib.util.LazyLoader).
+
+    :param name: name of the module
+    :return: the (not yet executed) module or None if it is not installed
+    """
+    try:
+        return sys.modules[name]
+    except KeyError:
+        pass
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None:
+        return None
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def open_text(filename):
+    """
+    Opens a plain, gzip, bzip2 or xz compressed file (guessed from its suffix) for reading lines.
+
+    :param filename: name of the file to read from
+    :return: text stream
+    """
+    mtype = mimetypes.guess_type(filename)[1]
+    if mtype is None:
+        return open(filename, 'r')
+    elif mtype == 'bzip2':
+        return bz2.open(filename, 'rt')
+    elif mtype == 'gz' or mtype == 'gzip':
+        return gzip.open(filename, 'rt')
+    elif mtype == 'xz':
+        return lzma.open(filename, 'rt')
+    raise IOError('Unknown input type "%s" for file "%s"' % (mtype, filename))
+
+
+# Taken from: SO#:6428723
 
 
 # noinspection PyPep8Naming
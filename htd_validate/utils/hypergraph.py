@@ -25,34 +25,28 @@
 from __future__ import absolute_import
 
 import copy
-import gzip
 import logging
-import lzma
 import mimetypes
 import sys
 import threading
 import time
-from bz2 import BZ2File
+from array import array
+from itertools import islice, repeat
 # noinspection PyUnresolvedReferences
 from htd_validate.utils import relabelling as relab
+from htd_validate.utils import bincache
+from htd_validate.utils import mmapscan
+from htd_validate.utils.mmapscan import np
 from io import StringIO
 import re
 
-try:
-    import cplex as cx
-except ImportError:
-    cx = None
+from htd_validate.utils.helpers import lazy_import, open_text
 
+# optional solver backends, imported on first use
+cx = lazy_import('cplex')
 # TODO solver handling
-try:
-    import z3
-except ImportError:
-    z3 = None
-
-try:
-    import clingo
-except:
-    clingo = None
+z3 = lazy_import('z3')
+clingo = lazy_import('clingo')
 
 # noinspection PyUnresolvedReferences
 from htd_validate.utils.integer import safe_int
@@ -96,8 +90,18 @@ class Hypergraph(object):
 
     ACCURACY = 0.0000001
 
+    # hyperedges in Fischl format: name(v1, ..., vn)
+    _FISCHL_EDGE = re.compile(r'(\w+\s*\((\s*\w+\s*,\s*)*\w+\s*\)\s*)')
+    # start of a hyperedge that is not yet complete
+    _FISCHL_PENDING = re.compile(r'\w+\s*\([\w\s,]*$')
+    _FISCHL_NAME = re.compile(r'\w+\s*$')
+
     def __init__(self, non_numerical=False, vertices=None):
         self.__edges = dict()
+        # incidence index: vertex -> set of ids of the hyperedges containing the vertex
+        self.__inc = dict()
+        # insertion order of the hyperedges (mirrors the iteration order of self.__edges)
+        self.__eseq = dict()
         if vertices is None:
             vertices = set()
         self.__vertices = vertices
@@ -635,6 +639,7 @@ class Hypergraph(object):
     def relabel(self, substitution, substitution_keys, revert=True):
         self.__vertices = relab.relabel_sequence(self.__vertices, substitution)
         self.__edges = relab.relabel_dict(self.__edges, substitution, substitution_keys)
+        self.__reindex()
         if not revert:
             return None, None
         return relab.revert_substitution(substitution), relab.revert_substitution(substitution_keys)
@@ -704,7 +709,12 @@ class Hypergraph(object):
         assert (erepr in e)
         dl = -1
         excl = None
-        for (k, v) in self.__edges.items():
+        # only hyperedges touching e are affected by the contraction
+        affected = set()
+        for x in e:
+            affected.update(self.__inc.get(x, ()))
+        for k in sorted(affected, key=self.__eseq.__getitem__):
+            v = self.__edges[k]
             contr = [x for x in v if x not in e]
             if len(contr) == 0:  # and contr[0] == e[0]:
                 dl = k
@@ -714,21 +724,21 @@ class Hypergraph(object):
                 if self.isSubsumed(set(contr), modulo=k):
                     dl = k
                 else:
-                    self.__edges[k] = Hypergraph.__edge_type(contr)
+                    self.__set_edge(k, Hypergraph.__edge_type(contr))
             elif erepr in v:
                 excl = erepr
         if dl >= 0:
-            del self.__edges[dl]
+            self.__remove_edge(dl)
         self.__vertices.difference_update(e)
         if excl is not None:
             self.__vertices.update((excl,))
 
     def incident_edges(self, v):
-        edges = {}
-        for (e, ge) in self.__edges.items():
-            if v in ge:
-                edges[e] = ge
-        return edges
+        return {e: self.__edges[e] for e in self.__inc.get(v, ())}
+
+    def incident_edge_ids(self, v):
+        # a read-only copy, modifying the result must not corrupt the incidence index
+        return frozenset(self.__inc.get(v, ()))
 
     def edge_rank(self, n):
         # print self.incident_edges(n).values()
@@ -747,11 +757,10 @@ class Hypergraph(object):
 
     def adjByNode(self, v, strict=True):
         nbh = dict()
-        for e in self.__edges.values():
-            if v in e:
-                for ex in e:
-                    if not strict or ex != v:
-                        nbh[ex] = Hypergraph.__d
+        for k in self.__inc.get(v, ()):
+            for ex in self.__edges[k]:
+                if not strict or ex != v:
+                    nbh[ex] = Hypergraph.__d
         return nbh
 
     @property
@@ -767,18 +776,17 @@ class Hypergraph(object):
         self.__vertices.remove(v)
         # del self.__vertices[v]
         dl = []
-        for k, e in self.__edges.items():
-            if v in self.__edges[k]:
-                # thank you, tuple!
-                # del self.__edges[k][v]
-                e = set(e)
-                e.remove(v)
-                self.__edges[k] = Hypergraph.__edge_type(e)
-                # print self.__edges[k]
-                dl.append((k, e))
+        for k in sorted(self.__inc.pop(v, ()), key=self.__eseq.__getitem__):
+            # thank you, tuple!
+            # del self.__edges[k][v]
+            e = set(self.__edges[k])
+            e.remove(v)
+            self.__edges[k] = Hypergraph.__edge_type(e)
+            # print self.__edges[k]
+            dl.append((k, e))
         for k, e in dl:
             if len(e) <= 1 or self.isSubsumed(e, modulo=k):
-                del self.__edges[k]
+                self.__remove_edge(k)
 
     def number_of_edges(self):
         return len(self.__edges)
@@ -803,6 +811,8 @@ class Hypergraph(object):
     def __copy__(self):
         hg = Hypergraph(non_numerical=self.__non_numerical, vertices=self.__vertices)
         hg.__edges = self.__edges
+        hg.__inc = self.__inc
+        hg.__eseq = self.__eseq
         if self.__non_numerical:
             hg.__nsymtab = self.__nsymtab
             hg.__elabel = self.__elabel
@@ -813,6 +823,8 @@ class Hypergraph(object):
             memodict = {}
         hg = Hypergraph(non_numerical=self.__non_numerical, vertices=copy.deepcopy(self.__vertices, memodict))
         hg.__edges = copy.deepcopy(self.__edges, memodict)
+        hg.__inc = copy.deepcopy(self.__inc, memodict)
+        hg.__eseq = copy.deepcopy(self.__eseq, memodict)
         if self.__non_numerical:
             # do not deep copy this stuff, not needed for now
             hg.__nsymtab = self.__nsymtab
@@ -848,30 +860,117 @@ class Hypergraph(object):
         return iter(self.__vertices)
 
     @classmethod
-    def fromstream_dimacslike(clazz, stream):
-        num_edges = 0
-        num_verts = 0
+    def fromstream_dimacslike(clazz, stream, max_edges=None):
+        """
+        :param stream: text stream to read from, consumed line by line
+        :param max_edges: stop after reading max_edges hyperedges (None reads everything)
+        :type max_edges: int
+        :rtype: Hypergraph
+        :return: imported hypergraph
+        """
+        counts = {}
+        HG = clazz.from_edges(Hypergraph._dimacslike_rows(stream, counts, max_edges))
+        Hypergraph._check_counts(counts, HG.number_of_nodes(), max_edges)
+        return HG
 
+    @staticmethod
+    def _dimacslike_rows(stream, counts, max_edges=None):
+        """
+        :param stream: text stream to read from, consumed line by line
+        :param counts: dict receiving the vertex/edge counts of the header (num_verts, num_edges) and the number of
+                       read hyperedges (read_edges)
+        :param max_edges: stop after reading max_edges hyperedges (None reads everything)
+        :return: generator of the hyperedges (tuples of vertices) in the order of the file
+        """
+        counts.update(num_verts=0, num_edges=0, read_edges=0)
         is_dimacs = False
-        HG = clazz()
-        for line in stream.readlines():
+        # do not materialize the stream, inputs might be (decompressed) several GB
+        for line in stream:
             line = line.split()
             if not line:
                 continue
             elif line[0] == 'p':
                 is_dimacs = line[1] == 'edge' or "htd" in line[1]
+                try:
+                    counts['num_verts'] = int(line[2])
+                    counts['num_edges'] = int(line[3])
+                except (IndexError, ValueError):
+                    logging.warning("Header without vertex/edge counts: %s" % ' '.join(line))
             elif line[0] != 'c':
-                if is_dimacs:
-                    HG.add_hyperedge(list(map(int, line[1:])))
-                else:
-                    HG.add_hyperedge(list(map(int, line)))
+                if max_edges is not None and counts['read_edges'] >= max_edges:
+                    return
+                counts['read_edges'] += 1
+                yield Hypergraph.__edge_type(map(int, islice(line, 1, None) if is_dimacs else line))
+
+    @staticmethod
+    def _check_counts(counts, num_nodes, max_edges):
+        """
+        Warns if fewer hyperedges or vertices than announced in the header were read.
+
+        :param counts: counts of the reader (see _dimacslike_rows)
+        :param num_nodes: number of vertices of the hypergraph
+        """
+        if max_edges is None and counts['read_edges'] < counts['num_edges']:
+            logging.warning("edges missing: read=%s announced=%s" % (counts['read_edges'], counts['num_edges']))
+        if num_nodes < counts['num_verts']:
+            logging.warning("vertices missing: read=%s announced=%s" % (num_nodes, counts['num_verts']))
+
+    @classmethod
+    def frommmap_dimacslike(clazz, filename, max_edges=None):
+        """
+        Reads an uncompressed DIMACS-like file via a memory-mapped, byte-level scan (see mmapscan).
 
-        if HG.number_of_edges() < num_edges:
-            print("edges missing: read=%s announced=%s" % (HG.number_of_edges(), num_edges))
-        if HG.number_of_nodes() < num_verts:
-            print("vertices missing: read=%s announced=%s" % (HG.number_of_edges(), num_edges))
+        :param filename: name of the file to read from
+        :param max_edges: stop after reading max_edges hyperedges (None reads everything)
+        :type max_edges: int
+        :rtype: Hypergraph
+        :return: imported hypergraph or None if the file has to be read by fromstream_dimacslike
+        """
+        counts = {}
+        HG = Hypergraph._scan_dimacslike(filename, clazz.from_edges, counts, max_edges)
+        if HG is not None:
+            Hypergraph._check_counts(counts, HG.number_of_nodes(), max_edges)
         return HG
 
+    @staticmethod
+    def _scan_dimacslike(filename, build, counts, max_edges=None):
+        """
+        :param filename: name of the (uncompressed) file to read from
+        :param build: function consuming the hyperedges (lists of vertices, in the order of the file), called while
+                      the file is mapped
+        :param counts: see _dimacslike_rows
+        :param max_edges: stop after reading max_edges hyperedges (None reads everything)
+        :return: result of build or None if the file has to be read line by line (see _dimacslike_rows)
+        """
+        scan = mmapscan.scan(filename)
+        if scan is None:
+            return None
+        with scan:
+            headers = np.flatnonzero(scan.kind == ord('p'))
+            data = np.flatnonzero((scan.kind != ord('p')) & (scan.kind != ord('c')))
+            # irregular headers are left to the text reader
+            if len(headers) > 1 or (len(headers) == 1 and len(data) and data[0] < headers[0]):
+                return None
+            counts.update(num_verts=0, num_edges=0)
+            is_dimacs = False
+            if len(headers):
+                line = scan.text(headers[0]).split()
+                if len(line) < 2:
+                    return None
+                is_dimacs = line[1] == 'edge' or "htd" in line[1]
+                try:
+                    counts['num_verts'] = int(line[2])
+                    counts['num_edges'] = int(line[3])
+                except (IndexError, ValueError):
+                    logging.warning("Header without vertex/edge counts: %s" % ' '.join(line))
+            if max_edges is not None:
+                data = data[:max_edges]
+            skip = 1 if is_dimacs else 0
+            if not scan.all_numeric(data, skip=skip):
+                return None
+            counts['read_edges'] = len(data)
+            return build(scan.rows(data, skip=skip))
+
     # TODO: symtab
 
     @classmethod
@@ -899,47 +998,220 @@ class Hypergraph(object):
 
     @classmethod
     def fromstream_fischlformat_re(clazz, stream):
-        HG = clazz(non_numerical=True)
-        istream = ''.join(stream.readlines()).replace('\n', ' ')
-        for line in re.findall(r'(\w+\s*\((\s*\w+\s*,\s*)*\w+\s*\)\s*)', istream):
-            line = line[0]
-            edge_name = None
-            edge_vertices = []
-            # replace whitespaces
-            line = line.replace(' ', '')
+        """
+        Single pass reader for hyperedges name(v1, ..., vn), which may span several lines.
+        Only the current (incomplete) hyperedge is buffered.
 
-            collect = []
-            for char in line:
-                if char == '(':
-                    edge_name = ''.join(collect)
-                    collect = []
-                elif char == ',' or char == ')':
-                    edge_vertices.append(''.join(collect))
-                    collect = []
-                elif char != ')':
-                    collect.append(char)
-            HG.add_hyperedge(edge_vertices, name=edge_name)
+        :param stream: text stream to read from
+        :rtype: Hypergraph
+        :return: imported hypergraph
+        """
+
+        def hyperedges():
+            pending = ''
+            for line in stream:
+                buf = pending + line.replace('\n', ' ')
+                end = 0
+                for m in Hypergraph._FISCHL_EDGE.finditer(buf):
+                    edge_name, _, edge_vertices = m.group(1).partition('(')
+                    edge_vertices = edge_vertices[:edge_vertices.rindex(')')].split(',')
+                    yield [v.strip() for v in edge_vertices], edge_name.strip()
+                    end = m.end()
+                rest = buf[end:]
+                # keep the beginning of a hyperedge that continues on the next line(s)
+                tail = Hypergraph._FISCHL_PENDING.search(rest) or Hypergraph._FISCHL_NAME.search(rest)
+                pending = tail.group() if tail else ''
+
+        return clazz._from_labeled_edges(hyperedges(), non_numerical=True)
+
+    @classmethod
+    def from_edges(clazz, edges, checkSubsumes=True, cleanup=False, non_numerical=False, names=None):
+        """
+        Bulk construction. By default, the result (including the edge ids) equals calling add_hyperedge for every
+        edge in order, i.e., an edge that is a subset of an earlier edge is dropped and an edge that is a superset of
+        an earlier edge replaces the first such edge.
+
+        :param edges: hyperedges, each given as a sequence of vertices
+        :type edges: iterable
+        :param checkSubsumes: resolve subsumption like add_hyperedge (otherwise every edge is kept)
+        :type checkSubsumes: bool
+        :param cleanup: instead, drop every duplicate and every subsumed hyperedge in one batch step after all edges
+                        have been read (not equivalent to add_hyperedge, the readers do not use it)
+        :type cleanup: bool
+        :param non_numerical: vertices are names that are mapped to integers via the symbol table
+        :type non_numerical: bool
+        :param names: edge labels in the order of edges (only used if non_numerical)
+        :type names: iterable
+        :rtype: Hypergraph
+        """
+        if names is None:
+            names = repeat(None)
+        return clazz._from_labeled_edges(zip(edges, names), checkSubsumes=checkSubsumes, cleanup=cleanup,
+                                         non_numerical=non_numerical)
+
+    @classmethod
+    def _from_labeled_edges(clazz, labeled_edges, checkSubsumes=True, cleanup=False, non_numerical=False):
+        # see from_edges, labeled_edges yields pairs (vertices, name)
+        if checkSubsumes and not cleanup:
+            HG = clazz(non_numerical=non_numerical)
+            for X, name in labeled_edges:
+                HG.add_hyperedge(X, name=name)
+            return HG
+        HG = clazz(non_numerical=non_numerical)
+        inc = HG.__inc
+        k = 0
+        for X, name in labeled_edges:
+            if len(X) <= 1:
+                continue
+            k += 1
+            if non_numerical:
+                X = map(HG.__nsymtab.get, X)
+                if name is not None:
+                    HG.__elabel[k] = name
+            X = Hypergraph.__edge_type(X)
+            HG.__edges[k] = X
+            for v in X:
+                try:
+                    inc[v].add(k)
+                except KeyError:
+                    inc[v] = {k}
+        HG.__vertices.update(inc)
+        HG.__eseq = {k: k for k in HG.__edges}
+        if cleanup:
+            HG.__drop_subsumed()
         return HG
 
+    def __drop_subsumed(self):
+        # full cleanup of duplicate and subsumed edges (assumes edge ids are in insertion order), unlike
+        # add_hyperedge every subsumed edge is dropped; a superset takes over the position of the first edge it subsumes
+        inc = self.__inc
+        dsize = {}
+
+        def distinct(j):
+            try:
+                return dsize[j]
+            except KeyError:
+                dsize[j] = len(set(self.__edges[j]))
+                return dsize[j]
+
+        dropped = set()
+        arrived = []  # edges that add_hyperedge would not have dropped when reading them
+        subsets = {}  # arrived proper subsets of an edge
+        for k, e in self.__edges.items():
+            rarest = min(e, key=lambda x: len(inc[x]))
+            if len(inc[rarest]) == 1:
+                arrived.append(k)
+                continue
+            # edges containing all vertices of e
+            sup = inc[rarest].intersection(*(inc[x] for x in e))
+            sup.discard(k)
+            for j in sup:
+                if distinct(j) > distinct(k) or j < k:
+                    dropped.add(k)
+                    break
+            if all(j > k for j in sup):
+                arrived.append(k)
+                for j in sup:
+                    if distinct(j) > distinct(k):
+                        subsets.setdefault(j, []).append(k)
+        if not dropped:
+            return
+
+        slot = {}
+        for k in arrived:
+            replaced = [j for j in subsets.get(k, ()) if j in slot]
+            if replaced:
+                slot[k] = slot.pop(min(replaced, key=slot.get))
+            else:
+                slot[k] = k
+        kept = sorted((k for k in self.__edges if k not in dropped), key=lambda k: slot.get(k, k))
+        self.__edges = {pos: self.__edges[j] for pos, j in enumerate(kept, start=1)}
+        if self.__non_numerical:
+            self.__elabel = {pos: self.__elabel[j] for pos, j in enumerate(kept, start=1) if j in self.__elabel}
+        self.__reindex()
+
     # TODO: move from_file to a central part
 
     @classmethod
-    def from_file(clazz, filename, strict=False, fischl_format=False):
+    def from_file(clazz, filename, strict=False, fischl_format=False, max_edges=None, debug=False, cache=False):
         """
         :param filename: name of the file to read from
         :type filename: string
+        :param max_edges: read at most max_edges hyperedges (DIMACS-like format only)
+        :type max_edges: int
+        :param debug: cross-check the Fischl reader against the legacy reader (reads the file twice)
+        :type debug: bool
+        :param cache: keep the parsed hypergraph in a binary sidecar file (filename + bincache.SUFFIX), which is
+                      used as long as path, mtime and size of filename do not change
+        :type cache: bool
         :rtype: Graph
         :return: a list of edges and number of vertices
         """
-        return clazz._from_file(filename, fischl_format=fischl_format)
+        if cache:
+            return bincache.cached(filename, {'fischl_format': fischl_format, 'max_edges': max_edges},
+                                   lambda: clazz._from_file(filename, fischl_format=fischl_format,
+                                                            max_edges=max_edges, debug=debug),
+                                   clazz.load_binary,
+                                   lambda hg, cache_file, source: hg.save_binary(cache_file, source=source))
+        return clazz._from_file(filename, fischl_format=fischl_format, max_edges=max_edges, debug=debug)
+
+    def save_binary(self, filename, source=None):
+        """
+        Stores the hypergraph in the binary format of bincache: hyperedges in CSR layout (edge ids, offsets into the
+        concatenated vertices), the vertex set and for non-numerical hypergraphs symbol table and edge labels.
+
+        :param filename: name of the file to write to
+        :param source: source key (sidecar caches only)
+        """
+        offsets = array('q', [0])
+        vertices = array('q')
+        for e in self.__edges.values():
+            vertices.extend(e)
+            offsets.append(len(vertices))
+        meta = {'non_numerical': self.__non_numerical}
+        if self.__non_numerical:
+            meta['symtab'] = list(self.__nsymtab.id2name.items())
+            meta['elabel'] = list(self.__elabel.items())
+        bincache.write(filename, Hypergraph.__name__,
+                       {'edge_ids': array('q', self.__edges), 'offsets': offsets, 'vertices': vertices,
+                        'nodes': array('q', self.__vertices)}, meta=meta, source=source)
+
+    @classmethod
+    def load_binary(clazz, filename):
+        """
+        :param filename: name of a file written by save_binary
+        :rtype: Hypergraph
+        :return: stored hypergraph
+        """
+        with bincache.BinaryFile(filename) as binary:
+            if binary.kind != Hypergraph.__name__:
+                raise IOError('File "%s" contains a %s, expected a hypergraph.' % (filename, binary.kind))
+            edge_ids = binary.array('edge_ids').tolist()
+            offsets = binary.array('offsets').tolist()
+            vertices = binary.array('vertices').tolist()
+            nodes = binary.array('nodes').tolist()
+            meta = binary.meta
+
+        HG = clazz(non_numerical=meta['non_numerical'], vertices=set(nodes))
+        HG.__edges = {k: Hypergraph.__edge_type(vertices[offsets[i]:offsets[i + 1]])
+                      for i, k in enumerate(edge_ids)}
+        if HG.__non_numerical:
+            for k, name in meta['symtab']:
+                HG.__nsymtab.name2id[name] = k
+                HG.__nsymtab.id2name[k] = name
+            HG.__elabel = dict(meta['elabel'])
+        HG.__reindex()
+        return HG
 
     # TODO: check whether we need the header_only option
     @classmethod
-    def _from_file(clazz, filename, header_only=False, fischl_format=False):
+    def _from_file(clazz, filename, header_only=False, fischl_format=False, max_edges=None, debug=False):
         """
         :param filename: name of the file to read from
         :type filename: string
         :param header_only: read header only
+        :param max_edges: read at most max_edges hyperedges (DIMACS-like format only)
+        :param debug: cross-check the Fischl reader against the legacy reader
         :rtype: Graph
         :return: imported hypergraph
         """
@@ -947,30 +1219,24 @@ class Hypergraph(object):
             raise NotImplemented
         stream = None
         try:
-            mtype = mimetypes.guess_type(filename)[1]
-            if mtype is None:
-                stream = open(filename, 'r')
-            elif mtype == 'bzip2':
-                stream = BZ2File(filename, 'r')
-            elif mtype == 'gz':
-                stream = gzip.open(filename, 'r')
-            # TODO(jf): migration
-            elif mtype == 'xz':
-                stream = lzma.open(filename, 'r')
-            else:
-                raise IOError('Unknown input type "%s" for file "%s"' % (mtype, filename))
+            if mimetypes.guess_type(filename)[1] is None and not fischl_format:
+                hypergraph = Hypergraph.frommmap_dimacslike(filename, max_edges=max_edges)
+                if hypergraph is not None:
+                    return hypergraph
+            stream = open_text(filename)
             if fischl_format:
-                hypergraph_old = Hypergraph.fromstream_fischlformat(stream)
-                stream.seek(0)
                 hypergraph = Hypergraph.fromstream_fischlformat_re(stream)
-                if hypergraph_old.number_of_nodes() != hypergraph.number_of_nodes() and \
-                        hypergraph_old.number_of_edges() != hypergraph.number_of_edges():
-                    logging.error(
-                        f"Hypergraph mismatch between old and new reader (#nodes/#hedges). "
-                        f"Old:{hypergraph_old.number_of_nodes()}/{hypergraph_old.number_of_edges()} "
-                        f"New:{hypergraph.number_of_nodes()}/{hypergraph.number_of_edges()}")
+                if debug:
+                    stream.seek(0)
+                    hypergraph_old = Hypergraph.fromstream_fischlformat(stream)
+                    if hypergraph_old.number_of_nodes() != hypergraph.number_of_nodes() or \
+                            hypergraph_old.number_of_edges() != hypergraph.number_of_edges():
+                        logging.error(
+                            f"Hypergraph mismatch between old and new reader (#nodes/#hedges). "
+                            f"Old:{hypergraph_old.number_of_nodes()}/{hypergraph_old.number_of_edges()} "
+                            f"New:{hypergraph.number_of_nodes()}/{hypergraph.number_of_edges()}")
             else:
-                hypergraph = Hypergraph.fromstream_dimacslike(stream)
+                hypergraph = Hypergraph.fromstream_dimacslike(stream, max_edges=max_edges)
         finally:
             if stream:
                 stream.close()
@@ -980,6 +1246,8 @@ class Hypergraph(object):
     def clear(self):
         self.__vertices.clear()
         self.__edges.clear()
+        self.__inc.clear()
+        self.__eseq.clear()
         if self.__non_numerical:
             self.__elabel.clear()
             self.__nsymtab.clear()
@@ -1005,25 +1273,74 @@ class Hypergraph(object):
 
         # remove/avoid already subsets of edges
         if not checkSubsumes or not self.isSubsumed(set(X), checkSubsumes=True):
-            self.__edges[edge_id] = Hypergraph.__edge_type(X)
+            self.__set_edge(edge_id, Hypergraph.__edge_type(X))
             self.__vertices.update(list(X))
         # else:
         #    print("subsumed: ", X)
         return X
 
     def isSubsumed(self, sx, checkSubsumes=False, modulo=-1):
+        if len(sx) == 0:
+            return any(k != modulo for k in self.__edges)
+        # every edge e with sx <= e contains the rarest vertex of sx
+        rarest = min(sx, key=lambda x: len(self.__inc.get(x, ())))
+        subsumed_by = [k for k in self.__inc.get(rarest, ())
+                       if k != modulo and len(self.__edges[k]) >= len(sx) and sx.issubset(self.__edges[k])]
+        subsumes = []
+        if checkSubsumes:
+            # e <= sx iff every (distinct) vertex of e hits sx
+            hits = {}
+            for x in sx:
+                for k in self.__inc.get(x, ()):
+                    hits[k] = hits.get(k, 0) + 1
+            for k, h in hits.items():
+                e = self.__edges[k]
+                if k != modulo and (h == len(e) or (h < len(e) and all(x in sx for x in e))):
+                    subsumes.append(k)
+        if not subsumed_by and not subsumes:
+            return False
+        # the first matching edge (in insertion order) wins
+        k = min(subsumed_by + subsumes, key=self.__eseq.__getitem__)
+        if k not in subsumed_by:  # reset the edge
+            # self.__edges[k][:] = sx
+            self.__set_edge(k, Hypergraph.__edge_type(sx))
+            self.__vertices.update(sx)
+        return True
+
+    def __set_edge(self, k, e):
+        # (re)places hyperedge k and keeps the incidence index in sync
+        if k in self.__edges:
+            self.__unindex_edge(k, self.__edges[k])
+        else:
+            self.__eseq[k] = next(reversed(self.__eseq.values()), -1) + 1
+        self.__edges[k] = e
+        for v in e:
+            try:
+                self.__inc[v].add(k)
+            except KeyError:
+                self.__inc[v] = {k}
+
+    def __remove_edge(self, k):
+        del self.__eseq[k]
+        self.__unindex_edge(k, self.__edges.pop(k))
+
+    def __unindex_edge(self, k, e):
+        for v in e:
+            inc = self.__inc.get(v)
+            if inc is not None:
+                inc.discard(k)
+                if not inc:
+                    del self.__inc[v]
+
+    def __reindex(self):
+        self.__inc = dict()
+        self.__eseq = {k: pos for pos, k in enumerate(self.__edges)}
         for k, e in self.__edges.items():
-            if k == modulo:
-                continue
-            elif sx.issubset(e):
-                return True
-            elif checkSubsumes and sx.issuperset(e):  # reset the edge
-                # print sx, e
-                # self.__edges[k][:] = sx
-                self.__edges[k] = Hypergraph.__edge_type(sx)
-                self.__vertices.update(sx)
-                return True
-        return False
+            for v in e:
+                try:
+                    self.__inc[v].add(k)
+                except KeyError:
+                    self.__inc[v] = {k}
 
     def edge_iter(self):
         return iter(self.__edges.keys())
@@ -1040,6 +1357,10 @@ class Hypergraph(object):
     def num_hyperedges(self):
         return len(self.__edges)
 
+    @property
+    def non_numerical(self):
+        return self.__non_numerical
+
     def get_nsymtab(self):
         return self.__nsymtab
 
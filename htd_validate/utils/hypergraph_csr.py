@@ -0,0 +1,437 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018
+
+#
+
+# *) is not allowed to contain parts of nuts ;P
+#
+# hypergraph.py is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.  hypergraph.py is distributed in
+# the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.  You should have received a copy of the GNU General Public
+# License along with hypergraph.py.  If not, see
+# <http://www.gnu.org/licenses/>.
+from __future__ import absolute_import
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Set
+from itertools import accumulate, chain
+
+from htd_validate.utils import bincache
+from htd_validate.utils.helpers import open_text
+from htd_validate.utils.hypergraph import Hypergraph
+
+# typecode of vertex/hyperedge indices (positions in the CSR arrays)
+_INDEX = 'i'
+
+
+def _as_array(typecode, seq):
+    ret = array(typecode)
+    if isinstance(seq, memoryview) and seq.format == typecode:
+        ret.frombytes(seq.cast('B'))
+    else:
+        ret.extend(seq)
+    return ret
+
+
+class _EdgeView(Mapping):
+    """
+    Read-only mapping hyperedge id -> hyperedge, hyperedges are materialized on access.
+    """
+
+    def __init__(self, hg):
+        self.__hg = hg
+
+    def __getitem__(self, k):
+        return self.__hg.get_edge(k)
+
+    def __iter__(self):
+        return self.__hg.edge_ids_iter()
+
+    def __len__(self):
+        return self.__hg.number_of_edges()
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class _NodeView(Set):
+    """
+    Read-only set of the vertices.
+    """
+
+    def __init__(self, hg):
+        self.__hg = hg
+
+    @classmethod
+    def _from_iterable(cls, it):
+        return set(it)
+
+    def __contains__(self, v):
+        return v in self.__hg
+
+    def __iter__(self):
+        return self.__hg.nodes_iter()
+
+    def __len__(self):
+        return self.__hg.number_of_nodes()
+
+    def __repr__(self):
+        return repr(set(self))
+
+
+class CSRHypergraph(object):
+    """
+    Immutable hypergraph in compressed sparse row (CSR) layout.
+
+    Vertices are remapped to 0..n-1 (in the order of their names), hyperedge i consists of the vertices
+    eind[eptr[i]:eptr[i + 1]] and vertex j occurs in the hyperedges vind[vptr[j]:vptr[j + 1]] (transposed CSR).
+    All arrays are arrays of machine integers, i.e., a few bytes per incidence instead of Python objects.
+
+    The read API equals the one of Hypergraph (vertex names and hyperedge ids are the original ones), hence the
+    decompositions/validators and HypergraphPrimalView work on CSR hypergraphs as well. Mutators raise a TypeError.
+    """
+    __d = {}
+
+    def __init__(self, edge_ids, offsets, vertices, nodes=None, nsymtab=None, elabel=None):
+        """
+        :param edge_ids: ids of the hyperedges
+        :param offsets: hyperedge i consists of the vertices vertices[offsets[i]:offsets[i + 1]]
+        :param vertices: concatenated hyperedges (vertex names, integers)
+        :param nodes: vertices of the hypergraph (default: vertices of the hyperedges)
+        :param nsymtab: symbol table of non-numerical hypergraphs
+        :param elabel: hyperedge labels of non-numerical hypergraphs
+        """
+        labels = set(vertices)
+        if nodes is not None:
+            labels.update(nodes)
+        self.__labels = array('q', sorted(labels))
+        del labels
+        self.__edge_ids = _as_array('q', edge_ids)
+        self.__eptr = _as_array('q', offsets)
+        index = {v: j for j, v in enumerate(self.__labels)}
+        self.__eind = array(_INDEX, map(index.__getitem__, vertices))
+        del index
+
+        # transposed CSR, hyperedges of a vertex are in the order of the hyperedges
+        degree = [0] * (len(self.__labels) + 1)
+        for j in self.__eind:
+            degree[j + 1] += 1
+        self.__vptr = array('q', accumulate(degree))
+        fill = self.__vptr.tolist()
+        self.__vind = array(_INDEX, bytes(len(self.__eind) * array(_INDEX).itemsize))
+        eptr, eind, vind = self.__eptr, self.__eind, self.__vind
+        for i in range(len(self.__edge_ids)):
+            for j in eind[eptr[i]:eptr[i + 1]]:
+                vind[fill[j]] = i
+                fill[j] += 1
+
+        # hyperedge ids are usually consecutive, then no map id -> position is required
+        first = self.__edge_ids[0] if len(self.__edge_ids) else 1
+        if all(k == first + i for i, k in enumerate(self.__edge_ids)):
+            self.__first = first
+            self.__epos = None
+        else:
+            self.__epos = {k: i for i, k in enumerate(self.__edge_ids)}
+        self.__nsymtab = nsymtab
+        self.__elabel = elabel
+
+    @classmethod
+    def from_hypergraph(clazz, hg):
+        """
+        :param hg: hypergraph to convert
+        :type hg: Hypergraph
+        :rtype: CSRHypergraph
+        """
+        edges = hg.edges()
+        offsets = accumulate(chain((0,), map(len, edges.values())))
+        nsymtab = hg.get_nsymtab() if hg.non_numerical else None
+        return clazz(edges.keys(), offsets, list(chain.from_iterable(edges.values())), nodes=hg.nodes(),
+                     nsymtab=nsymtab)
+
+    @classmethod
+    def from_rows(clazz, rows):
+        """
+        Builds the hypergraph from its hyperedges in the arrays of the CSR layout, without an intermediate Hypergraph.
+        The result equals calling Hypergraph.add_hyperedge for every hyperedge in order (see Hypergraph.from_edges):
+        hyperedges with at most one vertex are skipped, a hyperedge contained in an earlier one is dropped and a
+        hyperedge containing an earlier one replaces the first such hyperedge (with its distinct vertices).
+
+        The hyperedges are first collected as given, then replayed in order against a transposed index of the
+        distinct vertices, where a hyperedge is counted as long as it is the current content of a kept hyperedge.
+
+        :param rows: hyperedges, each given as a sequence of (integer) vertices
+        :rtype: CSRHypergraph
+        """
+        offsets, flat = array('q', [0]), array('q')
+        for row in rows:
+            if len(row) > 1:
+                flat.extend(row)
+                offsets.append(len(flat))
+        num_rows = len(offsets) - 1
+        labels = sorted(set(flat))
+        index = {v: j for j, v in enumerate(labels)}
+        # transposed index over the distinct vertices of the rows, rows of a vertex are ascending
+        degree = [0] * (len(labels) + 1)
+        distinct = array('q', [0]) * num_rows
+        for i in range(num_rows):
+            row = set(flat[offsets[i]:offsets[i + 1]])
+            distinct[i] = len(row)
+            for v in row:
+                degree[index[v] + 1] += 1
+        vptr = array('q', accumulate(degree))
+        fill = vptr.tolist()
+        vind = array('q', bytes(vptr[-1] * array('q').itemsize))
+        for i in range(num_rows):
+            for v in set(flat[offsets[i]:offsets[i + 1]]):
+                j = index[v]
+                vind[fill[j]] = i
+                fill[j] += 1
+        del fill, degree
+
+        # owner[r]: kept hyperedge (position) whose content is row r, -1 otherwise; source[k]: row of hyperedge k
+        owner = array('q', [-1]) * num_rows
+        source = array('q')
+        replaced = bytearray()
+        for i in range(num_rows):
+            sx = set(flat[offsets[i]:offsets[i + 1]])
+            # number of vertices of sx in the current content of each earlier row
+            hits = {}
+            for v in sx:
+                j = index[v]
+                for r in vind[vptr[j]:bisect_left(vind, i, vptr[j], vptr[j + 1])]:
+                    if owner[r] >= 0:
+                        hits[r] = hits.get(r, 0) + 1
+            # superset of sx (hits == |sx|) or subset of sx (hits == distinct vertices of r), the first one wins
+            first = min((r for r, h in hits.items() if h == len(sx) or h == distinct[r]), key=owner.__getitem__,
+                        default=None)
+            if first is None:
+                owner[i] = len(source)
+                source.append(i)
+                replaced.append(0)
+            elif hits[first] != len(sx):
+                k = owner[first]
+                owner[first] = -1
+                owner[i] = k
+                source[k] = i
+                replaced[k] = 1
+        del owner, vind, vptr, index
+
+        edge_offsets, vertices = array('q', [0]), array('q')
+        for k, i in enumerate(source):
+            row = flat[offsets[i]:offsets[i + 1]]
+            vertices.extend(tuple(set(row)) if replaced[k] else row)
+            edge_offsets.append(len(vertices))
+        return clazz(range(1, len(source) + 1), edge_offsets, vertices)
+
+    @classmethod
+    def from_file(clazz, filename, strict=False, fischl_format=False, max_edges=None, cache=False):
+        """
+        DIMACS-like files are read into the arrays directly (see from_rows), memory-mapped if uncompressed and line by
+        line otherwise. Files in Fischl format are read into a Hypergraph first (see Hypergraph.from_file), which is
+        converted (see from_hypergraph).
+
+        :param filename: name of the file to read from (see Hypergraph.from_file)
+        :param cache: use/maintain the binary sidecar cache of Hypergraph.from_file
+        :rtype: CSRHypergraph
+        """
+        if cache:
+            return bincache.cached(filename, {'fischl_format': fischl_format, 'max_edges': max_edges},
+                                   lambda: clazz._from_file(filename, fischl_format=fischl_format,
+                                                            max_edges=max_edges),
+                                   clazz.load_binary,
+                                   lambda hg, cache_file, source: hg.save_binary(cache_file, source=source))
+        return clazz._from_file(filename, fischl_format=fischl_format, max_edges=max_edges)
+
+    @classmethod
+    def _from_file(clazz, filename, fischl_format=False, max_edges=None):
+        if fischl_format:
+            return clazz.from_hypergraph(Hypergraph.from_file(filename, fischl_format=True, max_edges=max_edges))
+        counts = {}
+        hg = Hypergraph._scan_dimacslike(filename, clazz.from_rows, counts, max_edges)
+        if hg is None:
+            with open_text(filename) as stream:
+                hg = clazz.from_rows(Hypergraph._dimacslike_rows(stream, counts, max_edges))
+        Hypergraph._check_counts(counts, hg.number_of_nodes(), max_edges)
+        return hg
+
+    def save_binary(self, filename, source=None):
+        """
+        Stores the hypergraph in the binary format of Hypergraph.save_binary.
+
+        :param filename: name of the file to write to
+        :param source: source key (sidecar caches only)
+        """
+        vertices = array('q', map(self.__labels.__getitem__, self.__eind))
+        meta = {'non_numerical': self.non_numerical}
+        if self.non_numerical:
+            meta['symtab'] = list(self.__nsymtab.id2name.items())
+            meta['elabel'] = list((self.__elabel or {}).items())
+        bincache.write(filename, Hypergraph.__name__,
+                       {'edge_ids': self.__edge_ids, 'offsets': self.__eptr, 'vertices': vertices,
+                        'nodes': self.__labels}, meta=meta, source=source)
+
+    @classmethod
+    def load_binary(clazz, filename):
+        """
+        :param filename: name of a file written by Hypergraph.save_binary
+        :rtype: CSRHypergraph
+        """
+        with bincache.BinaryFile(filename) as binary:
+            if binary.kind != Hypergraph.__name__:
+                raise IOError('File "%s" contains a %s, expected a hypergraph.' % (filename, binary.kind))
+            nsymtab = elabel = None
+            if binary.meta['non_numerical']:
+                nsymtab = Hypergraph(non_numerical=True).get_nsymtab()
+                for k, name in binary.meta['symtab']:
+                    nsymtab.name2id[name] = k
+                    nsymtab.id2name[k] = name
+                elabel = dict(binary.meta['elabel'])
+            return clazz(binary.array('edge_ids'), binary.array('offsets'), binary.array('vertices'),
+                         nodes=binary.array('nodes'), nsymtab=nsymtab, elabel=elabel)
+
+    def __index(self, v):
+        try:
+            j = bisect_left(self.__labels, v)
+        except TypeError:
+            raise KeyError(v)
+        if j < len(self.__labels) and self.__labels[j] == v:
+            return j
+        raise KeyError(v)
+
+    def __pos(self, k):
+        if self.__epos is not None:
+            return self.__epos[k]
+        i = k - self.__first if isinstance(k, int) else -1
+        if 0 <= i < len(self.__edge_ids):
+            return i
+        raise KeyError(k)
+
+    def __edge(self, i):
+        return tuple(map(self.__labels.__getitem__, self.__eind[self.__eptr[i]:self.__eptr[i + 1]]))
+
+    def __incident(self, v):
+        try:
+            j = self.__index(v)
+        except KeyError:
+            return ()
+        return self.__vind[self.__vptr[j]:self.__vptr[j + 1]]
+
+    @property
+    def non_numerical(self):
+        return self.__nsymtab is not None
+
+    def get_nsymtab(self):
+        return self.__nsymtab
+
+    def nodes(self):
+        return _NodeView(self)
+
+    def nodes_iter(self):
+        return iter(self.__labels)
+
+    def edges(self):
+        return _EdgeView(self)
+
+    def edges_iter(self):
+        return map(self.__edge, range(len(self.__edge_ids)))
+
+    def get_edge(self, e):
+        return self.__edge(self.__pos(e))
+
+    def edge_ids_iter(self):
+        return iter(self.__edge_ids)
+
+    edge_iter = edge_ids_iter
+    __iter__ = edge_ids_iter
+
+    def number_of_nodes(self):
+        return len(self.__labels)
+
+    __len__ = number_of_nodes
+
+    def number_of_edges(self):
+        return len(self.__edge_ids)
+
+    num_hyperedges = number_of_edges
+
+    def __contains__(self, v):
+        try:
+            self.__index(v)
+            return True
+        except KeyError:
+            return False
+
+    def __nonzero__(self):
+        return True
+
+    def incident_edge_ids(self, v):
+        return {self.__edge_ids[i] for i in self.__incident(v)}
+
+    def incident_edges(self, v):
+        return {self.__edge_ids[i]: self.__edge(i) for i in self.__incident(v)}
+
+    def edge_rank(self, n):
+        return list(map(lambda x: (x, len(x)), self.incident_edges(n).values()))
+
+    def adjByNode(self, v, strict=True):
+        nbh = dict()
+        eptr, eind, labels = self.__eptr, self.__eind, self.__labels
+        for i in self.__incident(v):
+            for j in eind[eptr[i]:eptr[i + 1]]:
+                ex = labels[j]
+                if not strict or ex != v:
+                    nbh[ex] = CSRHypergraph.__d
+        return nbh
+
+    @property
+    def adj(self):
+        return {v: self.adjByNode(v) for v in self.__labels}
+
+    def size_largest_hyperedge(self):
+        return max((b - a for a, b in zip(self.__eptr, self.__eptr[1:])), default=0)
+
+    def largest_hyperedge(self):
+        if not len(self.__edge_ids):
+            return None
+        return self.__edge(max(range(len(self.__edge_ids)), key=lambda i: self.__eptr[i + 1] - self.__eptr[i]))
+
+    def largest_idx(self):
+        return max(self.__labels, default=0)
+
+    iter_twin_neighbours = Hypergraph.iter_twin_neighbours
+    iter_twin_vertices = Hypergraph.iter_twin_vertices
+    write_graph = Hypergraph.write_graph
+    write_dimacs = Hypergraph.write_dimacs
+    write_gr = Hypergraph.write_gr
+    __str__ = Hypergraph.__str__
+    __repr__ = Hypergraph.__repr__
+
+    # immutable, copies share the arrays
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memodict=None):
+        return self
+
+    def copy(self):
+        return self
+
+    def __immutable(self, *args, **kwargs):
+        raise TypeError("%s is immutable." % type(self).__name__)
+
+    __delitem__ = __immutable
+    add_node = __immutable
+    add_hyperedge = __immutable
+    contract_edge = __immutable
+    induce_edges = __immutable
+    relabel = __immutable
+    relabel_consecutively = __immutable
+    clear = __immutable
@@ -44,11 +44,39 @@ class HypergraphPrimalView(object):
     def __init__(self, hypergraph):
         # super(HypergraphPrimalView, self).__init__()
         self.__hg = hypergraph
+        # primal adjacency (vertex -> dict of neighbours), built lazily by adj and patched by remove_node(s_from)
+        self.__adj = None
 
     @property
     def hg(self):
         return self.__hg
 
+    @property
+    def adj(self):
+        """Adjacency of the primal graph, computed once from the hypergraph and cached.
+
+        Modifications of the hypergraph that do not go through the view require a call of invalidate.
+        """
+        if self.__adj is None:
+            self.__adj = self.__hg.adj
+        return self.__adj
+
+    def invalidate(self):
+        """Drop the cached primal adjacency (see adj)."""
+        self.__adj = None
+
+    def __nbrs(self, n):
+        try:
+            return self.adj[n]
+        except (KeyError, TypeError):
+            # vertices not in the hypergraph have no neighbours
+            return {}
+
+    def __remove_adj(self, n):
+        if self.__adj is not None:
+            for u in self.__adj.pop(n, ()):
+                self.__adj[u].pop(n, None)
+
     @property
     def name(self):
         raise NotImplementedError()
@@ -152,7 +180,7 @@ class HypergraphPrimalView(object):
         >>> G[0]
         {1: {}}
         """
-        return self.__hg.adjByNode(n)
+        return self.__nbrs(n)
 
     def add_node(self, n, attr_dict=None, **attr):
         """Add a single node n and update node attributes.
@@ -282,6 +310,8 @@ class HypergraphPrimalView(object):
             del self.__hg[n]
         except KeyError:  # NetworkXError if n not in self
             raise nx.NetworkXError("The node %s is not in the graph." % (n,))
+        # removing n from the hyperedges only removes the primal edges incident to n
+        self.__remove_adj(n)
         # for u in nbrs:
         #    del adj[u][n]  # remove all edges n-u in graph
         # del adj[n]  # now remove node
@@ -323,7 +353,8 @@ class HypergraphPrimalView(object):
                 #    del adj[u][n]  # (allows mutation of dict in loop)
                 # del adj[n]
             except KeyError:
-                pass
+                continue
+            self.__remove_adj(n)
 
     # @deprecated("not tested; now replaced by ASP version in hypergraph")
     # @deprecation.deprecated(deprecated_in="1.0", removed_in="1.0",
@@ -332,7 +363,7 @@ class HypergraphPrimalView(object):
     def largest_clique_sat(self, solver=["glucose", "-model"], return_code_sat=10, timeout=None):
 
         clause = Formula()
-        adj = self.__hg.adj
+        adj = self.adj
 
         sat = return_code_sat
         while sat == return_code_sat:
@@ -603,10 +634,7 @@ class HypergraphPrimalView(object):
         True
 
         """
-        try:
-            return v in self.__hg.adjByNode(u)
-        except KeyError:
-            return False
+        return v in self.__nbrs(u)
         # raise NotImplementedError()
 
     def neighbors(self, n, strict=True):
@@ -646,7 +674,9 @@ class HypergraphPrimalView(object):
 
         """
         try:
-            return self.__hg.adjByNode(n, strict=strict).keys()
+            if not strict:
+                return self.__hg.adjByNode(n, strict=strict).keys()
+            return self.__nbrs(n).keys()
         except KeyError:
             raise nx.NetworkXError("The node %s is not in the graph." % (n,))
 
@@ -669,7 +699,7 @@ class HypergraphPrimalView(object):
         [1]
         """
         try:
-            return iter(self.__hg.adjByNode(n).keys())
+            return iter(self.__nbrs(n).keys())
         except KeyError:
             raise nx.NetworkXError("The node %s is not in the graph." % (n,))
 
@@ -778,9 +808,9 @@ class HypergraphPrimalView(object):
         """
         seen = {}  # helper dict to keep track of multiply stored edges
         if nbunch is None:
-            nodes_nbrs = self.__hg.adj.items()
+            nodes_nbrs = self.adj.items()
         else:
-            nodes_nbrs = ((n, self.__hg.adjByNode[n]) for n in self.nbunch_iter(nbunch))
+            nodes_nbrs = ((n, self.__nbrs(n)) for n in self.nbunch_iter(nbunch))
         if data is True:
             for n, nbrs in nodes_nbrs:
                 for nbr, ddict in nbrs.items():
@@ -847,7 +877,7 @@ class HypergraphPrimalView(object):
         0
         """
         try:
-            return self.__hg.adjByNode(u)[v]
+            return self.__nbrs(u)[v]
         except KeyError:
             return default
 
@@ -874,7 +904,7 @@ class HypergraphPrimalView(object):
         [[1], [0, 2], [1, 3], [2]]
 
         """
-        return list(map(list, iter(self.__hg.adj.values())))
+        return list(map(list, iter(self.adj.values())))
 
     def adjacency_iter(self):
         """Return an iterator of (node, adjacency dict) tuples for all nodes.
@@ -900,7 +930,7 @@ class HypergraphPrimalView(object):
         [(0, {1: {}}), (1, {0: {}, 2: {}}), (2, {1: {}, 3: {}}), (3, {2: {}})]
 
         """
-        return iter(self.__hg.adj.items())
+        return iter(self.adj.items())
 
     def degree(self, nbunch=None, weight=None):
         """Return the degree of a node or nodes.
@@ -982,9 +1012,9 @@ class HypergraphPrimalView(object):
 
         """
         if nbunch is None:  # non lazy
-            nodes_nbrs = self.__hg.adj.items()
+            nodes_nbrs = self.adj.items()
         else:  # lazy
-            nodes_nbrs = ((n, self.__hg.adjByNode(n)) for n in self.nbunch_iter(nbunch))
+            nodes_nbrs = ((n, self.__nbrs(n)) for n in self.nbunch_iter(nbunch))
 
         if weight is None:
             for n, nbrs in nodes_nbrs:
@@ -1018,6 +1048,7 @@ class HypergraphPrimalView(object):
 
         """
         self.__hg.clear()
+        self.invalidate()
 
     def copy(self):
         """Return a copy of the graph.
@@ -1262,7 +1293,7 @@ class HypergraphPrimalView(object):
         1
         """
         if u is None: return int(self.size())
-        if v in self.__hg.adjByNode(u):
+        if v in self.__nbrs(u):
             return 1
         else:
             return 0
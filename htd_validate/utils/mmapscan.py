@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018
+
+#
+
+# *) is not allowed to contain parts of nuts ;P
+#
+# hypergraph.py is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.  hypergraph.py is distributed in
+# the hope that it will be useful, but WITHOUT ANY WARRANTY; without
+# even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.  You should have received a copy of the GNU General Public
+# License along with hypergraph.py.  If not, see
+# <http://www.gnu.org/licenses/>.
+"""
+Zero-copy tokenizer for uncompressed DIMACS-like inputs (.hgr, .gr, .td, .htd, ...).
+
+The file is memory-mapped and split into whitespace separated tokens directly on the mapped buffer using NumPy.
+Integer tokens are decoded in bulk, hence no str objects are created per line. Readers use the scan for the common
+well-formed case and fall back to their text based reader (which produces the detailed error messages) otherwise.
+"""
+from __future__ import absolute_import
+
+import mimetypes
+import mmap
+import os
+
+from htd_validate.utils.helpers import lazy_import
+
+# imported on first use, takes longer than the rest of the package
+np = lazy_import('numpy')
+
+# whitespace as understood by str.split()
+_WHITESPACE = b' \t\n\r\x0b\x0c'
+# longest integer token decoded into int64, longer tokens are treated as words
+_MAX_DIGITS = 18
+# bytes scanned at once (rounded up to whole lines), bounds the temporary per-byte arrays
+CHUNK = 1 << 20
+# lines converted into Python objects at once (see Scan.rows)
+BLOCK = 1 << 16
+
+# line kinds (besides the byte value of a single character first token, e.g. ord('c'))
+NUMBER = 0
+WORD = 1
+
+
+def available(filename):
+    """
+    :param filename: name of the file to read from
+    :return: whether filename can be scanned (NumPy present and file uncompressed)
+    """
+    return np is not None and mimetypes.guess_type(filename)[1] is None
+
+
+def scan(filename):
+    """
+    :param filename: name of the (uncompressed) file to read from
+    :rtype: Scan
+    :return: tokenized file or None if the file cannot be scanned (see available) or is empty
+    """
+    if not available(filename) or os.path.getsize(filename) == 0:
+        return None
+    with open(filename, 'rb') as fobj:
+        mm = mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return Scan(mm)
+    except BaseException:
+        mm.close()
+        raise
+
+
+class Scan(object):
+    """
+    Tokens of a memory-mapped file, grouped by (non-empty) lines.
+
+    The file is scanned in chunks of whole lines, hence the temporary per-byte arrays are bounded by CHUNK. Per token
+    only its value and a flag are kept (5 bytes if all values fit into int32).
+
+    Token arrays (index i is the i-th token of the file):
+      value[i]    integer value of token i (0 if the token is not numeric)
+      numeric[i]  whether token i consists of decimal digits only
+    Line arrays (index l is the l-th non-empty line):
+      ptr[l]:ptr[l+1]  range of the tokens of line l
+      kind[l]     NUMBER, WORD or the byte value of a single character first token (e.g. ord('p'))
+      line_no[l]  line number in the file (1-based)
+    """
+
+    def __init__(self, mm, chunk=CHUNK):
+        self.__mm = mm
+        whitespace = np.zeros(256, dtype=bool)
+        whitespace[list(_WHITESPACE)] = True
+        # a token is numeric iff it contains no byte besides whitespace and digits
+        other = np.ones(256, dtype=bool)
+        other[list(_WHITESPACE)] = False
+        other[ord('0'):ord('9') + 1] = False
+
+        parts = {name: [] for name in ('value', 'numeric', 'heads', 'kind', 'line_no', 'start', 'end')}
+        num_tokens = num_newlines = 0
+        a = 0
+        while a < len(mm):
+            newline = mm.find(b'\n', a + chunk - 1) if a + chunk < len(mm) else -1
+            b = len(mm) if newline < 0 else newline + 1
+            buf = np.frombuffer(mm, dtype=np.uint8, count=b - a, offset=a)
+            newlines = np.flatnonzero(buf == ord('\n'))
+            ws = whitespace[buf]
+            starts = ~ws
+            starts[1:] &= ws[:-1]
+            tok_start = np.flatnonzero(starts)
+            ends = starts
+            np.invert(ws, out=ends)
+            ends[:-1] &= ws[1:]
+            tok_end = np.flatnonzero(ends) + 1
+            del ws, starts, ends
+            if len(tok_start):
+                numeric = ~np.logical_or.reduceat(other[buf], tok_start)
+                length = tok_end - tok_start
+                numeric &= length <= _MAX_DIGITS
+
+                # decode all numeric tokens digit by digit (loop over the positions, not the tokens)
+                value = np.zeros(len(tok_start), dtype=np.int64)
+                idx = np.flatnonzero(numeric)
+                if len(idx):
+                    first, digits, val = tok_start[idx], length[idx], np.zeros(len(idx), dtype=np.int64)
+                    for pos in range(int(digits.max())):
+                        sel = np.flatnonzero(digits > pos)
+                        val[sel] = val[sel] * 10 + (buf[first[sel] + pos] - ord('0'))
+                    value[idx] = val
+                    del first, digits, val, sel
+                if not len(value) or value.max() <= np.iinfo(np.int32).max:
+                    value = value.astype(np.int32)
+
+                # group tokens by lines
+                tok_line = np.searchsorted(newlines, tok_start)
+                heads = np.concatenate(([0], np.flatnonzero(np.diff(tok_line)) + 1))
+                lines = tok_line[heads]
+                del tok_line
+                kind = np.where(numeric[heads], NUMBER, WORD).astype(np.int16)
+                marker = ((tok_end[heads] - tok_start[heads]) == 1) & ~numeric[heads]
+                kind[marker] = buf[tok_start[heads[marker]]]
+
+                parts['value'].append(value)
+                parts['numeric'].append(numeric)
+                parts['heads'].append(heads + num_tokens)
+                parts['kind'].append(kind)
+                parts['line_no'].append(lines + num_newlines + 1)
+                parts['start'].append(np.concatenate(([0], newlines + 1))[lines] + a)
+                parts['end'].append(np.append(newlines, len(buf))[lines] + a)
+                num_tokens += len(tok_start)
+            num_newlines += len(newlines)
+            # views on the mapping have to be released before the mapping can be closed
+            del buf, newlines, tok_start, tok_end
+            a = b
+
+        def concat(name, dtype):
+            return np.concatenate(parts.pop(name)) if parts[name] else np.zeros(0, dtype=dtype)
+
+        self.value = concat('value', np.int32)
+        self.numeric = concat('numeric', bool)
+        self.ptr = np.append(concat('heads', np.int64), num_tokens)
+        self.kind = concat('kind', np.int16)
+        self.line_no = concat('line_no', np.int64)
+        self.__line_start = concat('start', np.int64)
+        self.__line_end = concat('end', np.int64)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.__mm.close()
+
+    def __len__(self):
+        return len(self.kind)
+
+    def text(self, line):
+        """
+        :param line: index of a non-empty line
+        :return: decoded content of the line
+        """
+        return self.__mm[self.__line_start[line]:self.__line_end[line]].decode()
+
+    def tokens(self, line):
+        """
+        :param line: index of a non-empty line
+        :return: decoded tokens of the line
+        """
+        return [tok.decode() for tok in self.__mm[self.__line_start[line]:self.__line_end[line]].split()]
+
+    def token(self, tok):
+        """
+        :param tok: index of a token
+        :return: decoded token
+        """
+        line = int(np.searchsorted(self.ptr, tok, side='right')) - 1
+        return self.tokens(line)[tok - self.ptr[line]]
+
+    def token_lines(self):
+        """
+        :return: for each token the index of its line
+        """
+        return np.repeat(np.arange(len(self.kind)), np.diff(self.ptr))
+
+    def columns(self, lines, count, skip=0):
+        """
+        :param lines: indices of lines
+        :param count: number of tokens per line
+        :param skip: number of leading tokens per line that are ignored
+        :return: (len(lines) x count) array of the values of the tokens skip, ..., skip + count - 1 of the given lines
+                 or None if some line is too short or one of these tokens is not numeric
+        """
+        lines = np.asarray(lines, dtype=np.int64)
+        if (np.diff(self.ptr)[lines] < skip + count).any():
+            return None
+        toks = (self.ptr[lines] + skip)[:, None] + np.arange(count)
+        if not self.numeric[toks].all():
+            return None
+        return self.value[toks]
+
+    def all_numeric(self, lines, skip=0):
+        """
+        :param lines: indices of lines
+        :param skip: number of leading tokens per line that are not checked
+        :return: whether all tokens of the given lines (except the skipped ones) are numeric
+        """
+        lines = np.asarray(lines, dtype=np.int64)
+        sel = np.zeros(len(self.kind), dtype=bool)
+        sel[lines] = True
+        mask = np.repeat(sel, np.diff(self.ptr))
+        for pos in range(skip):
+            heads = self.ptr[lines] + pos
+            mask[heads[heads < self.ptr[lines + 1]]] = False
+        return bool(self.numeric[mask].all())
+
+    def rows(self, lines, skip=0):
+        """
+        :param lines: indices of lines (ascending)
+        :param skip: number of leading tokens per line that are omitted
+        :return: generator of lists of the values of the tokens of the given lines, converted into Python ints in
+                 blocks of BLOCK lines
+        """
+        lines = np.asarray(lines, dtype=np.int64)
+        for i in range(0, len(lines), BLOCK):
+            block = lines[i:i + BLOCK]
+            first = self.ptr[block[0]]
+            values = self.value[first:self.ptr[block[-1] + 1]].tolist()
+            for a, b in zip((self.ptr[block] + skip - first).tolist(), (self.ptr[block + 1] - first).tolist()):
+                yield values[a:b]
@@ -0,0 +1,201 @@
+#!/usr/bin/env false
+"""
+Validation of many (graph, decomposition, type) pairs in one process pool.
+
+A pair is read from a manifest (CSV or JSON lines) or found by walking a directory, every graph is parsed once per
+worker and shared by the decompositions that reference it, and every pair yields one result (see result_line).
+"""
+from __future__ import absolute_import
+
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+from functools import lru_cache
+
+import htd_validate.decompositions
+import htd_validate.utils
+from htd_validate.validators.fhtd import FractionalHypertreeDecompositionValidator
+from htd_validate.validators.ghtd import GeneralizedHypertreeDecompositionValidator
+from htd_validate.validators.htd import HypertreeDecompositionValidator
+from htd_validate.validators.td import TreeDecompositionValidator
+
+validators = {cls.short_name(): cls for cls in (TreeDecompositionValidator,
+                                                GeneralizedHypertreeDecompositionValidator,
+                                                HypertreeDecompositionValidator,
+                                                FractionalHypertreeDecompositionValidator)}
+# graphs kept per worker
+GRAPHS = 16
+
+
+class Pair(object):
+    """
+    A graph file and a decomposition file of the given type (short name of the validator, e.g., 'td').
+    """
+
+    def __init__(self, graph, decomposition, type):
+        if type not in validators:
+            raise ValueError('Unknown decomposition type "%s" (expected one of %s).' % (type, sorted(validators)))
+        self.graph = graph
+        self.decomposition = decomposition
+        self.type = type
+
+    def __eq__(self, other):
+        return (self.graph, self.decomposition, self.type) == (other.graph, other.decomposition, other.type)
+
+    def __repr__(self):
+        return 'Pair(%r, %r, %r)' % (self.graph, self.decomposition, self.type)
+
+
+def read_manifest(filename, default_type=None):
+    """
+    Reads the pairs of a manifest, either JSON lines (objects with keys graph, decomposition and type) or CSV (columns
+    graph, decomposition and type, an optional header line). Relative paths are relative to the manifest.
+
+    :param filename: name of the manifest
+    :param default_type: type of pairs without a type
+    :return: list of Pair
+    """
+    folder = os.path.dirname(os.path.abspath(filename))
+    ret = []
+    with open(filename, newline='') as fobj:
+        for line_no, line in enumerate(fobj, start=1):
+            if not line.strip() or line.startswith('#'):
+                continue
+            if line.lstrip().startswith('{'):
+                row = json.loads(line)
+                row = [row.get('graph'), row.get('decomposition'), row.get('type')]
+            else:
+                row = [field.strip() for field in next(csv.reader([line]))]
+                if line_no == 1 and row[:2] == ['graph', 'decomposition']:
+                    continue
+            if len(row) < 2 or not row[0] or not row[1]:
+                raise ValueError('%s:%s: expected graph, decomposition and type.' % (filename, line_no))
+            decomposition_type = row[2] if len(row) > 2 and row[2] else default_type
+            ret.append(Pair(os.path.normpath(os.path.join(folder, row[0])),
+                            os.path.normpath(os.path.join(folder, row[1])), decomposition_type))
+    return ret
+
+
+def walk(folder):
+    """
+    Finds the pairs in a directory tree like the validator tests do: in every directory, a decomposition file
+    (extension td, ghtd, htd or fhtd) belongs to the graph file preceding it in sorted order.
+
+    :param folder: root of the directory tree
+    :return: list of Pair
+    """
+    ret = []
+    for subdir, dirs, files in os.walk(folder):
+        dirs.sort()
+        graph = None
+        for file in sorted(files):
+            extension = os.path.splitext(file)[1][1:]
+            if extension in validators:
+                if graph is None:
+                    logging.warning('Graph file missing for decomposition file "%s".' % os.path.join(subdir, file))
+                    continue
+                ret.append(Pair(graph, os.path.join(subdir, file), extension))
+            else:
+                graph = os.path.join(subdir, file)
+    return ret
+
+
+@lru_cache(maxsize=GRAPHS)
+def _graph(filename, graph_type, fischl_format, strict):
+    return getattr(htd_validate.utils, graph_type).from_file(filename, strict=strict, fischl_format=fischl_format)
+
+
+def _width(decomp):
+    # the width of a tree decomposition without (non-empty) bags is 0
+    width = decomp.function_width if hasattr(decomp, 'function_width') else max(decomp.bag_size - 1, 0)
+    return width if isinstance(width, int) else float(width)
+
+
+def validate_pair(pair, fischl_format=False, strict=False, graph=None, details=False, exact=False, bitsets=False):
+    """
+    :param pair: Pair
+    :param graph: graph of the pair, read from pair.graph if omitted
+    :param details: check all properties and report their violations (see Decomposition.report)
+    :param exact: sum fractional weights exactly (see Decomposition.from_file)
+    :param bitsets: validate with bags and hyperedges as bitmasks (see Decomposition.bitsets)
+    :return: dict with the pair, the verdict valid (None if an input is malformed), the exit status of a single
+             validation (0 valid, 1 invalid, 2 malformed input), the width, an error message, the time in seconds and
+             (with details) the violations per property
+    """
+    start = time.time()
+    ret = {'graph': pair.graph, 'decomposition': pair.decomposition, 'type': pair.type, 'valid': None, 'status': 2,
+           'width': None, 'error': None}
+    validator = validators[pair.type]
+    try:
+        if graph is None:
+            graph = _graph(pair.graph, validator.graph_type(), fischl_format, strict)
+        decomp = getattr(htd_validate.decompositions, validator.decomposition_type()).from_file(pair.decomposition,
+                                                                                                strict=strict,
+                                                                                                exact=exact)
+        decomp.bitsets = bitsets
+        ret['width'] = _width(decomp)
+        if details:
+            report = decomp.report(graph)
+            ret['violations'] = report.to_dict()['violations']
+            ret['valid'] = report.valid
+        else:
+            ret['valid'] = bool(decomp.validate(graph))
+        ret['status'] = int(not ret['valid'])
+    except SystemExit as e:
+        ret['error'] = 'Malformed input (exit status %s).' % e.code
+    except Exception as e:
+        ret['error'] = '%s: %s' % (type(e).__name__, e)
+    ret['seconds'] = round(time.time() - start, 6)
+    return ret
+
+
+def _validate_chunk(args):
+    chunk, fischl_format, strict, options = args
+    return [validate_pair(pair, fischl_format, strict, **options) for pair in chunk]
+
+
+def validate_pairs(pairs, workers=None, fischl_format=False, strict=False, details=False, exact=False, bitsets=False):
+    """
+    Validates the pairs in a process pool. The pairs of a graph are split into at most one chunk per worker, a worker
+    parses the graph of a chunk once (and keeps the last GRAPHS graphs).
+
+    :param pairs: list of Pair
+    :param workers: number of worker processes (default: number of CPUs), validates in this process if 1
+    :param details, exact, bitsets: see validate_pair
+    :return: iterator over the results (see validate_pair) in the order of completion
+    """
+    workers = workers or os.cpu_count() or 1
+    groups = {}
+    for pair in pairs:
+        groups.setdefault((pair.graph, validators[pair.type].graph_type()), []).append(pair)
+    options = {'details': details, 'exact': exact, 'bitsets': bitsets}
+    chunks = []
+    for group in groups.values():
+        size = max(1, -(-len(group) // workers))
+        chunks.extend((group[start:start + size], fischl_format, strict, options)
+                      for start in range(0, len(group), size))
+    if workers == 1:
+        for chunk in chunks:
+            for ret in _validate_chunk(chunk):
+                yield ret
+        return
+    ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    pool = ctx.Pool(min(workers, len(chunks) or 1))
+    try:
+        for results in pool.imap_unordered(_validate_chunk, chunks):
+            for ret in results:
+                yield ret
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def result_line(result):
+    """
+    :param result: result of validate_pair
+    :return: the result as one line of JSON (without newline)
+    """
+    return json.dumps(result, sort_keys=True)
@@ -0,0 +1,150 @@
+#!/usr/bin/env false
+"""
+Validation daemon on a Unix domain socket, which keeps the parsed graphs between requests.
+
+A request is one line of JSON with the keys graph (path), type (default 'td'), either decomposition (path) or text
+(the decomposition itself) and optionally fischl_format and strict; paths are relative to the working directory of
+the server. The answer is one line of JSON, the result of batch.validate_pair with the violations per property (see
+ValidationReport) and whether the graph was cached. A connection may send several requests.
+"""
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import tempfile
+from collections import OrderedDict
+
+import htd_validate.utils
+from htd_validate.validators import batch
+
+# graphs kept by the server
+GRAPHS = 32
+
+
+def content_hash(filename, block=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as fobj:
+        for data in iter(lambda: fobj.read(block), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class GraphCache(object):
+    """
+    LRU cache of parsed graphs keyed by path and content hash (and how the graph is parsed), a changed file is parsed
+    again.
+    """
+
+    def __init__(self, capacity=GRAPHS):
+        self.capacity = capacity
+        self.graphs = OrderedDict()
+
+    def __len__(self):
+        return len(self.graphs)
+
+    def get(self, filename, graph_type, fischl_format=False, strict=False):
+        """
+        :return: pair (graph, whether it was cached)
+        """
+        key = os.path.realpath(filename), content_hash(filename), graph_type, fischl_format, strict
+        try:
+            self.graphs.move_to_end(key)
+            return self.graphs[key], True
+        except KeyError:
+            pass
+        graph = getattr(htd_validate.utils, graph_type).from_file(filename, strict=strict, fischl_format=fischl_format)
+        self.graphs[key] = graph
+        if len(self.graphs) > self.capacity:
+            self.graphs.popitem(last=False)
+        return graph, False
+
+
+class ValidationHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                ret = self.server.validate(json.loads(line.decode()))
+            except SystemExit as e:
+                # malformed graph
+                ret = {'valid': None, 'status': 2, 'error': 'Malformed input (exit status %s).' % e.code}
+            except (ValueError, KeyError, TypeError, OSError) as e:
+                ret = {'valid': None, 'status': 2, 'error': '%s: %s' % (type(e).__name__, e)}
+            self.wfile.write((json.dumps(ret, sort_keys=True) + '\n').encode())
+            self.wfile.flush()
+
+
+class ValidationServer(socketserver.UnixStreamServer):
+    """
+    Answers the requests one after another (see module docstring).
+    """
+
+    def __init__(self, path, capacity=GRAPHS):
+        if os.path.exists(path):
+            os.unlink(path)
+        socketserver.UnixStreamServer.__init__(self, path, ValidationHandler)
+        self.graphs = GraphCache(capacity)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+    def validate(self, request):
+        decomposition_type = request.get('type', 'td')
+        if decomposition_type not in batch.validators:
+            raise ValueError('Unknown decomposition type "%s".' % decomposition_type)
+        if ('decomposition' in request) == ('text' in request):
+            raise ValueError('Expected either decomposition or text.')
+        fischl_format, strict = bool(request.get('fischl_format')), bool(request.get('strict'))
+        graph, cached = self.graphs.get(request['graph'], batch.validators[decomposition_type].graph_type(),
+                                        fischl_format, strict)
+        if 'decomposition' in request:
+            pair = batch.Pair(request['graph'], request['decomposition'], decomposition_type)
+            ret = batch.validate_pair(pair, strict=strict, graph=graph, details=True)
+        else:
+            with tempfile.NamedTemporaryFile('w', suffix='.' + decomposition_type) as fobj:
+                fobj.write(request['text'])
+                fobj.flush()
+                pair = batch.Pair(request['graph'], fobj.name, decomposition_type)
+                ret = batch.validate_pair(pair, strict=strict, graph=graph, details=True)
+            ret['decomposition'] = None
+        ret['cached'] = cached
+        return ret
+
+
+def serve(path, capacity=GRAPHS):
+    """
+    Serves validation requests on the Unix domain socket path until interrupted or terminated.
+    """
+    server = ValidationServer(path, capacity)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def request(path, **kwargs):
+    """
+    Sends one request (see module docstring) to the server listening on path, relative paths of files are relative to
+    the working directory of the client.
+
+    :return: the answer of the server
+    """
+    for key in ('graph', 'decomposition'):
+        if key in kwargs:
+            kwargs[key] = os.path.abspath(kwargs[key])
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        with sock.makefile('rwb') as fobj:
+            fobj.write((json.dumps(kwargs) + '\n').encode())
+            fobj.flush()
+            return json.loads(fobj.readline().decode())
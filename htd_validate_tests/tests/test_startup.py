@@ -0,0 +1,44 @@
+#!/usr/bin/env false
+from __future__ import absolute_import
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+root = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '../..'))
+# optional or heavy modules that are imported on first use only
+lazy = ['numpy', 'cplex', 'z3', 'clingo', 'matplotlib', 'pygraphviz', 'multiprocessing']
+loaded = "import json, sys, types; print(json.dumps(sorted(m for m in sys.modules if type(sys.modules[m]) is " \
+         "types.ModuleType)))"
+
+
+class TestStartup(unittest.TestCase):
+    def importtime(self, *args):
+        """
+        :return: triple (cumulative import time in seconds per imported module, names of the executed modules if
+                 printed by the code, exit status)
+        """
+        out = subprocess.run([sys.executable, '-X', 'importtime'] + list(args), cwd=root, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+        times = {}
+        for line in out.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, cumulative, name = line[len('import time:'):].split('|')
+                if cumulative.strip().isdigit():
+                    times[name.strip()] = int(cumulative) / 1e6
+        modules = json.loads(out.stdout.splitlines()[-1]) if out.stdout.startswith('[') else None
+        return times, modules, out.returncode
+
+    def test_import_time(self):
+        for module in ['htd_validate.utils', 'htd_validate.decompositions']:
+            times, modules, status = self.importtime('-c', 'import %s; %s' % (module, loaded))
+            self.assertEqual(0, status)
+            print('import %s: %.3fs' % (module, times['htd_validate']))
+            self.assertEqual([], [m for m in modules if m.split('.')[0] in lazy])
+
+    def test_help(self):
+        times, _, status = self.importtime(os.path.join('bin', 'htd_validate'), '--help')
+        self.assertEqual(0, status)
+        print('htd_validate --help: %.3fs' % sum(t for m, t in times.items() if '.' not in m))
+        self.assertEqual([], [m for m in times if m.split('.')[0] in lazy + ['networkx', 'htd_validate']])
@@ -4,8 +4,14 @@ import htd_validate
 
 import logging
 import htd_validate_tests.tests.utils.validateGraph_testcase as vtd
+import gzip
+import io
+import lzma
 import os
+import tempfile
+import htd_validate.utils.bincache
 import htd_validate.utils.hypergraph
+import htd_validate.utils.mmapscan
 import htd_validate.utils.hypergraph_primalview as hgv
 
 class TestHypergraph(vtd.ValidateGraphTestCase):
@@ -58,6 +64,211 @@ class TestHypergraph(vtd.ValidateGraphTestCase):
         self.assertEqual([1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12], sorted(hg.adj[2].keys()))
         self.assertEqual([1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12], sorted(hg.adj[2].keys()))
 
+    def testPrimalViewCache(self):
+        hg = self.loadFile(self.filePath("testHG/") + "C13_7.edge")
+        pv = hgv.HypergraphPrimalView(hg)
+        self.assertEqual([1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13], sorted(pv[2]))
+        self.assertIs(pv.adj, pv.adj)
+        pv.remove_node(13)
+        pv.remove_nodes_from([12, 42])
+        self.assertEqual({v: hg.adjByNode(v) for v in hg.nodes()}, pv.adj)
+        self.assertFalse(pv.has_edge(2, 13))
+        self.assertEqual({}, pv[13])
+        hg.add_hyperedge([1, 42])
+        pv.invalidate()
+        self.assertTrue(pv.has_edge(1, 42))
+
+    def testIncidentEdges(self):
+        hg = self.loadFile(self.filePath("testHG/") + "C13_7.edge")
+        self.assertEqual([1, 8, 9, 10, 11, 12, 13], sorted(hg.incident_edges(1).keys()))
+        self.assertEqual([7, 8, 9, 10, 11, 12, 13], sorted(hg.incident_edges(13).keys()))
+        # the incidence index cannot be modified through the result
+        self.assertIsInstance(hg.incident_edge_ids(13), frozenset)
+        self.assertEqual([7, 8, 9, 10, 11, 12, 13], sorted(hg.incident_edge_ids(13)))
+        del hg[13]
+        self.assertNotIn(13, hg)
+        self.assertEqual({}, hg.incident_edges(13))
+        for v in hg.nodes():
+            self.assertEqual(sorted(k for k, e in hg.edges().items() if v in e), sorted(hg.incident_edges(v)))
+        hg.contract_edge([1, 2], 1)
+        self.assertEqual({}, hg.incident_edges(2))
+        for v in hg.nodes():
+            self.assertEqual(sorted(k for k, e in hg.edges().items() if v in e), sorted(hg.incident_edges(v)))
+
+    def testSubsumption(self):
+        hg = htd_validate.Hypergraph()
+        hg.add_hyperedge([1, 2])
+        hg.add_hyperedge([3, 4])
+        hg.add_hyperedge([2, 3, 5])
+        # subset of an existing edge is dropped
+        hg.add_hyperedge([3, 2])
+        self.assertEqual(3, hg.number_of_edges())
+        # superset replaces the first edge it subsumes
+        hg.add_hyperedge([1, 2, 3, 4])
+        self.assertEqual({1: {1, 2, 3, 4}, 2: {3, 4}, 3: {2, 3, 5}}, {k: set(e) for k, e in hg.edges().items()})
+        self.assertEqual([1, 2], sorted(hg.incident_edges(4)))
+        hg.add_hyperedge([3, 4], checkSubsumes=False)
+        self.assertEqual(4, hg.number_of_edges())
+
+    def testFromEdges(self):
+        edges = [[1, 2], [3, 4], [2, 1], [5], [2, 3, 5], [1, 2, 3, 4]]
+        hg = htd_validate.Hypergraph.from_edges(edges)
+        # same as add_hyperedge: the superset replaces the first edge it subsumes, ids stay in place
+        ref = htd_validate.Hypergraph()
+        for e in edges:
+            ref.add_hyperedge(e)
+        self.assertEqual(ref.edges(), hg.edges())
+        self.assertEqual({1: (1, 2, 3, 4), 2: (3, 4), 3: (2, 3, 5)}, hg.edges())
+        self.assertEqual({1, 2, 3, 4, 5}, hg.nodes())
+        self.assertEqual([1, 2, 3], sorted(hg.incident_edges(3)))
+        hg = htd_validate.Hypergraph.from_edges(edges, cleanup=True)
+        self.assertEqual({1: (1, 2, 3, 4), 2: (2, 3, 5)}, hg.edges())
+        self.assertEqual([1, 2], sorted(hg.incident_edges(3)))
+        hg = htd_validate.Hypergraph.from_edges(edges, checkSubsumes=False)
+        self.assertEqual(5, hg.number_of_edges())
+        hg = htd_validate.Hypergraph.from_edges([["a", "b"], ["b", "c", "a"]], non_numerical=True, names=["r", "s"])
+        self.assertEqual(1, hg.number_of_edges())
+        self.assertEqual({1, 2, 3}, set(hg.edges()[1]))
+        self.assertEqual(1, hg.get_nsymtab()["a"])
+
+    def testStreamingReader(self):
+        hg = self.loadFile(self.filePath("testHG/") + "C13_7.edge")
+        sample = htd_validate.Hypergraph.from_file(self.filePath("testHG/") + "C13_7.edge", max_edges=3)
+        self.assertEqual(3, sample.number_of_edges())
+        self.assertEqual({k: hg.get_edge(k) for k in (1, 2, 3)}, sample.edges())
+        with open(self.filePath("testHG/") + "C13_7.edge", 'rb') as fobj:
+            content = fobj.read()
+        with tempfile.TemporaryDirectory() as tmp:
+            for ext, opener in (('xz', lzma.open), ('gz', gzip.open)):
+                fname = os.path.join(tmp, "C13_7.edge.%s" % ext)
+                with opener(fname, 'wb') as fobj:
+                    fobj.write(content)
+                self.assertEqual(hg.edges(), self.loadFile(fname).edges())
+
+    def testMmapReader(self):
+        if htd_validate.utils.mmapscan.np is None:
+            self.skipTest("NumPy not available")
+        fname = self.filePath("testHG/") + "C13_7.edge"
+        with open(fname, 'r') as fobj:
+            hg = htd_validate.Hypergraph.fromstream_dimacslike(fobj)
+        self.assertEqual(hg.edges(), htd_validate.Hypergraph.frommmap_dimacslike(fname).edges())
+        self.assertEqual(3, htd_validate.Hypergraph.frommmap_dimacslike(fname, max_edges=3).number_of_edges())
+        with tempfile.TemporaryDirectory() as tmp:
+            fname = os.path.join(tmp, "dimacs.hgr")
+            with open(fname, 'w') as fobj:
+                fobj.write("c comment\np edge 4 2\ne 1 2 3\n\n  e 3 4\n")
+            self.assertEqual({1: (1, 2, 3), 2: (3, 4)}, htd_validate.Hypergraph.frommmap_dimacslike(fname).edges())
+            # non-integer tokens are left to the text reader
+            with open(fname, 'w') as fobj:
+                fobj.write("1 2 x\n")
+            self.assertIsNone(htd_validate.Hypergraph.frommmap_dimacslike(fname))
+            self.assertRaises(ValueError, htd_validate.Hypergraph.from_file, fname)
+
+    def testHeaderCounts(self):
+        # fewer hyperedges or vertices than announced in the header are reported by both readers
+        def stream(fname):
+            with open(fname) as fobj:
+                return htd_validate.Hypergraph.fromstream_dimacslike(fobj)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            fname = os.path.join(tmp, "dimacs.hgr")
+            for header, warnings in (("p edge 5 2", ["vertices missing: read=4 announced=5"]),
+                                     ("p edge 4 3", ["edges missing: read=2 announced=3"]),
+                                     ("p edge 3 2", [])):
+                with open(fname, 'w') as fobj:
+                    fobj.write("%s\ne 1 2 3\ne 3 4\n" % header)
+                for read in (htd_validate.Hypergraph.from_file, stream):
+                    with self.assertLogs(level=logging.WARNING) as logs:
+                        read(fname)
+                        logging.warning("end")
+                    self.assertEqual(warnings + ["end"], [r.getMessage() for r in logs.records])
+
+    def testBinary(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for fname, fischl_format in (("C13_7.edge", False), ("s641.hg", True)):
+                hg = self.loadFile(self.filePath("testHG/") + fname, fischl_format=fischl_format)
+                hg.save_binary(os.path.join(tmp, fname + ".bin"))
+                hg_bin = htd_validate.Hypergraph.load_binary(os.path.join(tmp, fname + ".bin"))
+                self.assertEqual(list(hg.edges().items()), list(hg_bin.edges().items()))
+                self.assertEqual(hg.nodes(), hg_bin.nodes())
+                for v in hg.nodes():
+                    self.assertEqual(hg.incident_edges(v), hg_bin.incident_edges(v))
+                if fischl_format:
+                    self.assertEqual(hg.get_nsymtab().name2id, hg_bin.get_nsymtab().name2id)
+
+            # sidecar cache, invalidated by changes of the source
+            fname = os.path.join(tmp, "C3.edge")
+            with open(fname, 'w') as fobj:
+                fobj.write("1 2\n2 3\n3 1\n")
+            self.assertEqual(3, htd_validate.Hypergraph.from_file(fname, cache=True).number_of_edges())
+            self.assertTrue(os.path.exists(fname + htd_validate.utils.bincache.SUFFIX))
+            self.assertEqual(3, htd_validate.Hypergraph.from_file(fname, cache=True).number_of_edges())
+            with open(fname, 'w') as fobj:
+                fobj.write("1 2 3\n")
+            self.assertEqual(1, htd_validate.Hypergraph.from_file(fname, cache=True).number_of_edges())
+            self.assertEqual(1, htd_validate.Hypergraph.load_binary(fname + htd_validate.utils.bincache.SUFFIX)
+                             .number_of_edges())
+
+    def testCSR(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for fname, fischl_format in (("C13_7.edge", False), ("s641.hg", True)):
+                hg = self.loadFile(self.filePath("testHG/") + fname, fischl_format=fischl_format)
+                hg.save_binary(os.path.join(tmp, fname + ".bin"))
+                for csr in (htd_validate.utils.CSRHypergraph.from_hypergraph(hg),
+                            htd_validate.utils.CSRHypergraph.load_binary(os.path.join(tmp, fname + ".bin"))):
+                    self.assertEqual(hg.edges(), csr.edges())
+                    self.assertEqual(list(hg.edges()), list(csr.edges()))
+                    self.assertEqual(hg.nodes(), csr.nodes())
+                    self.assertEqual(hg.get_edge(2), csr.get_edge(2))
+                    for v in hg.nodes_iter():
+                        self.assertEqual(hg.incident_edges(v), csr.incident_edges(v))
+                        self.assertEqual(hg.adjByNode(v), csr.adjByNode(v))
+                    self.assertEqual({}, csr.incident_edges(-1))
+                    self.assertNotIn(-1, csr)
+                    self.assertEqual(sorted(hgv.HypergraphPrimalView(hg).edges()),
+                                     sorted(hgv.HypergraphPrimalView(csr).edges()))
+                    self.assertRaises(TypeError, csr.add_hyperedge, [1, 2])
+                    self.assertRaises(TypeError, csr.__delitem__, 1)
+                if fischl_format:
+                    self.assertEqual(hg.get_nsymtab().name2id, csr.get_nsymtab().name2id)
+
+    def testCSRFromFile(self):
+        CSR = htd_validate.utils.CSRHypergraph
+        # subsumed hyperedges are dropped, subsuming ones replace the first subsumed one
+        rows = [[1, 2], [2, 3, 3], [1, 2, 4], [3], [2, 3], [3, 2, 5, 1], [4, 5], [5, 4, 4]]
+        self.assertEqual(htd_validate.Hypergraph.from_edges(rows).edges(), CSR.from_rows(rows).edges())
+        with tempfile.TemporaryDirectory() as tmp:
+            for fname, fischl_format in (("C13_7.edge", False), ("s641.hg", True)):
+                source = self.filePath("testHG/") + fname
+                hg = htd_validate.Hypergraph.from_file(source, fischl_format=fischl_format)
+                with open(source, 'rb') as fobj:
+                    content = fobj.read()
+                # the sidecar caches are written next to the copies
+                with open(os.path.join(tmp, fname), 'wb') as fobj:
+                    fobj.write(content)
+                with gzip.open(os.path.join(tmp, fname + ".gz"), 'wb') as fobj:
+                    fobj.write(content)
+                for name in (os.path.join(tmp, fname), os.path.join(tmp, fname + ".gz")):
+                    for cache in (False, True, True):
+                        csr = CSR.from_file(name, fischl_format=fischl_format, cache=cache)
+                        self.assertIsInstance(csr, CSR)
+                        self.assertEqual(list(hg.edges().items()), list(csr.edges().items()))
+                        self.assertEqual(hg.nodes(), csr.nodes())
+                        if fischl_format:
+                            self.assertEqual(hg.get_nsymtab().name2id, csr.get_nsymtab().name2id)
+                if not fischl_format:
+                    self.assertEqual(3, CSR.from_file(source, max_edges=3).number_of_edges())
+
+    def testFischlReader(self):
+        hg = htd_validate.Hypergraph.fromstream_fischlformat_re(
+            io.StringIO("% comment\nNOT61 (G360,\n  G218),\nDFF18\n (G81, G131),AND21(G81, G131,\n G360\n)."))
+        self.assertEqual({1: (1, 2), 2: (1, 3, 4)}, hg.edges())
+        self.assertEqual({'G360': 1, 'G218': 2, 'G81': 3, 'G131': 4}, hg.get_nsymtab().name2id)
+        hg = self.loadFile(self.filePath("testHG/") + "s641.hg", fischl_format=True)
+        hg_debug = htd_validate.Hypergraph.from_file(self.filePath("testHG/") + "s641.hg", fischl_format=True,
+                                                     debug=True)
+        self.assertEqual(hg.edges(), hg_debug.edges())
+
     def testFractionalCover(self):
         sol = {}
         hg = self.loadFile(self.filePath("testHG/") + "C13_7.edge")
@@ -0,0 +1,89 @@
+#!/usr/bin/env false
+from __future__ import absolute_import
+import json
+import os
+import tempfile
+import unittest
+
+from htd_validate.validators import batch
+
+
+class TestBatch(unittest.TestCase):
+    _folder = os.path.dirname(os.path.realpath(__file__))
+
+    def test_walk(self):
+        pairs = batch.walk(os.path.join(self._folder, "td", "valid"))
+        self.assertTrue(pairs)
+        for pair in pairs:
+            self.assertEqual("td", pair.type)
+            self.assertEqual(os.path.splitext(pair.graph)[0], os.path.splitext(pair.decomposition)[0])
+
+    def test_validate_pairs(self):
+        # same verdicts as the validator tests, in this process and in a pool
+        for folder, status in (("valid", 0), ("invalid", 1)):
+            pairs = batch.walk(os.path.join(self._folder, "htd", folder))
+            for workers in (1, 3):
+                results = list(batch.validate_pairs(pairs, workers=workers))
+                self.assertEqual(sorted(pair.decomposition for pair in pairs),
+                                 sorted(result["decomposition"] for result in results))
+                self.assertEqual([status] * len(pairs), [result["status"] for result in results])
+                for result in results:
+                    self.assertEqual(result, json.loads(batch.result_line(result)))
+
+    def test_malformed(self):
+        pairs = batch.walk(os.path.join(self._folder, "td", "invalid_format"))
+        for result in batch.validate_pairs(pairs, workers=1):
+            self.assertEqual(2, result["status"])
+            self.assertIsNone(result["valid"])
+            self.assertTrue(result["error"])
+
+    def test_graph_cache(self):
+        # one graph shared by two decompositions is parsed once
+        folder = os.path.join(self._folder, "td", "valid")
+        pair = batch.walk(folder)[0]
+        batch._graph.cache_clear()
+        results = list(batch.validate_pairs([pair, batch.Pair(pair.graph, pair.decomposition, "td")], workers=1))
+        self.assertEqual([0, 0], [result["status"] for result in results])
+        self.assertEqual((1, 1), (batch._graph.cache_info().hits, batch._graph.cache_info().misses))
+
+    def test_read_manifest(self):
+        pair = batch.walk(os.path.join(self._folder, "ghtd", "valid"))[0]
+        with tempfile.TemporaryDirectory() as tmp:
+            graph, decomposition = os.path.relpath(pair.graph, tmp), os.path.relpath(pair.decomposition, tmp)
+            csv_file, json_file = os.path.join(tmp, "pairs.csv"), os.path.join(tmp, "pairs.jsonl")
+            with open(csv_file, "w") as fobj:
+                fobj.write("graph,decomposition,type\n%s,%s,ghtd\n%s,%s,\n" % (graph, decomposition, graph,
+                                                                               decomposition))
+            with open(json_file, "w") as fobj:
+                fobj.write(json.dumps({"graph": graph, "decomposition": decomposition, "type": "ghtd"}) + "\n")
+            self.assertEqual([pair, pair], batch.read_manifest(csv_file, default_type="ghtd"))
+            self.assertEqual([pair], batch.read_manifest(json_file))
+            self.assertRaises(ValueError, batch.read_manifest, csv_file)
+
+    def test_options(self):
+        # the options of a single validation apply to every pair
+        pairs = [pair for folder in ("valid", "invalid")
+                 for pair in batch.walk(os.path.join(self._folder, "fhtd", folder)) if pair.type == "fhtd"]
+        plain = {r["decomposition"]: r for r in batch.validate_pairs(pairs, workers=1)}
+        for workers in (1, 2):
+            for result in batch.validate_pairs(pairs, workers=workers, details=True, bitsets=True):
+                self.assertEqual(plain[result["decomposition"]]["status"], result["status"])
+                self.assertIn("violations", result)
+        with tempfile.TemporaryDirectory() as tmp:
+            graph, decomposition = os.path.join(tmp, "triangle.edge"), os.path.join(tmp, "triangle.fhtd")
+            with open(graph, "w") as fobj:
+                fobj.write("1 2\n2 3\n1 3\n")
+            # 1 and 3 are covered up to epsilon only
+            with open(decomposition, "w") as fobj:
+                fobj.write("s fhtd 1 1.4995 3 3\nb 1 1 2 3\nw 1 1 0.5\nw 1 2 0.5\nw 1 3 0.4995\n")
+            pair = batch.Pair(graph, decomposition, "fhtd")
+            self.assertEqual(0, batch.validate_pair(pair)["status"])
+            self.assertEqual(1, batch.validate_pair(pair, exact=True)["status"])
+            self.assertEqual([1], [r["status"] for r in batch.validate_pairs([pair], workers=1, exact=True)])
+            # an empty tree decomposition has width 0
+            with open(graph, "w") as fobj:
+                fobj.write("p tw 0 0\n")
+            with open(decomposition, "w") as fobj:
+                fobj.write("s td 0 0 0\n")
+            result = batch.validate_pair(batch.Pair(graph, decomposition, "td"))
+            self.assertEqual(0, result["width"])
@@ -0,0 +1,142 @@
+#!/usr/bin/env false
+from __future__ import absolute_import
+import os
+import tempfile
+import unittest
+from fractions import Fraction
+
+import networkx as nx
+from htd_validate.decompositions import (FractionalHypertreeDecomposition, GeneralizedHypertreeDecomposition,
+                                         HypertreeDecomposition, IncrementalValidator, TreeDecomposition)
+from htd_validate.utils import Graph, Hypergraph
+
+
+class TestIncrementalValidator(unittest.TestCase):
+    _folder = os.path.dirname(os.path.realpath(__file__))
+
+    def test_bags(self):
+        graph = Graph()
+        graph.add_edges_from([(1, 2), (2, 3), (3, 4)])
+        tdx = TreeDecomposition(tree=nx.DiGraph([(1, 2), (2, 3)]), bags={1: {1, 2}, 2: {2, 3}, 3: {3, 4}})
+        inc = IncrementalValidator(tdx, graph)
+        self.assertTrue(inc.is_valid())
+        self.assertEqual({1: 1, 2: 2, 3: 2, 4: 1}, dict(inc.bag_counts))
+        self.assertEqual(2, tdx.bag_size)
+        # moving 2 from bag 2 to bag 3 splits the bags containing 2
+        inc.remove_from_bag(2, 2)
+        inc.add_to_bag(3, 2)
+        self.assertEqual({"is_tree": True, "edges_covered": True, "is_connected": False, "vertices_covered": True},
+                         inc.properties())
+        self.assertEqual(tdx.report(graph).properties, inc.properties())
+        self.assertEqual(3, tdx.bag_size)
+        inc.add_to_bag(2, 2)
+        self.assertTrue(inc.is_valid())
+        self.assertRaises(KeyError, inc.remove_from_bag, 1, 4)
+        self.assertRaises(TypeError, inc.set_weight, 1, 0, 1)
+
+    def test_attach_subtree(self):
+        graph = Graph()
+        graph.add_edges_from([(1, 2), (2, 3), (3, 4), (4, 5)])
+        tdx = TreeDecomposition(tree=nx.DiGraph([(1, 2)]), bags={1: {1, 2}, 2: {2, 3}})
+        inc = IncrementalValidator(tdx, graph)
+        self.assertFalse(inc.is_valid())
+        # the root 4 of the subtree becomes a child of 2
+        inc.attach_subtree(2, TreeDecomposition(tree=nx.DiGraph([(4, 5)]), bags={4: {3, 4}, 5: {4, 5}}))
+        self.assertTrue(inc.is_valid())
+        self.assertEqual([(1, 2), (2, 4), (4, 5)], sorted(tdx.tree.edges()))
+        self.assertTrue(tdx.validate(graph))
+        # a second component
+        inc.attach_subtree(None, TreeDecomposition(tree=nx.DiGraph([(6, 7)]), bags={6: {5}, 7: set()}))
+        self.assertFalse(inc.properties()["is_tree"])
+        self.assertRaises(ValueError, inc.attach_subtree, 1,
+                          TreeDecomposition(tree=nx.DiGraph([(5, 8)]), bags={5: set(), 8: set()}))
+        forest = TreeDecomposition(tree=nx.DiGraph([(8, 9), (10, 11)]), bags={n: set() for n in range(8, 12)})
+        self.assertRaises(ValueError, inc.attach_subtree, 1, forest)
+
+    def test_weights(self):
+        hg = Hypergraph()
+        for e in ([1, 2], [2, 3], [1, 3]):
+            hg.add_hyperedge(e)
+        fhtd = FractionalHypertreeDecomposition(tree=nx.DiGraph([(1, 2)]), bags={1: {1, 2, 3}, 2: {3}},
+                                                hyperedge_function={1: {1: 0.5, 2: 0.5, 3: 0.5}, 2: {2: 1.0}})
+        inc = IncrementalValidator(fhtd, hg)
+        self.assertTrue(inc.is_valid())
+        self.assertEqual({1: 1.0, 2: 1.0, 3: 1.0}, inc.coverage[1])
+        self.assertEqual(1.5, fhtd.function_width)
+        edges = fhtd.hyperedge_function.csr()[2]
+        inc.set_weight(1, 3, 0.25)
+        # the weight is set in the overlay, the arrays of the hyperedge function are untouched
+        self.assertIs(edges, fhtd.hyperedge_function._edges)
+        self.assertEqual({1: 0.5, 2: 0.5, 3: 0.25}, fhtd.hyperedge_function._overlay[1])
+        self.assertEqual({(1, 1), (1, 3)}, inc._unsatisfied)
+        self.assertFalse(inc.is_valid())
+        self.assertEqual(1.25, fhtd.function_width)
+        # 1 and 3 are covered up to epsilon
+        inc.set_weight(1, 3, 0.4995)
+        self.assertTrue(inc.is_valid())
+        inc.remove_from_bag(1, 1)
+        inc.remove_from_bag(1, 3)
+        inc.set_weight(1, 3, 0)
+        self.assertFalse(inc.is_valid())
+        self.assertEqual(fhtd.report(hg).properties, inc.properties())
+
+    def test_exact_weights(self):
+        hg = Hypergraph()
+        for e in ([1, 2], [2, 3], [1, 3]):
+            hg.add_hyperedge(e)
+        with tempfile.TemporaryDirectory() as tmp:
+            fname = os.path.join(tmp, "triangle.fhtd")
+            with open(fname, "w") as fobj:
+                fobj.write("s fhtd 2 1.5 3 3\nb 1 1 2 3\nb 2 3\n1 2\nw 1 1 0.5\nw 1 2 0.5\nw 1 3 0.5\nw 2 2 1\n")
+            fhtd = FractionalHypertreeDecomposition.from_file(fname, exact=True)
+        inc = IncrementalValidator(fhtd, hg)
+        self.assertEqual(2, fhtd.weight_scale)
+        self.assertTrue(inc.is_valid())
+        # the sums are rescaled with the weights, 1 and 3 are not covered exactly
+        inc.set_weight(1, 3, Fraction(4995, 10000))
+        self.assertEqual(2000, fhtd.weight_scale)
+        self.assertEqual({1: 1999, 2: 2000, 3: 1999}, inc.coverage[1])
+        self.assertEqual({(1, 1), (1, 3)}, inc._unsatisfied)
+        self.assertEqual(Fraction(14995, 10000), fhtd.function_width)
+
+    def test_hypertree(self):
+        hg = Hypergraph()
+        for e in ([1, 2], [2, 3]):
+            hg.add_hyperedge(e)
+        htd = HypertreeDecomposition(tree=nx.DiGraph([(1, 2)]), bags={1: {2}, 2: {2, 3}},
+                                     hyperedge_function={1: {1: 1}, 2: {2: 1}})
+        inc = IncrementalValidator(htd, hg)
+        self.assertFalse(inc.is_valid())
+        self.assertEqual({1: {1, 2}, 2: {2, 3}}, inc.conditions())
+        inc.add_to_bag(1, 1)
+        self.assertTrue(inc.is_valid())
+        # 3 is in B(lambda_1) and below 1, but not in the bag of 1
+        inc.set_weight(1, 2, 1)
+        self.assertEqual({"is_tree": True, "edges_covered": True, "is_connected": True, "edge_function_holds": True,
+                          "inverse_edge_function_holds": False}, inc.properties())
+        self.assertEqual(htd.report(hg).properties, inc.properties())
+
+    def test_files(self):
+        # after changes, the properties equal the ones of a report from scratch
+        for cls, td in ((GeneralizedHypertreeDecomposition, "ghtd"), (HypertreeDecomposition, "htd"),
+                        (FractionalHypertreeDecomposition, "fhtd")):
+            folder = os.path.join(self._folder, td, "valid")
+            for file in sorted(os.listdir(folder)):
+                if not file.endswith(td):
+                    continue
+                hg = Hypergraph.from_file(os.path.join(folder, file[:-len(td)] + "edge"))
+                decomp = cls.from_file(os.path.join(folder, file))
+                inc = IncrementalValidator(decomp, hg)
+                self.assertTrue(inc.is_valid())
+                for t in sorted(decomp.bags):
+                    for v in sorted(decomp.bags[t]):
+                        inc.remove_from_bag(t, v)
+                        self.assertEqual(decomp.report(hg).properties, inc.properties())
+                        inc.add_to_bag(t, v)
+                    for e in sorted(decomp.hyperedge_function.row(t)):
+                        w = decomp.hyperedge_function[t][e]
+                        inc.set_weight(t, e, 0)
+                        self.assertEqual(decomp.report(hg).properties, inc.properties())
+                        inc.set_weight(t, e, w)
+                self.assertTrue(inc.is_valid())
+                self.assertTrue(decomp.validate(hg))
@@ -0,0 +1,67 @@
+#!/usr/bin/env false
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from htd_validate.validators import batch
+from htd_validate.validators import server
+
+
+class TestServer(unittest.TestCase):
+    _folder = os.path.dirname(os.path.realpath(__file__))
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.socket = os.path.join(self.tmp, "validate.sock")
+        self.server = server.ValidationServer(self.socket, capacity=2)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.socket))
+        shutil.rmtree(self.tmp)
+
+    def test_requests(self):
+        valid = batch.walk(os.path.join(self._folder, "htd", "valid"))[0]
+        invalid = batch.walk(os.path.join(self._folder, "htd", "invalid"))[0]
+        ret = server.request(self.socket, graph=valid.graph, decomposition=valid.decomposition, type="htd")
+        self.assertEqual((True, 0, False, {}), (ret["valid"], ret["status"], ret["cached"], ret["violations"]))
+        self.assertIsNotNone(ret["width"])
+        ret = server.request(self.socket, graph=valid.graph, decomposition=valid.decomposition, type="htd")
+        self.assertEqual((True, True), (ret["valid"], ret["cached"]))
+        with open(invalid.decomposition) as fobj:
+            ret = server.request(self.socket, graph=invalid.graph, text=fobj.read(), type="htd")
+        self.assertEqual((False, 1), (ret["valid"], ret["status"]))
+        self.assertEqual({"is_connected": {"vertices": [2]},
+                          "inverse_edge_function_holds": {"nodes": [3], "vertices": [2]}}, ret["violations"])
+        ret = server.request(self.socket, graph=valid.graph, text="garbage", type="htd")
+        self.assertEqual((None, 2), (ret["valid"], ret["status"]))
+        ret = server.request(self.socket, graph=valid.graph, type="htd")
+        self.assertEqual((None, 2), (ret["valid"], ret["status"]))
+        ret = server.request(self.socket, graph=valid.graph, decomposition=valid.decomposition, type="none")
+        self.assertEqual((None, 2), (ret["valid"], ret["status"]))
+
+    def test_graph_cache(self):
+        pairs = batch.walk(os.path.join(self._folder, "td", "valid"))[:3]
+        graph = os.path.join(self.tmp, "graph.gr")
+        shutil.copy(pairs[0].graph, graph)
+        self.assertFalse(server.request(self.socket, graph=graph, decomposition=pairs[0].decomposition)["cached"])
+        self.assertTrue(server.request(self.socket, graph=graph, decomposition=pairs[0].decomposition)["cached"])
+        # a changed file is parsed again
+        shutil.copy(pairs[1].graph, graph)
+        ret = server.request(self.socket, graph=graph, decomposition=pairs[1].decomposition)
+        self.assertEqual((True, False), (ret["valid"], ret["cached"]))
+        # the least recently used graph is dropped
+        server.request(self.socket, graph=pairs[2].graph, decomposition=pairs[2].decomposition)
+        self.assertEqual(2, len(self.server.graphs))
+        self.assertTrue(server.request(self.socket, graph=graph, decomposition=pairs[1].decomposition)["cached"])
+        server.request(self.socket, graph=pairs[0].graph, decomposition=pairs[0].decomposition)
+        self.assertTrue(server.request(self.socket, graph=graph, decomposition=pairs[1].decomposition)["cached"])
+        self.assertFalse(server.request(self.socket, graph=pairs[2].graph, decomposition=pairs[2].decomposition)
+                         ["cached"])
@@ -1,7 +1,12 @@
 #!/usr/bin/env false
 from __future__ import absolute_import
+import os
+import tempfile
+from fractions import Fraction
+
 import htd_validate_tests.tests.validators.test_validateTD as vtd
 
+import networkx as nx
 import htd_validate.utils as grap
 import htd_validate.decompositions as dec
 
@@ -12,3 +17,66 @@ class TestValidateFHTD(vtd.TestValidateTD):
     _gr = "edge"
     _td_classname = dec.FractionalHypertreeDecomposition.__name__
     _gr_classname = grap.Hypergraph.__name__
+
+    def test_coverage_summation_order(self):
+        # weights of a vertex are summed in the order of the hyperedges, not in the order of the incidence index
+        hg = grap.Hypergraph()
+        for k in range(1, 11):
+            hg.add_hyperedge([1, 10 * k] if k in (3, 9, 10) else [10 * k, 10 * k + 1])
+        fhtd = dec.FractionalHypertreeDecomposition(hypergraph=hg, tree=nx.DiGraph([(1, 1)]), bags={1: {1}},
+                                                    hyperedge_function={1: {3: 0.1, 9: 0.2, 10: 0.7}})
+        fhtd.epsilon = 0
+        # (0.1 + 0.2) + 0.7 == 1.0, whereas (0.2 + 0.7) + 0.1 < 1
+        self.assertEqual({1}, fhtd._coverage()[1])
+        self.assertTrue(fhtd.edge_function_holds())
+
+    def test_report_deficits(self):
+        hg = grap.Hypergraph()
+        for e in ([1, 2], [2, 3], [1, 3]):
+            hg.add_hyperedge(e)
+        fhtd = dec.FractionalHypertreeDecomposition(hypergraph=hg, tree=nx.DiGraph(), bags={1: {1, 2, 3}},
+                                                    hyperedge_function={1: {1: 0.5, 2: 0.5, 3: 0.25}})
+        fhtd.tree.add_node(1)
+        report = fhtd.report(hg)
+        self.assertFalse(report.valid)
+        self.assertEqual(['edge_function_holds'], [p for p, holds in report.properties.items() if not holds])
+        violations = report.violations['edge_function_holds']
+        self.assertEqual(([1, 1], [1, 3], [0.25, 0.25]), (list(violations['nodes']), list(violations['vertices']),
+                                                              list(violations['deficits'])))
+        fhtd.hyperedge_function[1][3] = 0.5
+        self.assertTrue(fhtd.report(hg).valid)
+
+    def test_cached_width(self):
+        fhtd = dec.FractionalHypertreeDecomposition(tree=nx.DiGraph([(1, 2)]), bags={1: {1, 2}, 2: {2, 3}},
+                                                    hyperedge_function={1: {1: 0.5, 2: 0.5}, 2: {2: 1.25}})
+        self.assertEqual(1.25, fhtd.function_width)
+        self.assertEqual(1.25, fhtd.width())
+        # computed once, connect drops the cached width
+        other = dec.FractionalHypertreeDecomposition(tree=nx.DiGraph([(1, 2)]), bags={1: {3, 4}, 2: {4}},
+                                                     hyperedge_function={1: {3: 1.5, 4: 0.5}, 2: {4: 1.0}})
+        fhtd.hyperedge_function[1][3] = 0.0
+        self.assertEqual(1.25, fhtd.function_width)
+        self.assertTrue(fhtd.connect(other))
+        self.assertEqual(2.0, fhtd.function_width)
+        self.assertEqual(2.0, fhtd.max_bag_size())
+
+    def test_exact_weights(self):
+        hg = grap.Hypergraph()
+        for e in ([1, 2], [2, 3], [1, 3]):
+            hg.add_hyperedge(e)
+        with tempfile.TemporaryDirectory() as tmp:
+            fname = os.path.join(tmp, "triangle.fhtd")
+            with open(fname, "w") as fobj:
+                fobj.write("s fhtd 1 1.4995 3 3\nb 1 1 2 3\nw 1 1 0.4995\nw 1 2 0.5\nw 1 3 0.5\n")
+            # vertices 1 and 2 are covered by 0.9995, up to epsilon but not exactly
+            self.assertTrue(dec.FractionalHypertreeDecomposition.from_file(fname).validate(hg))
+            fhtd = dec.FractionalHypertreeDecomposition.from_file(fname, exact=True)
+        self.assertEqual(2000, fhtd.weight_scale)
+        self.assertEqual({1: {1: 999, 2: 1000, 3: 1000}}, fhtd.hyperedge_function)
+        self.assertEqual(Fraction(2999, 2000), fhtd.function_width)
+        self.assertFalse(fhtd.validate(hg))
+        violations = fhtd.report(hg).violations['edge_function_holds']
+        self.assertEqual(([1, 1], [1, 2], [0.0005, 0.0005]), (list(violations['nodes']), list(violations['vertices']),
+                                                list(violations['deficits'])))
+        fhtd.bitsets = True
+        self.assertFalse(fhtd.validate(hg))
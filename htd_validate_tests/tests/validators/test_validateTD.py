@@ -1,7 +1,20 @@
 #!/usr/bin/env false
 from __future__ import absolute_import
+import bz2
+import gzip
+import json
+import lzma
+import os
+import shutil
+import tempfile
+
 import htd_validate_tests.tests.validators.validateTD_testcase as vtd
+import htd_validate.decompositions
 import htd_validate.decompositions.td as td
+import htd_validate.utils.mmapscan
+import networkx as nx
+from htd_validate.utils import bincache
+from htd_validate.utils import Hypergraph
 
 class TestValidateTD(vtd.ValidateTDTestCase):
 
@@ -21,6 +34,34 @@ class TestValidateTD(vtd.ValidateTDTestCase):
         # Inputs that have an invalid decomposition
         self.validateFolder("invalid", assertion=False, strict=False)
 
+    def test_bitsets(self):
+        # Bags and hyperedges as bitmasks yield the same results
+        self.validateFolder("valid", True, bitsets=True)
+        self.validateFolder("invalid", assertion=False, strict=False, bitsets=True)
+
+    def test_parallel(self):
+        # Properties checked concurrently yield the same results
+        self.validateFolder("valid", True, parallel=True)
+        self.validateFolder("invalid", assertion=False, strict=False, parallel=True)
+
+    def test_workers(self):
+        # Properties checked in shards yield the same results
+        self.validateFolder("valid", True, workers=3)
+        self.validateFolder("invalid", assertion=False, strict=False, workers=3)
+        self.validateFolder("invalid", assertion=False, strict=False, bitsets=True, workers=3)
+
+    def test_report(self):
+        # Reports of all properties yield the same results
+        self.validateFolder("valid", True, report=True)
+        self.validateFolder("invalid", assertion=False, strict=False, report=True)
+
+    def test_exact(self):
+        # Weights summed exactly as scaled integers yield the same results
+        self.validateFolder("valid", True, exact=True)
+        self.validateFolder("valid", True, bitsets=True, exact=True)
+        self.validateFolder("invalid", assertion=False, strict=False, exact=True)
+        self.validateFolder("invalid_format", assertion=2, exact=True)
+
     def test_invalid_spec(self):
         # Inputs that violate the PACE td format spec (some relaxed version)
         self.validateFolder("invalid_spec", assertion=2)
@@ -37,6 +78,151 @@ class TestValidateTD(vtd.ValidateTDTestCase):
         # Inputs where format requirements might be seen as controversial
         self.validateFolder("controversial", True or False)
 
+    def test_binary_cache(self):
+        # decompositions loaded from the binary sidecar cache equal the parsed ones
+        folder = os.path.join(os.path.dirname(os.path.realpath(__file__)), self._td, "valid")
+        cls = getattr(htd_validate.decompositions, self._td_classname)
+        with tempfile.TemporaryDirectory() as tmp:
+            for file in sorted(os.listdir(folder)):
+                if not file.endswith(self._td):
+                    continue
+                fname = os.path.join(tmp, file)
+                shutil.copy(os.path.join(folder, file), fname)
+                decomp = cls.from_file(fname)
+                for _ in range(2):
+                    cached = cls.from_file(fname, cache=True)
+                    self.assertTrue(os.path.exists(fname + bincache.SUFFIX))
+                    self.assertEqual(decomp.bags, cached.bags)
+                    self.assertEqual(list(decomp.tree.edges()), list(cached.tree.edges()))
+                    self.assertEqual(getattr(decomp, "hyperedge_function", None),
+                                     getattr(cached, "hyperedge_function", None))
+
+    def test_compressed(self):
+        # compressed decompositions are read line by line and equal the uncompressed ones
+        folder = os.path.join(os.path.dirname(os.path.realpath(__file__)), self._td, "valid")
+        cls = getattr(htd_validate.decompositions, self._td_classname)
+        with tempfile.TemporaryDirectory() as tmp:
+            for file in sorted(os.listdir(folder)):
+                if not file.endswith(self._td):
+                    continue
+                decomp = cls.from_file(os.path.join(folder, file))
+                for suffix, module in ((".gz", gzip), (".bz2", bz2), (".xz", lzma)):
+                    fname = os.path.join(tmp, file + suffix)
+                    with open(os.path.join(folder, file), "rb") as fobj, module.open(fname, "wb") as out:
+                        shutil.copyfileobj(fobj, out)
+                    compressed = cls.from_file(fname)
+                    self.assertEqual(decomp.bags, compressed.bags)
+                    self.assertEqual(getattr(decomp, "hyperedge_function", None),
+                                     getattr(compressed, "hyperedge_function", None))
+                    if len(decomp) > 1:
+                        # the tree is built on first access
+                        self.assertIsNone(compressed._tree)
+                    self.assertEqual(list(decomp.tree.nodes()), list(compressed.tree.nodes()))
+                    self.assertEqual(list(decomp.tree.edges()), list(compressed.tree.edges()))
+
+    def test_reader_tokens(self):
+        # the reader gets the same (str) tokens from the byte scan and from the line based reader
+        if htd_validate.utils.mmapscan.np is None:
+            self.skipTest("NumPy not available")
+        folder = os.path.join(os.path.dirname(os.path.realpath(__file__)), self._td, "valid")
+        base = getattr(htd_validate.decompositions, self._td_classname)
+        lines = []
+
+        def reader(cls, decomp, line):
+            # lines of the subclass (e.g., weights), tree edges are only handed to the line based reader
+            ret = base._reader(decomp, line)
+            if ret:
+                lines.append(line)
+            return ret
+
+        cls = type(base.__name__, (base,), {'_reader': classmethod(reader)})
+        for file in sorted(os.listdir(folder)):
+            if not file.endswith(self._td):
+                continue
+            del lines[:]
+            decomp = cls._from_mmap(os.path.join(folder, file))
+            if decomp is None:
+                continue
+            mmap_lines = list(lines)
+            del lines[:]
+            cls._from_stream(os.path.join(folder, file))
+            self.assertEqual(lines, mmap_lines)
+            self.assertTrue(all(isinstance(token, str) for line in lines for token in line))
+
+    def test_connectedness_violations(self):
+        if self._td_classname != td.TreeDecomposition.__name__:
+            return
+        hg = Hypergraph()
+        for v in range(1, 6):
+            hg.add_node(v)
+        tree = nx.DiGraph([(1, 2), (2, 3), (4, 3)])
+        bags = {1: {1, 2}, 2: {2, 5}, 3: {1, 3, 5}, 4: {2, 3}}
+        tdx = td.TreeDecomposition(hypergraph=hg, tree=tree, bags=bags)
+        # 1 and 2 are split, 4 occurs in no bag
+        self.assertEqual([1, 2, 4], sorted(tdx.connectedness_violations()))
+        self.assertFalse(tdx.is_connected())
+        bags[2].add(1)
+        bags[4].remove(2)
+        self.assertEqual([4], sorted(tdx.connectedness_violations()))
+
+    def test_uncovered_edges(self):
+        if self._td_classname != td.TreeDecomposition.__name__:
+            return
+        hg = Hypergraph()
+        for e in ([1, 2], [2, 3, 4], [1, 4], [4, 5]):
+            hg.add_hyperedge(e)
+        bags = {1: {1, 2}, 2: {2, 3, 5}, 3: {3, 4, 5}}
+        tdx = td.TreeDecomposition(hypergraph=hg, tree=nx.DiGraph([(1, 2), (2, 3)]), bags=bags)
+        self.assertEqual([(2, 3, 4), (1, 4)], tdx.uncovered_edges())
+        self.assertFalse(tdx.edges_covered())
+        bags[2].update((1, 4))
+        self.assertEqual([], tdx.uncovered_edges())
+        self.assertTrue(tdx.edges_covered())
+
+    def test_cached_bag_size(self):
+        if self._td_classname != td.TreeDecomposition.__name__:
+            return
+        tdx = td.TreeDecomposition(tree=nx.DiGraph([(1, 2)]), bags={1: {1, 2}, 2: {2, 3}})
+        self.assertEqual(2, tdx.bag_size)
+        # computed once, connect drops the cached size
+        tdx.bags[1].add(4)
+        self.assertEqual(2, tdx.max_bag_size())
+        self.assertTrue(tdx.connect(td.TreeDecomposition(tree=nx.DiGraph([(1, 2)]), bags={1: {3}, 2: {5, 6}})))
+        self.assertEqual(3, tdx.bag_size)
+
+    def test_report_violations(self):
+        if self._td_classname != td.TreeDecomposition.__name__:
+            return
+        hg = Hypergraph()
+        for e in ([1, 2], [2, 3, 4], [1, 4], [4, 5]):
+            hg.add_hyperedge(e)
+        hg.add_node(6)
+        bags = {1: {1, 2, 4}, 2: {2, 3, 5}, 3: {3, 4, 5}}
+        tdx = td.TreeDecomposition(hypergraph=hg, tree=nx.DiGraph([(1, 2), (2, 3)]), bags=bags)
+        report = tdx.report(hg)
+        self.assertFalse(report.valid)
+        self.assertEqual({"is_tree": True, "edges_covered": False, "is_connected": False, "vertices_covered": False},
+                         report.properties)
+        self.assertEqual([(2, 3, 4)], report.edges("edges_covered"))
+        self.assertEqual({"edges_covered": {"offsets": [0, 3], "vertices": [2, 3, 4]},
+                          "is_connected": {"vertices": [4, 6]}, "vertices_covered": {"vertices": [6]}},
+                         json.loads(report.to_json())["violations"])
+        bags[2].add(4)
+        bags[3].add(6)
+        self.assertTrue(tdx.report(hg).valid)
+
+    def test_parallel_errors(self):
+        if self._td_classname != td.TreeDecomposition.__name__:
+            return
+        hg = Hypergraph()
+        hg.add_hyperedge([1, 2])
+        tdx = td.TreeDecomposition(hypergraph=hg, tree=nx.DiGraph([(1, 2)]), bags={1: {1}, 2: {2}})
+        # as in the sequential run, a failure before an error is a result and the first error is raised
+        for parallel in (False, True):
+            self.assertFalse(tdx._holds([('edges_covered', {}), ('no_property', {})], parallel=parallel))
+            self.assertRaises(AttributeError, tdx._holds, [('no_property', {}), ('is_tree', {'no_argument': 1})],
+                              parallel=parallel)
+
     def tdFromGraph(self, graph_file, maxbag, ord=None):
         g = self.loadFile(self.filePath("testTD/") + graph_file)
         self.assertIsNotNone(g)
@@ -0,0 +1,110 @@
+#!/usr/bin/env false
+from __future__ import absolute_import
+from array import array
+import os
+import tempfile
+import time
+import unittest
+from fractions import Fraction
+
+from htd_validate.decompositions import FractionalHypertreeDecomposition, GeneralizedHypertreeDecomposition
+from htd_validate.decompositions.weights import FLOAT, INT, LONG, OBJECT, HyperedgeFunction
+
+
+class TestHyperedgeFunction(unittest.TestCase):
+    _folder = os.path.dirname(os.path.realpath(__file__))
+
+    def test_dict_of_dicts(self):
+        weights = HyperedgeFunction()
+        # appended weights are merged on access, later weights replace earlier ones
+        for t, e, w in ((2, 5, 1), (1, 3, 1), (2, 4, 2), (2, 5, 3)):
+            weights.append(t, e, w)
+        weights.set(3, 1, 1)
+        weights[1][7] = 4
+        weights[4] = {}
+        self.assertEqual({2: {5: 3, 4: 2}, 1: {3: 1, 7: 4}, 3: {1: 1}, 4: {}}, weights)
+        self.assertEqual([2, 1, 3, 4], list(weights))
+        self.assertEqual([5, 4], list(weights[2]))
+        self.assertEqual(INT, weights.typecode)
+        self.assertEqual({}, weights[5])
+        self.assertNotIn(5, weights)
+        self.assertNotIn(6, weights[2])
+        self.assertRaises(KeyError, weights[2].__getitem__, 6)
+        self.assertEqual(5, weights.row_sum(2))
+        del weights[1][3]
+        del weights[2]
+        self.assertEqual({1: {7: 4}, 3: {1: 1}, 4: {}}, weights)
+        # substitutions that are not injective merge the weights of a node
+        weights.set(1, 8, 5)
+        weights.relabel_edges({1: 2, 7: 1, 8: 1})
+        self.assertEqual({1: {1: 5}, 3: {2: 1}, 4: {}}, weights)
+
+    def test_typecode(self):
+        weights = HyperedgeFunction()
+        weights.set(1, 1, 1)
+        weights.set(1, 2, 0.5)
+        self.assertEqual(FLOAT, weights.typecode)
+        weights.set(2, 1, Fraction(1, 3))
+        self.assertEqual(OBJECT, weights.typecode)
+        self.assertEqual({1: {1: 1, 2: 0.5}, 2: {1: Fraction(1, 3)}}, weights)
+        self.assertEqual(Fraction(1, 3), weights[2][1])
+        # integers are not turned into inexact floats
+        weights = HyperedgeFunction()
+        weights.set(1, 1, 2 ** 60)
+        self.assertEqual(LONG, weights.typecode)
+        weights.set(1, 2, 0.5)
+        self.assertEqual(OBJECT, weights.typecode)
+        weights.set(1, 2, 1)
+        self.assertEqual(2 ** 60 + 1, weights.row_sum(1))
+
+    def test_csr(self):
+        weights = HyperedgeFunction(FLOAT, {3: {1: 0.5, 2: 0.25}, 1: {}, 2: {4: 1.0}})
+        nodes, offsets, edges, values = weights.csr()
+        self.assertEqual(([3, 1, 2], [0, 2, 2, 3], [1, 2, 4], [0.5, 0.25, 1.0]),
+                         (nodes, list(offsets), list(edges), list(values)))
+        self.assertEqual(weights, HyperedgeFunction.from_csr(nodes, offsets, edges, values))
+
+    def test_point_updates(self):
+        # single updates go to the overlay, their cost does not grow with the number of rows
+        def updates(rows):
+            weights = HyperedgeFunction.from_csr(range(rows), range(0, 2 * rows + 1, 2), [1, 2] * rows,
+                                                 array('i', [1, 2] * rows))
+            edges = weights._edges
+            start = time.perf_counter()
+            for i in range(2000):
+                t = i * 7919 % rows
+                weights.set(t, 3, weights.get_weight(t, 1) + 1)
+                weights[t].pop(2, None)
+            seconds = time.perf_counter() - start
+            # the arrays are untouched
+            self.assertIs(edges, weights._edges)
+            self.assertEqual(2 * rows, len(edges))
+            return weights, seconds
+
+        _, small = updates(1000)
+        weights, large = updates(100000)
+        self.assertLess(large, 10 * small + 0.05)
+        self.assertEqual({1: 1, 3: 2}, weights[0])
+        self.assertEqual({1: 1, 2: 2}, weights[1])
+        # and rebuilt on the first read of the CSR layout
+        nodes, offsets, edges, values = weights.csr()
+        self.assertEqual(list(range(100000)), nodes)
+        self.assertEqual({}, weights._overlay)
+        self.assertEqual(weights, HyperedgeFunction.from_csr(nodes, offsets, edges, values))
+
+    def test_write(self):
+        # written decompositions are read back unchanged
+        for cls, td in ((GeneralizedHypertreeDecomposition, "ghtd"), (FractionalHypertreeDecomposition, "fhtd")):
+            folder = os.path.join(self._folder, td, "valid")
+            with tempfile.TemporaryDirectory() as tmp:
+                for file in sorted(os.listdir(folder)):
+                    if not file.endswith(td):
+                        continue
+                    decomp = cls.from_file(os.path.join(folder, file))
+                    fname = os.path.join(tmp, file)
+                    with open(fname, "w") as fobj:
+                        decomp.write(fobj)
+                    written = cls.from_file(fname)
+                    self.assertEqual(decomp.bags, written.bags)
+                    self.assertEqual(decomp.hyperedge_function, written.hyperedge_function)
+                    self.assertEqual(sorted(decomp.tree.edges()), sorted(written.tree.edges()))
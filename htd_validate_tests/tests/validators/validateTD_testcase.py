@@ -19,12 +19,19 @@ class ValidateTDTestCase(vg.ValidateGraphTestCase):
     #def loadFile(self, graph_file, strict=False):
     #    return getattr(htd_validate.utils, self.__class__._gr_classname).from_file(graph_file, strict)
 
-    def assertFromFiles(self, graph_file, td_file, assertion=True, strict=False):
+    def assertFromFiles(self, graph_file, td_file, assertion=True, strict=False, bitsets=False, parallel=False,
+                        workers=None, report=False, exact=False):
         def _assertValidate():
             hg = self.loadFile(graph_file, strict)
             decomp = getattr(htd_validate.decompositions, self.__class__._td_classname).from_file(filename=td_file,
-                                                                                                  strict=strict)
-            self.assertEqual(assertion, decomp.validate(hg),
+                                                                                                  strict=strict,
+                                                                                                  exact=exact)
+            decomp.bitsets = bitsets
+            if report:
+                self.assertEqual(assertion, decomp.report(hg).valid,
+                                 "td report result wrong, should be: %s in: %s" % (assertion, td_file))
+                return
+            self.assertEqual(assertion, decomp.validate(hg, parallel=parallel, workers=workers),
                                  "td validation result wrong, should be: %s in: %s" % (assertion, td_file))
 
         if assertion not in [True, False]:
@@ -39,7 +46,8 @@ class ValidateTDTestCase(vg.ValidateGraphTestCase):
     #def tearDown(self):
     #    pass
 
-    def validateFolder(self, folder, assertion=True, strict=False):
+    def validateFolder(self, folder, assertion=True, strict=False, bitsets=False, parallel=False, workers=None,
+                       report=False, exact=False):
         graph = None
         folder = os.path.dirname(os.path.realpath(__file__)) + "/" + self.__class__._td + "/" + folder + "/"
         print("checking folder: ", folder)
@@ -54,5 +62,6 @@ class ValidateTDTestCase(vg.ValidateGraphTestCase):
                         self.assertEqual(False, True, "graph file missing for td file: " + file)
                     else:
                         print("testing: ", graph, file)
-                        self.assertFromFiles(folder + graph, folder + file, assertion, strict)
+                        self.assertFromFiles(folder + graph, folder + file, assertion, strict, bitsets, parallel,
+                                             workers, report, exact)
                     graph = None